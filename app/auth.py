@@ -1,18 +1,91 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from collections import OrderedDict
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from metrics import registry
+import hashlib
+import threading
+import time
 import os
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-super-secret-key-change-in-production-12345")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+def _credentials_error():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+class VerifiedTokenCache:
+    """LRU of already verified access tokens, keyed by token digest.
+
+    An entry lives until the token's own `exp`, so a cached token is never
+    accepted after it would have failed `jwt.decode`.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, user_id = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return user_id
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, user_id: str, expires_at: float):
+        if self.max_entries <= 0:
+            return
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (expires_at, user_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_MAX_ENTRIES)
+
+registry.callback(
+    "auth_token_cache_lookups_total",
+    "Verified access token cache lookups by result",
+    "counter",
+    ("result",),
+    lambda: [(("hit",), token_cache.hits), (("miss",), token_cache.misses)]
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -23,23 +96,47 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+def create_refresh_token(user_id: str, name: str, id_number: Optional[str] = None,
+                         expires_delta: Optional[timedelta] = None):
+    """Long-lived token that only POST /api/users/refresh accepts.
+
+    It carries the profile fields of the Token response, so refreshing
+    needs no database lookup.
+    """
+    return create_access_token(
+        data={"sub": user_id, "type": "refresh", "name": name, "id_number": id_number},
+        expires_delta=expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+def decode_access_token(token: str) -> str:
+    """Return the user id of a valid access token, from the cache when possible"""
+    user_id = token_cache.get(token)
+    if user_id is not None:
         return user_id
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _credentials_error()
+    user_id = payload.get("sub")
+    # Tokens issued before refresh tokens existed carry no type
+    if user_id is None or payload.get("type", "access") != "access":
+        raise _credentials_error()
+    if "exp" in payload:
+        token_cache.set(token, user_id, payload["exp"])
+    return user_id
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
+    if payload.get("sub") is None or payload.get("type") != "refresh":
+        raise _credentials_error()
+    return payload
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return decode_access_token(credentials.credentials)
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -47,13 +144,11 @@ def hash_password(password: str):
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_optional_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+async def get_optional_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
     if credentials is None:
         return None
-    
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        return user_id
-    except JWTError:
-        return None
\ No newline at end of file
+        return decode_access_token(credentials.credentials)
+    except HTTPException:
+        return None
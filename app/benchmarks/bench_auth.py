@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of the per-request cost of bearer token authentication.
+
+"decode" is the previous verify_token: a full jwt.decode with signature
+check on every request. "cached" is the current path, where a token is
+verified once and later requests hit the verified-token LRU. Both run on
+a pool of --users distinct tokens, directly and through a FastAPI route
+that depends on verify_token (in-process ASGI, no network or database).
+
+    python -m benchmarks.bench_auth --requests 20000 --users 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from auth import create_access_token, decode_access_token, token_cache, verify_token
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/protected")
+    async def protected(user_id: str = Depends(verify_token)):
+        return {"user_id": user_id}
+
+    return app
+
+def time_direct(tokens, requests, cache_enabled):
+    token_cache.clear()
+    token_cache.max_entries = len(tokens) if cache_enabled else 0
+    started = time.perf_counter()
+    for i in range(requests):
+        decode_access_token(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / requests * 1e6
+
+async def time_route(tokens, requests, cache_enabled):
+    token_cache.clear()
+    token_cache.max_entries = len(tokens) if cache_enabled else 0
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for i in range(requests):
+            response = await client.get("/protected", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+            response.raise_for_status()
+        return (time.perf_counter() - started) / requests * 1e6
+
+def main(args):
+    tokens = [create_access_token({"sub": f"user-{i}"}) for i in range(args.users)]
+    max_entries = token_cache.max_entries
+    results = []
+    try:
+        for scenario, measure in (
+            ("verify_token", lambda enabled: time_direct(tokens, args.requests, enabled)),
+            ("protected_route", lambda enabled: asyncio.run(time_route(tokens, args.route_requests, enabled))),
+        ):
+            decode_us = min(measure(False) for _ in range(args.repeat))
+            cached_us = min(measure(True) for _ in range(args.repeat))
+            result = {
+                "scenario": scenario,
+                "users": args.users,
+                "decode_us_per_request": round(decode_us, 2),
+                "cached_us_per_request": round(cached_us, 2),
+                "saved_us_per_request": round(decode_us - cached_us, 2),
+            }
+            print(json.dumps(result))
+            results.append(result)
+    finally:
+        token_cache.max_entries = max_entries
+        token_cache.clear()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--route-requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    main(parser.parse_args())
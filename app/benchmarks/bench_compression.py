@@ -0,0 +1,81 @@
+"""
+Bytes on the wire and CPU cost of response compression per size class.
+
+Builds lesson-history JSON payloads of increasing size from the mock lesson
+text and reports, for each available encoding, the compressed size, ratio
+and CPU time per response. Runs fully offline:
+
+    python -m benchmarks.bench_compression
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from compression import COMPRESSION_MIN_SIZE, compress_body, supported_encodings
+from services.ai_service import generate_mock_lesson
+
+SIZE_CLASSES = {
+    "1KB": 1_000,
+    "10KB": 10_000,
+    "100KB": 100_000,
+    "1MB": 1_000_000,
+}
+
+def build_payload(target_size: int) -> bytes:
+    """JSON list of lessons of roughly `target_size` bytes, like a lesson history response"""
+    lessons = []
+    payload = b"[]"
+    i = 0
+    while len(payload) < target_size:
+        prompt = f"Lesson topic number {i}"
+        lessons.append({
+            "id": f"{i:024x}",
+            "user_id": f"{i % 50:024x}",
+            "prompt": prompt,
+            "response": generate_mock_lesson(prompt),
+            "created_at": datetime(2024, 1, 1).isoformat()
+        })
+        payload = json.dumps(lessons).encode("utf-8")
+        i += 1
+
+    if len(lessons) == 1:
+        # Smaller than one lesson: trim the lesson body instead
+        overflow = len(payload) - target_size
+        lessons[0]["response"] = lessons[0]["response"][:max(0, len(lessons[0]["response"]) - overflow)]
+        payload = json.dumps(lessons).encode("utf-8")
+    return payload
+
+def measure(body: bytes, encoding: str, repeat: int) -> dict:
+    started = time.process_time()
+    for _ in range(repeat):
+        compressed = compress_body(body, encoding)
+    cpu_ms = (time.process_time() - started) * 1000 / repeat
+    return {
+        "encoding": encoding,
+        "original_bytes": len(body),
+        "wire_bytes": len(compressed),
+        "ratio": round(len(body) / len(compressed), 2),
+        "cpu_ms": round(cpu_ms, 3),
+        "mb_per_cpu_second": round(len(body) / 1_000_000 / (cpu_ms / 1000), 1) if cpu_ms else None,
+    }
+
+def main(args):
+    results = []
+    for label, size in SIZE_CLASSES.items():
+        body = build_payload(size)
+        for encoding in supported_encodings():
+            result = {"size_class": label, **measure(body, encoding, args.repeat)}
+            result["compressed_by_middleware"] = len(body) >= COMPRESSION_MIN_SIZE
+            print(json.dumps(result))
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""
+Concurrent throughput benchmark for /api/users and /api/prompts.
+
+Start the API with the lesson quotas off (RATE_LIMIT_ENABLED=false uvicorn
+main:app), since every lesson is created for one user, and run, from the app
+directory:
+
+    python -m benchmarks.bench_concurrency --base-url http://localhost:8000 --output after.json
+
+Run it once against a server built from the previous commit with
+--output before.json, then pass --compare before.json to print the
+speed-up per scenario.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_scenario(client, name, make_request, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+async def prepare_user(client):
+    unique_id = str(random.randint(100000, 999999))
+    response = await client.post("/api/users/register", json={
+        "name": f"Bench User {unique_id}",
+        "phone": f"054{unique_id}",
+        "id_number": f"111{unique_id}"
+    })
+    response.raise_for_status()
+    return response.json()["user_id"]
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        user_id = await prepare_user(client)
+
+        scenarios = {
+            "GET /api/users": lambda c, i: c.get("/api/users", params={"page": 1, "limit": 10}),
+            "GET /api/prompts": lambda c, i: c.get("/api/prompts"),
+            "POST /api/prompts": lambda c, i: c.post("/api/prompts", json={
+                "user_id": user_id,
+                "prompt": f"Benchmark lesson number {i}"
+            }),
+        }
+
+        results = []
+        for name, make_request in scenarios.items():
+            result = await run_scenario(client, name, make_request, args.requests, args.concurrency)
+            print(json.dumps(result))
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            before = {r["scenario"]: r for r in json.load(f)}
+        for result in results:
+            previous = before.get(result["scenario"])
+            if previous:
+                speedup = result["throughput_rps"] / previous["throughput_rps"]
+                print(f"{result['scenario']}: {previous['throughput_rps']} -> {result['throughput_rps']} req/s ({speedup:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,361 @@
+"""
+Offline end-to-end benchmark of the real API on one box.
+
+Boots, as subprocesses, a throwaway mongod (unless --mongo-uri is given,
+or --storage selects the embedded engine), the fake LLM server
+(benchmarks.fake_llm) and `uvicorn main:app` pointed at both, seeds
+taxonomy, users and lessons, then drives a seeded random mix of
+register/login, taxonomy browsing, lesson creation and history reads.
+Prints throughput and p50/p95/p99 per endpoint as JSON. From the app
+directory:
+
+    python -m benchmarks.bench_e2e --output baseline.json
+    python -m benchmarks.bench_e2e --storage sqlite
+    python -m benchmarks.bench_e2e --baseline baseline.json --threshold 0.15
+
+With --baseline the run exits with status 1 when an endpoint's p95 or the
+overall throughput is more than --threshold worse than the stored run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from pymongo import MongoClient
+
+from benchmarks.bench_concurrency import percentile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Endpoint template -> relative share of the mixed workload
+WORKLOAD = {
+    "POST /api/users/register": 5,
+    "POST /api/users/login": 10,
+    "GET /api/categories": 20,
+    "GET /api/categories/{category_id}/sub-categories": 15,
+    "POST /api/prompts": 10,
+    "GET /api/users/{user_id}/prompts": 25,
+    "GET /api/prompts/{prompt_id}": 15,
+}
+
+TOPICS = [
+    "photosynthesis", "the water cycle", "fractions", "the french revolution", "binary numbers",
+    "plate tectonics", "the immune system", "supply and demand", "newton's laws", "poetry meter",
+]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port: int, process, timeout: float, name: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {process.returncode}")
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"{name} did not start listening on port {port} within {timeout}s")
+
+def wait_until_ready(base_url: str, process, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/readyz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API was not ready within {timeout}s")
+
+class Stack:
+    """The mongod, fake LLM and API subprocesses of one run"""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+        self.mongo_dir = None
+        self.sqlite_dir = None
+        self.mongo_uri = args.mongo_uri
+        self.database = f"bench_e2e_{int(time.time())}"
+        self.base_url = None
+
+    def _spawn(self, command, **kwargs):
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, **kwargs)
+        self.processes.append(process)
+        return process
+
+    def start(self):
+        storage_env = {"STORAGE_BACKEND": self.args.storage}
+        if self.args.storage == "sqlite":
+            self.sqlite_dir = tempfile.mkdtemp(prefix="bench_e2e_sqlite_")
+            storage_env["SQLITE_PATH"] = os.path.join(self.sqlite_dir, "bench.db")
+        elif self.args.storage == "memory":
+            if self.args.workers != 1:
+                raise RuntimeError("--storage memory keeps data per process; use --workers 1")
+        elif not self.mongo_uri:
+            mongod = shutil.which(self.args.mongod)
+            if not mongod:
+                raise RuntimeError(f"{self.args.mongod} not found; install MongoDB or pass --mongo-uri")
+            self.mongo_dir = tempfile.mkdtemp(prefix="bench_e2e_mongo_")
+            port = free_port()
+            process = self._spawn(
+                [mongod, "--dbpath", self.mongo_dir, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+                stderr=subprocess.DEVNULL
+            )
+            wait_for_port(port, process, 30, "mongod")
+            self.mongo_uri = f"mongodb://127.0.0.1:{port}"
+        if self.mongo_uri:
+            storage_env.update({"MONGO_URI": self.mongo_uri, "MONGO_DB": self.database})
+
+        llm_port = free_port()
+        llm = self._spawn(
+            [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(llm_port),
+             "--latency-ms", str(self.args.llm_latency_ms)],
+            cwd=APP_DIR
+        )
+        wait_for_port(llm_port, llm, 30, "fake LLM")
+
+        api_port = free_port()
+        env = {
+            **os.environ,
+            **storage_env,
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "LOG_LEVEL": "WARNING",
+            # The benchmark measures throughput, not the per-user lesson quotas
+            "RATE_LIMIT_ENABLED": "false",
+        }
+        api = self._spawn(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(api_port),
+             "--workers", str(self.args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=APP_DIR, env=env
+        )
+        self.base_url = f"http://127.0.0.1:{api_port}"
+        wait_until_ready(self.base_url, api, 60)
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in reversed(self.processes):
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.sqlite_dir:
+            shutil.rmtree(self.sqlite_dir, ignore_errors=True)
+        if self.mongo_dir:
+            shutil.rmtree(self.mongo_dir, ignore_errors=True)
+        elif self.mongo_uri:
+            client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+            client.drop_database(self.database)
+            client.close()
+
+class Workload:
+    """Seeded data plus one request builder per endpoint template"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.users = []
+        self.categories = []
+        self.sub_categories = {}
+        self.prompt_ids = []
+        self._next_user = 0
+
+    def new_user(self) -> dict:
+        self._next_user += 1
+        n = self._next_user
+        return {"name": f"Bench User {n}", "phone": f"05{n:08d}", "id_number": f"{n:09d}"}
+
+    async def seed(self, client, categories: int, sub_categories: int, users: int, lessons_per_user: int):
+        for c in range(categories):
+            response = await client.post("/api/categories", json={"name": f"Category {c}"})
+            response.raise_for_status()
+            category_id = response.json()["id"]
+            self.categories.append(category_id)
+            self.sub_categories[category_id] = []
+            for s in range(sub_categories):
+                response = await client.post("/api/sub-categories", json={"name": f"Topic {c}.{s}", "category_id": category_id})
+                response.raise_for_status()
+                self.sub_categories[category_id].append(response.json()["id"])
+
+        for _ in range(users):
+            await self.register(client)
+        for user in list(self.users):
+            for _ in range(lessons_per_user):
+                await self.create_lesson(client, user)
+
+    async def register(self, client):
+        user = self.new_user()
+        response = await client.post("/api/users/register", json=user)
+        if response.status_code == 200:
+            self.users.append({**user, "id": response.json()["user_id"]})
+        return response
+
+    async def create_lesson(self, client, user=None):
+        user = user or self.rng.choice(self.users)
+        category_id = self.rng.choice(self.categories)
+        # TOPICS repeats, so without bypass_cache this would mostly time lesson cache hits
+        response = await client.post("/api/prompts", params={"bypass_cache": "true"}, json={
+            "user_id": user["id"],
+            "category_id": category_id,
+            "sub_category_id": self.rng.choice(self.sub_categories[category_id]),
+            "prompt": f"Teach me about {self.rng.choice(TOPICS)}"
+        })
+        if response.status_code == 200:
+            self.prompt_ids.append(response.json()["id"])
+        return response
+
+    def request(self, client, endpoint: str):
+        if endpoint == "POST /api/users/register":
+            return self.register(client)
+        if endpoint == "POST /api/users/login":
+            user = self.rng.choice(self.users)
+            return client.post("/api/users/login", json={
+                "name": user["name"], "phone": user["phone"], "id_number": user["id_number"]
+            })
+        if endpoint == "GET /api/categories":
+            return client.get("/api/categories")
+        if endpoint == "GET /api/categories/{category_id}/sub-categories":
+            return client.get(f"/api/categories/{self.rng.choice(self.categories)}/sub-categories")
+        if endpoint == "POST /api/prompts":
+            return self.create_lesson(client)
+        if endpoint == "GET /api/users/{user_id}/prompts":
+            return client.get(f"/api/users/{self.rng.choice(self.users)['id']}/prompts")
+        if endpoint == "GET /api/prompts/{prompt_id}":
+            return client.get(f"/api/prompts/{self.rng.choice(self.prompt_ids)}")
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+async def drive(base_url: str, args) -> dict:
+    rng = random.Random(args.seed)
+    workload = Workload(rng)
+    endpoints = list(WORKLOAD)
+    plan = rng.choices(endpoints, weights=[WORKLOAD[e] for e in endpoints], k=args.requests)
+    latencies = {endpoint: [] for endpoint in endpoints}
+    errors = {endpoint: 0 for endpoint in endpoints}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await workload.seed(client, args.categories, args.sub_categories, args.users, args.lessons_per_user)
+
+        queue = asyncio.Queue()
+        for endpoint in plan:
+            queue.put_nowait(endpoint)
+
+        async def worker():
+            while not queue.empty():
+                endpoint = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    response = await workload.request(client, endpoint)
+                    if response.status_code >= 400:
+                        errors[endpoint] += 1
+                except httpx.HTTPError:
+                    errors[endpoint] += 1
+                latencies[endpoint].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = {}
+    for endpoint, samples in latencies.items():
+        if not samples:
+            continue
+        report[endpoint] = {
+            "requests": len(samples),
+            "errors": errors[endpoint],
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        }
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "storage": args.storage,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "overall": {
+            "requests": args.requests,
+            "errors": sum(errors.values()),
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(args.requests / elapsed, 2),
+        },
+        "endpoints": report,
+    }
+
+def find_regressions(result: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Human-readable regressions of `result` against `baseline`"""
+    regressions = []
+    before, after = baseline["overall"]["throughput_rps"], result["overall"]["throughput_rps"]
+    if after < before * (1 - threshold):
+        regressions.append(f"overall throughput {before} -> {after} req/s")
+
+    for endpoint, previous in baseline["endpoints"].items():
+        current = result["endpoints"].get(endpoint)
+        if current is None:
+            continue
+        before, after = previous["p95_ms"], current["p95_ms"]
+        # Ignore sub-millisecond jitter on very fast endpoints
+        if after > before * (1 + threshold) and after - before >= min_delta_ms:
+            regressions.append(f"{endpoint} p95 {before} -> {after} ms")
+    return regressions
+
+def main(args) -> int:
+    stack = Stack(args)
+    try:
+        stack.start()
+        result = asyncio.run(drive(stack.base_url, args))
+    finally:
+        stack.stop()
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(result, baseline, args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage", choices=["mongo", "memory", "sqlite"], default="mongo")
+    parser.add_argument("--mongo-uri", help="use this server instead of spawning mongod; a scratch database is dropped afterwards")
+    parser.add_argument("--mongod", default="mongod", help="mongod binary to spawn")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--sub-categories", type=int, default=4)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--lessons-per-user", type=int, default=3)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed fractional regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Benchmark of POST /api/users/import against one register call per user.
+
+Generates --users synthetic users and uploads them as one streamed NDJSON or
+CSV body. Without --base-url it runs in-process against the users router on
+the embedded in-memory backend; pass --base-url to measure a running server
+(use a scratch database: the users are really created).
+
+    python -m benchmarks.bench_import --users 100000
+    python -m benchmarks.bench_import --base-url http://localhost:8000 --format csv --compare-register 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+def make_users(count: int, seed: int):
+    base = random.Random(seed).randrange(10 ** 6)
+    for i in range(count):
+        n = base * 10 ** 7 + i
+        yield {"name": f"Import User {i}", "phone": f"{n % 10 ** 10:010d}", "id_number": f"{n % 10 ** 9:09d}"}
+
+async def upload_body(users, format: str, chunk_rows: int = 1000):
+    """Yield the upload in chunks, so the client never holds the whole body either"""
+    if format == "csv":
+        yield b"name,phone,id_number\n"
+    chunk = []
+    for user in users:
+        if format == "csv":
+            chunk.append(f"{user['name']},{user['phone']},{user['id_number']}\n")
+        else:
+            chunk.append(json.dumps(user) + "\n")
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk).encode()
+            chunk = []
+    if chunk:
+        yield "".join(chunk).encode()
+
+def in_process_client():
+    from fastapi import FastAPI
+    import routes.users
+    from repositories.embedded import EmbeddedDatabase, EmbeddedUserRepository
+
+    routes.users.users_repository = EmbeddedUserRepository(EmbeddedDatabase(":memory:"))
+    app = FastAPI()
+    app.include_router(routes.users.router, prefix="/api")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+
+async def main(args):
+    client = httpx.AsyncClient(base_url=args.base_url, timeout=None) if args.base_url else in_process_client()
+    results = {}
+    async with client:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/users/import",
+            params={"format": args.format},
+            content=upload_body(make_users(args.users, args.seed), args.format)
+        )
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        report = response.json()
+        results["import"] = {
+            "users": args.users,
+            "format": args.format,
+            "inserted": report["inserted"],
+            "failed": report["failed"],
+            "seconds": round(elapsed, 2),
+            "users_per_second": round(args.users / elapsed, 1),
+        }
+
+        if args.compare_register:
+            users = list(make_users(args.compare_register, args.seed + 1))
+            started = time.perf_counter()
+            for user in users:
+                await client.post("/api/users/register", json=user)
+            elapsed = time.perf_counter() - started
+            results["register"] = {
+                "users": len(users),
+                "seconds": round(elapsed, 2),
+                "users_per_second": round(len(users) / elapsed, 1),
+            }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--compare-register", type=int, default=0,
+                        help="also time this many sequential POST /api/users/register calls")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
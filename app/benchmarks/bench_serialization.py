@@ -0,0 +1,101 @@
+"""
+Micro-benchmark of the list serialization path for list_all_prompts and list_users.
+
+"legacy" reproduces the previous handlers: rewrite `_id` -> `id` in a Python
+loop, run FastAPI's jsonable_encoder and render with the stdlib JSONResponse.
+"fast" is the current path: documents arrive from the `$toString` pipeline
+already carrying a string `id` and are rendered directly by orjson.
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from serialization import FastJSONResponse
+
+LESSON_BODY = "## Introduction\nA lesson body with **markdown** and examples.\n" * 40
+
+def mongo_prompts(rows):
+    started = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "user_id": str(ObjectId()),
+        "category_id": str(ObjectId()),
+        "sub_category_id": str(ObjectId()),
+        "prompt": f"Question number {i}",
+        "response": LESSON_BODY,
+        "created_at": started + timedelta(minutes=i)
+    } for i in range(rows)]
+
+def mongo_users(rows):
+    started = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "name": f"User {i}",
+        "phone": f"05{i:08d}",
+        "id_number": f"{i:09d}",
+        "created_at": started + timedelta(minutes=i)
+    } for i in range(rows)]
+
+def legacy_render(documents, envelope):
+    for document in documents:
+        document["id"] = str(document["_id"])
+        del document["_id"]
+    content = envelope(documents)
+    return JSONResponse(jsonable_encoder(content)).body
+
+def fast_render(documents, envelope):
+    return FastJSONResponse(envelope(documents)).body
+
+def as_pipeline_output(documents):
+    """What the `$toString` pipeline hands back: `id` already a string, no `_id`"""
+    return [{"id": str(d["_id"]), **{k: v for k, v in d.items() if k != "_id"}} for d in documents]
+
+def timed(render, make_documents, envelope, repeat):
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        documents = make_documents()
+        started = time.perf_counter()
+        body = render(documents, envelope)
+        samples.append((time.perf_counter() - started) * 1000)
+        size = len(body)
+    return round(min(samples), 2), size
+
+def main(args):
+    endpoints = {
+        "list_all_prompts": (mongo_prompts, lambda docs: {"prompts": docs, "limit": len(docs), "next_cursor": None, "has_next": False}),
+        "list_users": (mongo_users, lambda docs: {"users": docs, "total": len(docs), "page": 1, "limit": len(docs)}),
+    }
+    results = []
+    for name, (generate, envelope) in endpoints.items():
+        legacy_ms, legacy_bytes = timed(legacy_render, lambda: generate(args.rows), envelope, args.repeat)
+        fast_ms, fast_bytes = timed(fast_render, lambda: as_pipeline_output(generate(args.rows)), envelope, args.repeat)
+        result = {
+            "endpoint": name,
+            "rows": args.rows,
+            "legacy_ms": legacy_ms,
+            "fast_ms": fast_ms,
+            "speedup": round(legacy_ms / fast_ms, 1) if fast_ms else None,
+            "legacy_bytes": legacy_bytes,
+            "fast_bytes": fast_bytes,
+        }
+        print(json.dumps(result))
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output")
+    main(parser.parse_args())
@@ -0,0 +1,107 @@
+"""
+Page-number vs keyset pagination of the users collection at 10k/100k/1M users.
+
+Seeds a scratch database (never the application database) and times, for
+each size, fetching a page near the start, middle and end of the list with
+skip/limit and with a keyset cursor, plus the three total-count modes.
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_users_pagination --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from repositories.users import UserRepository
+
+SEED_BATCH = 10000
+
+class ScratchUserRepository(UserRepository):
+    def __init__(self, collection):
+        self._collection = collection
+
+    @property
+    def collection(self):
+        return self._collection
+
+async def seed(collection, size):
+    existing = await collection.estimated_document_count()
+    if existing == size:
+        return
+    await collection.drop()
+    started = datetime.utcnow() - timedelta(days=365)
+    for offset in range(0, size, SEED_BATCH):
+        batch = []
+        for i in range(offset, min(offset + SEED_BATCH, size)):
+            batch.append({
+                "name": f"User {i:07d}",
+                "phone": f"05{i:08d}",
+                "id_number": f"{i:09d}",
+                "created_at": started + timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+            })
+        await collection.insert_many(batch, ordered=False)
+    await collection.create_index([("created_at", -1), ("_id", -1)])
+
+async def timed(coroutine_factory, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coroutine_factory()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+async def bench_size(repository, size, limit, repeat):
+    result = {"users": size}
+    last_page = max(1, size // limit)
+    for label, page in (("first", 1), ("middle", last_page // 2), ("last", last_page)):
+        skip = (page - 1) * limit
+        result[f"skip_{label}_ms"] = await timed(
+            lambda: repository.list_page({}, "created_at", -1, skip, limit), repeat
+        )
+
+        # Position the keyset cursor on the row just before the page (untimed)
+        anchor = None
+        if skip:
+            before = await repository.list_page({}, "created_at", -1, skip - 1, 1)
+            anchor = (before[0]["created_at"], before[0]["id"])
+        result[f"keyset_{label}_ms"] = await timed(
+            lambda: repository.list_keyset({}, "created_at", -1, limit, after=anchor), repeat
+        )
+
+    result["count_exact_ms"] = await timed(lambda: repository.count({}), repeat)
+    result["count_estimated_ms"] = await timed(lambda: repository.count({}, estimated=True), repeat)
+    return result
+
+async def main(args):
+    client = AsyncIOMotorClient(args.mongo_uri)
+    database = client[args.database]
+    results = []
+    try:
+        for size in args.sizes:
+            collection = database[f"users_{size}"]
+            await seed(collection, size)
+            result = await bench_size(ScratchUserRepository(collection), size, args.limit, args.repeat)
+            print(json.dumps(result))
+            results.append(result)
+    finally:
+        client.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="bench_users_pagination")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Offline stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions, streaming or not, with a canned lesson
+after a fixed latency, so the API can be benchmarked without network access
+or token spend. Point the app at it with OPENAI_BASE_URL:
+
+    python -m benchmarks.fake_llm --port 9100 --latency-ms 200
+    OPENAI_API_KEY=bench OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+LESSON = (
+    "# Lesson\n\n## Introduction\nThis lesson covers the requested topic step by step.\n\n"
+    + "## Key ideas\n" + "Each idea is explained with an example and a short exercise. " * 40
+    + "\n\n## Summary\nReview the key ideas and try the exercises again tomorrow.\n"
+)
+CHUNK_SIZE = 32
+
+def build_app(latency_ms: float, stream_chunks_per_second: float) -> Starlette:
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        model = payload.get("model", "fake-model")
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in payload.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        await asyncio.sleep(latency_ms / 1000)
+
+        if not payload.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": LESSON},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(LESSON.split()),
+                    "total_tokens": prompt_tokens + len(LESSON.split())
+                }
+            })
+
+        async def chunks():
+            delay = 1 / stream_chunks_per_second if stream_chunks_per_second else 0
+            for start in range(0, len(LESSON), CHUNK_SIZE):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": LESSON[start:start + CHUNK_SIZE]},
+                        "finish_reason": None
+                    }]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--stream-chunks-per-second", type=float, default=200)
+    args = parser.parse_args()
+    uvicorn.run(
+        build_app(args.latency_ms, args.stream_chunks_per_second),
+        host=args.host, port=args.port, log_level="warning", access_log=False
+    )
@@ -0,0 +1,173 @@
+"""
+Streaming bulk import for the /import endpoints.
+
+The upload is parsed as it arrives (NDJSON or CSV with a header row), each
+row is validated with its pydantic schema, and valid rows are written in
+unordered insert_many batches of IMPORT_BATCH_SIZE. Memory stays bounded by
+one batch plus at most IMPORT_MAX_REPORTED_ERRORS error entries, whatever
+the size of the upload.
+"""
+import codecs
+import csv
+import logging
+import os
+from typing import AsyncIterator, Callable, Optional
+
+import orjson
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+# For the `format` query parameter of the import endpoints
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+def detect_format(request: Request, format: Optional[str]) -> str:
+    """The explicit ?format=, else the Content-Type, else NDJSON"""
+    if format:
+        return format
+    content_type = request.headers.get("content-type", "")
+    return "csv" if "csv" in content_type else "ndjson"
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, without their line endings"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple]:
+    """(line number, object or error message) per non-blank line"""
+    line_number = 0
+    async for line in read_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, row
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple]:
+    """(line number, object or error message) per CSV record; quoted fields may span lines"""
+    header = None
+    record = []
+    start = 0
+    line_number = 0
+    async for line in read_lines(chunks):
+        line_number += 1
+        if not record:
+            start = line_number
+        record.append(line)
+        text = "\n".join(record)
+        # An odd number of quotes means a quoted field continues on the next line
+        if text.count('"') % 2:
+            continue
+        record = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield start, dict(zip(header, values))
+    if record:
+        yield start, "Unterminated quoted field"
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    )
+
+class ImportReport:
+    """Counts and per-row errors of one import, capped at `max_errors` entries"""
+
+    def __init__(self, format: str, max_errors: int):
+        self.format = format
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "success": self.failed == 0,
+            "format": self.format,
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+async def import_rows(request: Request, format: str, schema: type, repository,
+                      to_document: Callable[[BaseModel], dict],
+                      duplicate_message: str = "Duplicate key",
+                      batch_size: int = None) -> ImportReport:
+    """Validate and insert every row of the request body, batch by batch"""
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    report = ImportReport(format, IMPORT_MAX_REPORTED_ERRORS)
+    parse = csv_rows if format == "csv" else ndjson_rows
+    batch = []
+
+    async def flush():
+        ids = await repository.insert_many([document for _, document in batch])
+        for (row, _), document_id in zip(batch, ids):
+            if document_id is None:
+                report.error(row, duplicate_message)
+            else:
+                report.inserted += 1
+        batch.clear()
+
+    try:
+        async for row, value in parse(request.stream()):
+            report.received += 1
+            if isinstance(value, str):
+                report.error(row, value)
+                continue
+            try:
+                batch.append((row, to_document(schema(**value))))
+            except ValidationError as e:
+                report.error(row, validation_message(e))
+                continue
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Upload is not valid UTF-8; {report.inserted} rows were imported before the error"
+        )
+
+    logger.info(
+        "Bulk import finished",
+        extra={"collection": repository.collection_name, "received": report.received,
+               "inserted": report.inserted, "failed": report.failed}
+    )
+    return report
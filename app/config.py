@@ -1,25 +1,20 @@
 import os
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# mongo, or the embedded engine: memory (per process) or sqlite (SQLITE_PATH)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "learning_platform.db")
+
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
 
-if not MONGO_URI:
-    raise ValueError("MONGO_URI not found in .env file")
-if not MONGO_DB:
-    raise ValueError("MONGO_DB not found in .env file")
-
-print(f"DEBUG MONGO_URI = {MONGO_URI}")
-print(f"DEBUG MONGO_DB = {MONGO_DB}")
-
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=10000)
-    client.admin.command('ping')
-    print("MongoDB Atlas connected successfully!")
-    db = client[MONGO_DB]
-except Exception as e:
-    print(f"MongoDB connection failed: {e}")
-    raise Exception(f"Cannot connect to MongoDB: {e}")
\ No newline at end of file
+# Motor connection pool. The client is created in the app lifespan
+# (database.connect), never at import time.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
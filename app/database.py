@@ -0,0 +1,59 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import (
+    MONGO_URI,
+    MONGO_DB,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+)
+from metrics import mongo_command_listener
+
+_client = None
+
+def connect() -> AsyncIOMotorClient:
+    """
+    Create the shared Motor client. Called from the app lifespan; creating
+    the client does no I/O, connections are opened by the first command.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    if not MONGO_URI:
+        raise ValueError("MONGO_URI not found in .env file")
+    if not MONGO_DB:
+        raise ValueError("MONGO_DB not found in .env file")
+
+    _client = AsyncIOMotorClient(
+        MONGO_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        event_listeners=[mongo_command_listener]
+    )
+    return _client
+
+def get_client() -> AsyncIOMotorClient:
+    """Return the shared Motor client; scripts outside the app get one on first use"""
+    return _client if _client is not None else connect()
+
+def get_database():
+    return get_client()[MONGO_DB]
+
+def get_collection(name: str):
+    return get_database()[name]
+
+async def ping() -> bool:
+    await get_database().command("ping")
+    return True
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
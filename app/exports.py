@@ -0,0 +1,115 @@
+"""
+Streaming NDJSON/CSV export of stored lessons.
+
+Rows are encoded as the repository cursor yields them and sent in chunks of
+about EXPORT_CHUNK_BYTES, optionally gzipped on the fly, so memory use does
+not depend on how many lessons are exported.
+"""
+import csv
+import io
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from compression import Compressor
+from services.taxonomy_cache import taxonomy_cache
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+# For the `format` query parameter of the export endpoints
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+COLUMNS = (
+    "id", "user_id", "category_id", "category_name", "sub_category_id", "sub_category_name",
+    "prompt", "response", "created_at",
+)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+async def export_rows(lessons: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """Lessons reduced to COLUMNS, with category names from the taxonomy cache"""
+    async for lesson in lessons:
+        row = {name: lesson.get(name) for name in COLUMNS}
+        row["category_name"] = await taxonomy_cache.category_name(lesson.get("category_id")) or None
+        row["sub_category_name"] = await taxonomy_cache.sub_category_name(lesson.get("sub_category_id")) or None
+        yield row
+
+def csv_line(row: dict) -> str:
+    buffer = io.StringIO()
+    values = [row[name].isoformat() if isinstance(row[name], datetime) else row[name] for name in COLUMNS]
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+async def encode_rows(rows: AsyncIterator[dict], format: str) -> AsyncIterator[bytes]:
+    """Encoded rows, gathered into chunks of about EXPORT_CHUNK_BYTES"""
+    chunk = []
+    size = 0
+    if format == "csv":
+        header = ",".join(COLUMNS) + "\r\n"
+        chunk.append(header.encode())
+        size = len(header)
+    async for row in rows:
+        if format == "csv":
+            data = csv_line(row).encode()
+        else:
+            data = orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+        chunk.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"".join(chunk)
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = Compressor("gzip")
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+async def logged(chunks: AsyncIterator[bytes], name: str) -> AsyncIterator[bytes]:
+    """Headers are already sent once streaming starts, so a failure can only cut the export short"""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        logger.exception("Export %s failed while streaming", name)
+        raise
+
+def export_response(lessons: AsyncIterator[dict], format: str, gzip: bool, name: str) -> StreamingResponse:
+    chunks = encode_rows(export_rows(lessons), format)
+    # Path parameters end up in the header, so keep the file name to plain ASCII
+    safe_name = re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    filename = f"{safe_name}-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        logged(chunks, name),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def as_stored_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Lessons store naive UTC times; convert an aware `from`/`to` bound to match"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def export_query(user_id: Optional[str] = None, category_id: Optional[str] = None,
+                 sub_category_id: Optional[str] = None) -> dict:
+    query = {"user_id": user_id, "category_id": category_id, "sub_category_id": sub_category_id}
+    return {name: value for name, value in query.items() if value is not None}
@@ -0,0 +1,109 @@
+"""
+Cached database readiness for the /readyz and /health probes.
+
+A background task pings the storage backend every READINESS_REFRESH_SECONDS
+with a short timeout and keeps the last result, so probes answer from
+memory: they add no load to the database and never hang when it is slow. A result older than
+READINESS_MAX_AGE_SECONDS counts as not ready, in case the checker itself
+has stopped. Until the unique indexes that reject duplicate users are
+found, each check also looks for them, and the app is not ready without them.
+"""
+import asyncio
+import logging
+import os
+import time
+from indexes import missing_unique_indexes
+from repositories import storage
+
+logger = logging.getLogger(__name__)
+
+READINESS_REFRESH_SECONDS = float(os.getenv("READINESS_REFRESH_SECONDS", "5"))
+READINESS_PING_TIMEOUT_SECONDS = float(os.getenv("READINESS_PING_TIMEOUT_SECONDS", "2"))
+READINESS_MAX_AGE_SECONDS = float(os.getenv("READINESS_MAX_AGE_SECONDS", str(3 * READINESS_REFRESH_SECONDS)))
+
+class DatabaseHealth:
+    """Periodically refreshed result of a storage ping"""
+
+    def __init__(self, refresh_seconds: float, ping_timeout: float, max_age: float, ping=None,
+                 missing_indexes=None):
+        self.refresh_seconds = refresh_seconds
+        self.ping_timeout = ping_timeout
+        self.max_age = max_age
+        self._ping = ping or storage.ping
+        self._missing_indexes = missing_indexes
+        # Indexes are not dropped at runtime, so once found they are not looked up again
+        self.indexes_ok = missing_indexes is None
+        self._task = None
+        self.reachable = False
+        self.ok = False
+        self.error = "not checked yet"
+        self.latency_ms = None
+        self.checked_at = None
+
+    async def start(self):
+        """Run the first check before serving, then keep refreshing in the background"""
+        await self.check()
+        self._task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def check(self):
+        started = time.perf_counter()
+        self.reachable = False
+        try:
+            await asyncio.wait_for(self._ping(), self.ping_timeout)
+            self.reachable = True
+            if not self.indexes_ok:
+                await self._check_indexes()
+        except Exception as e:
+            if self.ok or self.checked_at is None:
+                logger.warning("Database is not ready: %s", e)
+            self.ok = False
+            self.error = str(e) or type(e).__name__
+        else:
+            if not self.ok and self.checked_at is not None:
+                logger.info("Database is ready again")
+            self.ok = True
+            self.error = None
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.checked_at = time.monotonic()
+
+    async def _check_indexes(self):
+        missing = await asyncio.wait_for(self._missing_indexes(), self.ping_timeout)
+        if missing:
+            raise RuntimeError(
+                f"missing unique indexes {', '.join(missing)}; "
+                "remove the duplicates and run 'python manage.py ensure-indexes'"
+            )
+        self.indexes_ok = True
+
+    async def _refresh(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.check()
+
+    def is_ready(self) -> bool:
+        return (
+            self.ok
+            and self.checked_at is not None
+            and time.monotonic() - self.checked_at <= self.max_age
+        )
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "error": self.error,
+            "latency_ms": self.latency_ms,
+            "age_seconds": round(time.monotonic() - self.checked_at, 2) if self.checked_at is not None else None,
+        }
+
+database_health = DatabaseHealth(
+    READINESS_REFRESH_SECONDS,
+    READINESS_PING_TIMEOUT_SECONDS,
+    READINESS_MAX_AGE_SECONDS,
+    missing_indexes=missing_unique_indexes
+)
@@ -0,0 +1,37 @@
+"""
+Helpers for ETag / If-None-Match handling on read endpoints.
+"""
+import hashlib
+import json
+from fastapi import Request, Response
+
+# Taxonomy lists change rarely but must show admin edits at once: browsers
+# keep a copy but revalidate it on every use, which costs a 304 at most.
+TAXONOMY_CACHE_CONTROL = "no-cache"
+# A stored lesson is never modified, so its representation is immutable.
+LESSON_CACHE_CONTROL = "private, max-age=86400, immutable"
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag from a hash of an already rendered response body"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def content_etag(data) -> str:
+    """Strong ETag from a hash of the JSON representation of `data`"""
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return body_etag(payload.encode("utf-8"))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match lists `etag` (weak comparison, as RFC 9110 requires)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
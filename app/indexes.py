@@ -0,0 +1,72 @@
+"""
+Index registry: every repository declares the indexes its queries need
+(`MongoRepository.indexes`) and ensure_indexes() creates them. Creating an
+index that already exists with the same options is a no-op, so this runs on
+every startup and from `python manage.py ensure-indexes`.
+"""
+import os
+import logging
+from pymongo.errors import OperationFailure
+from repositories import (
+    users_repository,
+    categories_repository,
+    sub_categories_repository,
+    prompts_repository,
+    lesson_cache_repository,
+    lesson_jobs_repository,
+    rate_limits_repository,
+)
+
+logger = logging.getLogger(__name__)
+
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+INDEXED_REPOSITORIES = [
+    users_repository,
+    categories_repository,
+    sub_categories_repository,
+    prompts_repository,
+    lesson_cache_repository,
+    lesson_jobs_repository,
+    rate_limits_repository,
+]
+
+def index_registry() -> dict:
+    """Collection name -> declared IndexModel list"""
+    return {
+        repository.collection_name: repository.indexes
+        for repository in INDEXED_REPOSITORIES
+        if repository.indexes
+    }
+
+def unique_index_names(repository) -> list:
+    return [index.document["name"] for index in repository.indexes if index.document.get("unique")]
+
+async def missing_unique_indexes() -> list:
+    """
+    Declared unique indexes that do not exist, as "collection.index". Duplicate
+    users are only rejected by these, so the app is not ready without them.
+    """
+    missing = []
+    for repository in INDEXED_REPOSITORIES:
+        names = unique_index_names(repository)
+        if not names:
+            continue
+        present = await repository.index_names()
+        missing.extend(f"{repository.collection_name}.{name}" for name in names if name not in present)
+    return missing
+
+async def ensure_indexes() -> dict:
+    """Create every declared index; returns the created index names or the error per collection"""
+    results = {}
+    for repository in INDEXED_REPOSITORIES:
+        if not repository.indexes:
+            continue
+        try:
+            results[repository.collection_name] = await repository.ensure_indexes()
+        except OperationFailure as e:
+            # Typically existing duplicates blocking a unique index; the app
+            # keeps running on the remaining indexes until the data is fixed.
+            logger.error("Could not ensure indexes on %s: %s", repository.collection_name, e)
+            results[repository.collection_name] = f"error: {e}"
+    return results
@@ -0,0 +1,202 @@
+"""
+Structured JSON-lines logging.
+
+setup_logging() puts a QueueHandler on the root logger and does the actual
+formatting and writing on a QueueListener thread, so a log call on the
+request path only enqueues a record. RequestLoggingMiddleware assigns each
+request a correlation id (taken from X-Request-ID when the client sends one),
+echoes it back, and writes one access line with the status and duration.
+Successful requests can be sampled with LOG_SUCCESS_SAMPLE_RATE; errors and
+slow requests are always logged.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+LOG_REQUEST_HEADERS = os.getenv("LOG_REQUEST_HEADERS", "false").lower() == "true"
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+REDACTED_HEADERS = frozenset({
+    "authorization",
+    "proxy-authorization",
+    "cookie",
+    "set-cookie",
+    "x-api-key",
+})
+REDACTED = "[REDACTED]"
+
+correlation_id: ContextVar = ContextVar("correlation_id", default=None)
+
+access_logger = logging.getLogger("access")
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "correlation_id"
+}
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, correlation id and `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "correlation_id", None)
+        if request_id:
+            entry["correlation_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records for the listener thread. The correlation id is read here,
+    in the logging task, because the context variable is not visible from the
+    listener thread; the message is rendered now so mutable arguments cannot
+    change before it is written.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.correlation_id = correlation_id.get()
+        return record
+
+def setup_logging(level: str = LOG_LEVEL, stream=None):
+    """Route the root logger through a background JSON-lines writer; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(records))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def redact_headers(headers) -> dict:
+    """Decode ASGI headers, hiding credentials"""
+    redacted = {}
+    for name, value in headers:
+        name = name.decode("latin-1").lower()
+        redacted[name] = REDACTED if name in REDACTED_HEADERS else value.decode("latin-1")
+    return redacted
+
+def should_log(status: int, duration_ms: float, sample_rate: float = LOG_SUCCESS_SAMPLE_RATE) -> bool:
+    """Errors and slow requests are always logged; other responses are sampled"""
+    if status >= 400 or duration_ms >= LOG_SLOW_REQUEST_MS:
+        return True
+    return sample_rate >= 1.0 or random.random() < sample_rate
+
+def _request_id(headers) -> str:
+    for name, value in headers:
+        if name == REQUEST_ID_HEADER:
+            request_id = value.decode("latin-1").strip()
+            if 0 < len(request_id) <= MAX_REQUEST_ID_LENGTH and request_id.isprintable():
+                return request_id
+            break
+    return uuid.uuid4().hex
+
+class RequestLoggingMiddleware:
+    """ASGI middleware setting the correlation id and writing one access log line per request"""
+
+    def __init__(self, app, sample_rate: float = LOG_SUCCESS_SAMPLE_RATE, log_headers: bool = LOG_REQUEST_HEADERS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.log_headers = log_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope["headers"])
+        # Each request runs in its own task, so the id needs no reset and is
+        # still set when the outer server-error handler logs a crash.
+        correlation_id.set(request_id)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if should_log(status, duration_ms, self.sample_rate):
+                self._log(scope, status, duration_ms)
+
+    def _log(self, scope, status: int, duration_ms: float):
+        if status >= 500:
+            level = logging.ERROR
+        elif status >= 400:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        if not access_logger.isEnabledFor(level):
+            return
+
+        # The query string is left out: it can carry search terms and cursors
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+        }
+        client = scope.get("client")
+        if client:
+            fields["client"] = client[0]
+        if self.log_headers:
+            fields["headers"] = redact_headers(scope["headers"])
+        access_logger.log(level, "%s %s %s", scope["method"], scope["path"], status, extra=fields)
@@ -1,16 +1,51 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
 from routes import users, categories, sub_categories, prompts
-import traceback
+from repositories import storage
+from health import database_health
+from services.ai_service import generation_load
+from services.lesson_jobs import lesson_job_queue
+from indexes import ensure_indexes, ENSURE_INDEXES_ON_STARTUP
+from compression import CompressionMiddleware
+from serialization import FastJSONResponse
+from logging_config import setup_logging, RequestLoggingMiddleware
+from metrics import registry, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import logging
 import os
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    storage.connect()
+    await database_health.start()
+    if ENSURE_INDEXES_ON_STARTUP:
+        if database_health.reachable:
+            try:
+                await ensure_indexes()
+            except Exception:
+                logger.exception("Index bootstrap failed")
+            # Ready only once the unique indexes exist; /readyz reports what is missing
+            await database_health.check()
+        else:
+            logger.warning("Skipping index bootstrap, database unreachable; run 'python manage.py ensure-indexes' later")
+    await lesson_job_queue.start()
+    yield
+    await lesson_job_queue.stop()
+    await database_health.stop()
+    storage.close_client()
+
 app = FastAPI(
     title="AI Learning Platform API",
     description="API for AI-driven learning platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -21,17 +56,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all incoming requests for debugging"""
-    print(f"Incoming request: {request.method} {request.url}")
-    print(f"Headers: {dict(request.headers)}")
-    
-    response = await call_next(request)
-    print(f"Response status: {response.status_code}")
-    
-    return response
-
 @app.middleware("http")
 async def add_cors_headers(request: Request, call_next):
     """Add CORS headers to all responses"""
@@ -44,11 +68,20 @@ async def add_cors_headers(request: Request, call_next):
     
     return response
 
+# Added after the CORS layers so it wraps them: the final body and headers
+# are what gets compressed.
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Outermost, so the correlation id is set for everything below and the
+# logged duration covers the whole request including compression.
+app.add_middleware(RequestLoggingMiddleware)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    print(f"Global Exception: {exc}")
-    print(f"Request: {request.method} {request.url}")
-    print(f"Traceback: {traceback.format_exc()}")
+    logger.error(
+        "Unhandled exception on %s %s", request.method, request.url.path,
+        exc_info=(type(exc), exc, exc.__traceback__)
+    )
     
     return JSONResponse(
         status_code=500,
@@ -62,8 +95,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    print(f"HTTP Exception: {exc.detail}")
-    print(f"Request: {request.method} {request.url}")
+    logger.debug("HTTP %s on %s %s: %s", exc.status_code, request.method, request.url.path, exc.detail)
     
     return JSONResponse(
         status_code=exc.status_code,
@@ -72,7 +104,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "error": exc.detail,
             "status_code": exc.status_code,
             "path": str(request.url)
-        }
+        },
+        headers=exc.headers
     )
 
 app.include_router(users.router, prefix="/api", tags=["users"])
@@ -92,26 +125,45 @@ def read_root():
             "users_login": "POST /api/users/login",
             "users_list": "GET /api/users",
             "categories": "GET /api/categories",
-            "health": "GET /health"
+            "health": "GET /health",
+            "liveness": "GET /livez",
+            "readiness": "GET /readyz"
         }
     }
 
+@app.get("/livez")
+def liveness():
+    """Liveness probe: the process is serving requests; does no I/O"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readiness():
+    """Readiness probe, answered from the background database check"""
+    status = database_health.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @app.get("/health")
-def health_check():
-    try:
-        from config import db
-        db.command('ping')
+async def health_check():
+    """Detailed status; the database state comes from the cached readiness check"""
+    if database_health.is_ready():
         db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
+    else:
+        db_status = f"error: {database_health.error or 'stale readiness check'}"
     
     return {
         "status": "healthy",
         "message": "API is running",
         "database": db_status,
-        "openai": "configured" if os.getenv("OPENAI_API_KEY") else "not configured"
+        "openai": "configured" if os.getenv("OPENAI_API_KEY") else "not configured",
+        "lesson_generation": generation_load(),
+        "lesson_jobs": lesson_job_queue.stats()
     }
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.options("/{full_path:path}")
 async def options_handler(request: Request):
     return JSONResponse(
@@ -137,8 +189,8 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
     
-    print(f"Starting AI Learning Platform API on {host}:{port}")
-    print(f"Available at: http://localhost:{port}")
-    print(f"API Documentation: http://localhost:{port}/docs")
+    logger.info("Starting AI Learning Platform API on %s:%s", host, port)
+    logger.info("API Documentation: http://localhost:%s/docs", port)
     
-    uvicorn.run(app, host=host, port=port, reload=True)
\ No newline at end of file
+    # Requests are logged by RequestLoggingMiddleware
+    uvicorn.run(app, host=host, port=port, reload=True, access_log=False)
\ No newline at end of file
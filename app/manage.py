@@ -0,0 +1,68 @@
+"""
+Maintenance commands, run from the app directory:
+
+    python manage.py ensure-indexes
+    python manage.py backfill-user-search-fields
+    python manage.py backfill-id-numbers --file id_numbers.csv
+
+backfill-id-numbers is the one-off migration for legacy users created
+before ID numbers were required. The CSV has `phone` and `id_number`
+columns. Users that already have an ID number are left unchanged.
+
+Until it runs, a legacy user logs in with name and phone and whatever ID
+number they give. That first login records the ID number, and later
+logins must match it. Run the backfill where the real ID numbers are known,
+to close this window before anyone else claims them.
+
+ensure-indexes also creates the unique phone and id_number indexes that
+reject duplicate users. /readyz answers 503 until they exist.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+
+from repositories import storage
+from indexes import ensure_indexes
+from repositories import users_repository
+
+async def run_ensure_indexes(args):
+    results = await ensure_indexes()
+    print(json.dumps(results, indent=2))
+
+async def run_backfill_user_search_fields(args):
+    updated = await users_repository.backfill_search_fields()
+    print(f"Backfilled search fields on {updated} users")
+
+def read_id_numbers(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            phone = (row.get("phone") or "").replace("-", "").replace(" ", "")
+            id_number = (row.get("id_number") or "").strip()
+            if phone and id_number:
+                yield phone, id_number
+
+async def run_backfill_id_numbers(args):
+    if not args.file:
+        sys.exit("backfill-id-numbers needs --file")
+    result = await users_repository.backfill_id_numbers(read_id_numbers(args.file))
+    print(f"Set ID numbers on {result['updated']} users, skipped {result['duplicates']} already taken")
+
+COMMANDS = {
+    "ensure-indexes": run_ensure_indexes,
+    "backfill-user-search-fields": run_backfill_user_search_fields,
+    "backfill-id-numbers": run_backfill_id_numbers,
+}
+
+async def main(args):
+    try:
+        await COMMANDS[args.command](args)
+    finally:
+        storage.close_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--file", help="CSV input for backfill-id-numbers")
+    asyncio.run(main(parser.parse_args()))
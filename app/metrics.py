@@ -0,0 +1,269 @@
+"""
+Prometheus metrics, rendered in the text exposition format by GET /metrics.
+
+Instruments keep their values in per-thread shards: the event loop and the
+threads Motor runs pymongo on each update their own dict without taking a
+lock, and a scrape sums the shards. Histograms store one count per bucket
+and only cumulate at render time. Counters the application already keeps
+(lesson cache hits, generation load) are read at scrape time through
+CallbackMetric instead of being counted twice.
+"""
+import threading
+import time
+from bisect import bisect_left
+from pymongo import monitoring
+
+# Seconds; spans a fast Mongo command to a slow LLM completion
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Starlette appends the utf-8 charset to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Sharded:
+    """Per-thread dicts of label values -> state, merged when collected"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            # Once per thread; every later update is lock-free
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            yield list(shard.items())
+
+class Counter(_Sharded):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labelvalues, amount: float = 1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def values(self) -> dict:
+        totals = {}
+        for items in self._snapshots():
+            for labelvalues, value in items:
+                totals[labelvalues] = totals.get(labelvalues, 0) + value
+        return totals
+
+    def collect(self):
+        for labelvalues, value in sorted(self.values().items()):
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+
+class Histogram(_Sharded):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard()
+        state = shard.get(labelvalues)
+        if state is None:
+            # Bucket counts, then +Inf, then the running sum
+            state = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def values(self) -> dict:
+        totals = {}
+        for items in self._snapshots():
+            for labelvalues, state in items:
+                merged = totals.get(labelvalues)
+                if merged is None:
+                    totals[labelvalues] = list(state)
+                else:
+                    for index, value in enumerate(state):
+                        merged[index] += value
+        return totals
+
+    def collect(self):
+        bounds = self.buckets + (float("inf"),)
+        for labelvalues, state in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            labels = _labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_number(state[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class CallbackMetric:
+    """Counter or gauge whose samples are read from `callback` at scrape time"""
+
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self):
+        for labelvalues, value in self.callback():
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, metric_type: str, labelnames, callback) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, metric_type, labelnames, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ("method", "route", "status")
+)
+MONGO_COMMAND_SECONDS = registry.histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ("collection", "command")
+)
+MONGO_COMMAND_FAILURES = registry.counter(
+    "mongodb_command_failures_total",
+    "Failed MongoDB commands by collection and command",
+    ("collection", "command")
+)
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_duration_seconds",
+    "Upstream LLM call latency; streams are timed until the last chunk",
+    ("operation", "outcome")
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ("model", "kind")
+)
+LLM_ERRORS = registry.counter(
+    "llm_errors_total",
+    "Failed upstream LLM calls by exception type",
+    ("operation", "error")
+)
+LESSON_FALLBACKS = registry.counter(
+    "lesson_mock_fallbacks_total",
+    "Lessons served by the mock generator instead of the LLM",
+    ("operation", "reason")
+)
+LESSON_REJECTIONS = registry.counter(
+    "lesson_capacity_rejections_total",
+    "Lesson requests rejected because the generation queue was full or timed out"
+)
+RATE_LIMITED = registry.counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by rate limit policy and bucket scope",
+    ("policy", "scope")
+)
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request by method, matched route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; using its
+            # template keeps /api/users/{user_id} to a single series.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], template, str(status))
+
+class MongoCommandListener(monitoring.CommandListener):
+    """pymongo command monitoring feeding MONGO_COMMAND_SECONDS"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        if event.command_name == "getMore":
+            collection = event.command.get("collection", "")
+        else:
+            collection = event.command.get(event.command_name, "")
+        if not isinstance(collection, str):
+            collection = ""
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(collection, event.command_name)
+
+mongo_command_listener = MongoCommandListener()
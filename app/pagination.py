@@ -0,0 +1,31 @@
+import base64
+from bson import ObjectId, json_util
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the query"""
+
+def encode_cursor(sort_by: str, value, document_id: str, direction: str) -> str:
+    """
+    Build an opaque keyset cursor pointing at one document.
+    `direction` is "next" (rows after the document) or "prev" (rows before it).
+    """
+    payload = json_util.dumps({"s": sort_by, "v": value, "id": document_id, "d": direction})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        position = {"value": payload["v"], "id": payload["id"], "direction": payload["d"]}
+        cursor_sort_by = payload["s"]
+    except Exception:
+        raise InvalidCursorError("Invalid pagination cursor")
+
+    if cursor_sort_by != sort_by:
+        raise InvalidCursorError("Pagination cursor was issued for a different sort order")
+    if position["direction"] not in ("next", "prev"):
+        raise InvalidCursorError("Invalid pagination cursor")
+    # The id goes straight into ObjectId() when the page is queried
+    if not isinstance(position["id"], str) or not ObjectId.is_valid(position["id"]):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return position
@@ -0,0 +1,199 @@
+"""
+Token-bucket rate limiting for the expensive routes.
+
+A route names the policy it enforces (rate_limiter.check), so routes that
+spend the same resource share buckets. A policy has an optional per-user
+bucket and an optional global one. Each is configured from the environment
+as "<requests>/<seconds>[:<burst>]", and an empty value turns it off.
+Buckets live in this process by default. Set RATE_LIMIT_BACKEND=shared to
+keep them in the database, so that every worker enforces the same quota.
+A request over its quota gets 429 with Retry-After.
+"""
+import logging
+import math
+import os
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from auth import decode_access_token
+from metrics import RATE_LIMITED
+from repositories import rate_limits_repository
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+class Limit:
+    """Refill `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+
+    def __repr__(self):
+        return f"Limit(rate={self.rate!r}, burst={self.burst!r})"
+
+def parse_limit(spec: str) -> Optional[Limit]:
+    """Parse "<requests>/<seconds>[:<burst>]"; the burst defaults to <requests>"""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    quota, _, burst = spec.partition(":")
+    requests, _, seconds = quota.partition("/")
+    try:
+        requests, seconds = float(requests), float(seconds or 1)
+        burst = float(burst) if burst else requests
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected <requests>/<seconds>[:<burst>]")
+    if requests <= 0 or seconds <= 0 or burst < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}, values must be positive")
+    return Limit(requests / seconds, burst)
+
+class RateLimitPolicy:
+    def __init__(self, name: str, per_user: Optional[Limit] = None, overall: Optional[Limit] = None):
+        self.name = name
+        self.per_user = per_user
+        self.overall = overall
+
+def policy_from_env(name: str, per_user: str, overall: str) -> RateLimitPolicy:
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return RateLimitPolicy(
+        name,
+        per_user=parse_limit(os.getenv(f"{prefix}_PER_USER", per_user)),
+        overall=parse_limit(os.getenv(f"{prefix}_GLOBAL", overall)),
+    )
+
+RATE_LIMIT_POLICIES = {
+    # POST /api/prompts (also with ?async=true) and POST /api/prompts/stream
+    "lessons": policy_from_env("lessons", per_user="10/60", overall="120/60"),
+    # POST /api/prompts/batch, one token per prompt in the batch
+    "lesson_batches": policy_from_env("lesson_batches", per_user="200/3600", overall="1000/3600"),
+}
+
+class MemoryBuckets:
+    """Token buckets of this process; a bucket is (tokens, updated_at, full_at)"""
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._buckets = {}
+
+    async def take(self, key: str, limit: Limit, cost: float = 1) -> float:
+        return self.take_now(key, limit, cost, time.monotonic())
+
+    def take_now(self, key: str, limit: Limit, cost: float, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(now)
+            tokens = limit.burst
+        else:
+            tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens = min(limit.burst, tokens - cost)
+        else:
+            wait = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+        return wait
+
+    def _prune(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        # Still full of active buckets: forget the oldest, which can only err towards allowing
+        while len(self._buckets) >= self.max_buckets:
+            del self._buckets[next(iter(self._buckets))]
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+class SharedBuckets:
+    """Token buckets in the rate_limits collection, shared by every worker"""
+
+    async def take(self, key: str, limit: Limit, cost: float = 1) -> float:
+        try:
+            return await rate_limits_repository.take(key, limit.rate, limit.burst, cost)
+        except Exception as e:
+            # Losing the limiter must not take lesson creation down with it
+            logger.warning("Rate limit backend failed, allowing the request: %s", e)
+            return 0.0
+
+def too_many_requests(policy: str, wait: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Rate limit exceeded for {policy}, retry in {math.ceil(wait)}s",
+        headers={"Retry-After": str(max(1, math.ceil(wait)))}
+    )
+
+class RateLimiter:
+    def __init__(self, policies: dict, buckets, enabled: bool = True):
+        self.policies = policies
+        self.buckets = buckets
+        self.enabled = enabled
+
+    async def check(self, policy_name: str, identity: str, cost: float = 1):
+        """Take `cost` tokens from every one of the policy's buckets, or from none and raise 429"""
+        if not self.enabled:
+            return
+        policy = self.policies[policy_name]
+        buckets = [
+            (scope, limit, key)
+            for scope, limit, key in (
+                ("user", policy.per_user, f"{policy.name}:user:{identity}"),
+                ("global", policy.overall, f"{policy.name}:global"),
+            )
+            if limit is not None
+        ]
+        for scope, limit, key in buckets:
+            if cost > limit.burst:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"This request needs {cost:g} {policy.name} tokens but the {scope} quota allows {limit.burst:g}"
+                )
+        taken = []
+        for scope, limit, key in buckets:
+            wait = await self.buckets.take(key, limit, cost)
+            if wait > 0:
+                # Give back what the earlier buckets charged, so a global overload does not drain user quotas
+                for taken_limit, taken_key in taken:
+                    await self.buckets.take(taken_key, taken_limit, -cost)
+                RATE_LIMITED.inc(policy.name, scope)
+                raise too_many_requests(policy.name, wait)
+            taken.append((limit, key))
+
+def request_identity(request: Request, user_ids=()) -> str:
+    """
+    The key of the caller's per-user buckets: the JWT subject when a valid
+    bearer token is sent, else the client address. The user ids in the body
+    are never used, since a client could send a new one with every request;
+    with a token they must all be the subject's.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = decode_access_token(token)
+        except HTTPException:
+            subject = None
+        if subject is not None:
+            if any(user_id != subject for user_id in user_ids):
+                raise HTTPException(status_code=403, detail="Lessons can only be created for the signed-in user")
+            return subject
+    return f"ip:{request.client.host}" if request.client else "anonymous"
+
+def create_buckets(backend: str):
+    if backend == "memory":
+        return MemoryBuckets(RATE_LIMIT_MAX_BUCKETS)
+    if backend == "shared":
+        return SharedBuckets()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r}, expected memory or shared")
+
+rate_limiter = RateLimiter(RATE_LIMIT_POLICIES, create_buckets(RATE_LIMIT_BACKEND), RATE_LIMIT_ENABLED)
@@ -0,0 +1,46 @@
+from config import STORAGE_BACKEND, SQLITE_PATH
+from repositories.users import UserRepository
+from repositories.categories import CategoryRepository
+from repositories.sub_categories import SubCategoryRepository
+from repositories.prompts import PromptRepository
+from repositories.lesson_cache import LessonCacheRepository
+from repositories.lesson_jobs import LessonJobRepository
+from repositories.taxonomy import TaxonomyVersionRepository
+from repositories.rate_limits import RateLimitRepository
+
+if STORAGE_BACKEND == "mongo":
+    # The database module provides the connect/ping/close_client lifecycle
+    import database as storage
+
+    users_repository = UserRepository()
+    categories_repository = CategoryRepository()
+    sub_categories_repository = SubCategoryRepository()
+    prompts_repository = PromptRepository()
+    lesson_cache_repository = LessonCacheRepository()
+    lesson_jobs_repository = LessonJobRepository()
+    taxonomy_version_repository = TaxonomyVersionRepository()
+    rate_limits_repository = RateLimitRepository()
+elif STORAGE_BACKEND in ("memory", "sqlite"):
+    from repositories.embedded import (
+        EmbeddedDatabase,
+        EmbeddedUserRepository,
+        EmbeddedCategoryRepository,
+        EmbeddedSubCategoryRepository,
+        EmbeddedPromptRepository,
+        EmbeddedLessonCacheRepository,
+        EmbeddedLessonJobRepository,
+        EmbeddedTaxonomyVersionRepository,
+        EmbeddedRateLimitRepository,
+    )
+
+    storage = EmbeddedDatabase(":memory:" if STORAGE_BACKEND == "memory" else SQLITE_PATH)
+    users_repository = EmbeddedUserRepository(storage)
+    categories_repository = EmbeddedCategoryRepository(storage)
+    sub_categories_repository = EmbeddedSubCategoryRepository(storage)
+    prompts_repository = EmbeddedPromptRepository(storage)
+    lesson_cache_repository = EmbeddedLessonCacheRepository(storage)
+    lesson_jobs_repository = EmbeddedLessonJobRepository(storage)
+    taxonomy_version_repository = EmbeddedTaxonomyVersionRepository(storage)
+    rate_limits_repository = EmbeddedRateLimitRepository(storage)
+else:
+    raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected mongo, memory or sqlite")
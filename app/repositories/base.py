@@ -0,0 +1,117 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import database
+
+def serialize_document(document):
+    """Replace Mongo's ObjectId `_id` with a string `id` field"""
+    if document is None:
+        return None
+    document["id"] = str(document["_id"])
+    del document["_id"]
+    return document
+
+def public_id_stages(projection=None) -> list:
+    """
+    Pipeline stages doing the `_id` -> string `id` mapping inside Mongo, so list
+    results arrive ready to serialize. `projection` is either an inclusion
+    projection (possibly with computed fields) or fields to hide.
+    """
+    public_id = {"$toString": "$_id"}
+    if projection and any(value != 0 for value in projection.values()):
+        return [{"$project": {**projection, "id": public_id, "_id": 0}}]
+    return [{"$set": {"id": public_id}}, {"$unset": ["_id", *(projection or {})]}]
+
+class MongoRepository:
+    """Base class for repositories backed by a single Motor collection"""
+    collection_name: str = ""
+    # Indexes required by this repository's queries, ensured at startup by indexes.py
+    indexes: list = []
+    # Internal fields hidden from documents returned to the API
+    projection = None
+
+    @property
+    def collection(self):
+        return database.get_collection(self.collection_name)
+
+    async def insert(self, document: dict) -> str:
+        result = await self.collection.insert_one(document)
+        return str(result.inserted_id)
+
+    async def insert_many(self, documents: list) -> list:
+        if not documents:
+            return []
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        ids = [str(document["_id"]) for document in documents]
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            for error in errors:
+                ids[error["index"]] = None
+        return ids
+
+    async def get(self, document_id: str):
+        document = await self.collection.find_one({"_id": ObjectId(document_id)}, self.projection)
+        return serialize_document(document)
+
+    async def exists(self, document_id: str) -> bool:
+        # Answered from the _id index alone
+        return await self.collection.find_one({"_id": ObjectId(document_id)}, {"_id": 1}) is not None
+
+    async def delete(self, document_id: str) -> bool:
+        result = await self.collection.delete_one({"_id": ObjectId(document_id)})
+        return result.deleted_count > 0
+
+    async def count(self, query: dict, estimated: bool = False) -> int:
+        """Count matching documents; `estimated` uses collection metadata when there is no filter"""
+        if estimated and not query:
+            return await self.collection.estimated_document_count()
+        return await self.collection.count_documents(query)
+
+    async def ensure_indexes(self):
+        return await self.collection.create_indexes(self.indexes)
+
+    async def index_names(self) -> set:
+        return set(await self.collection.index_information())
+
+    async def _find_all(self, query: dict, sort=None, skip: int = 0, limit: int = 0):
+        pipeline = [{"$match": query}]
+        if sort:
+            pipeline.append({"$sort": {sort[0]: sort[1]}})
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.extend(public_id_stages(self.projection))
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def _find_keyset(self, query: dict, sort_field: str, sort_direction: int, limit: int,
+                           after=None, backwards: bool = False, projection=None):
+        """
+        Fetch up to `limit` documents ordered by (`sort_field`, `_id`) that come
+        after the `(value, id)` position `after`, or before it when `backwards`.
+        Documents are always returned in the requested sort order.
+        """
+        direction = -sort_direction if backwards else sort_direction
+        if after is not None:
+            value, document_id = after
+            operator = "$gt" if direction == 1 else "$lt"
+            boundary = {"$or": [
+                {sort_field: {operator: value}},
+                {sort_field: value, "_id": {operator: ObjectId(document_id)}}
+            ]}
+            query = {"$and": [query, boundary]} if query else boundary
+
+        pipeline = [
+            {"$match": query},
+            {"$sort": {sort_field: direction, "_id": direction}},
+            {"$limit": limit},
+            *public_id_stages(projection or self.projection)
+        ]
+        documents = await self.collection.aggregate(pipeline).to_list(length=None)
+        if backwards:
+            documents.reverse()
+        return documents
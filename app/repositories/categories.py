@@ -0,0 +1,9 @@
+from repositories.base import MongoRepository
+from repositories.interfaces import BaseCategoryRepository
+
+class CategoryRepository(MongoRepository, BaseCategoryRepository):
+    collection_name = "categories"
+
+    async def list_all(self):
+        return await self._find_all({})
+
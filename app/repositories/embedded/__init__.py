@@ -0,0 +1,9 @@
+from repositories.embedded.engine import EmbeddedDatabase, Filter
+from repositories.embedded.users import EmbeddedUserRepository
+from repositories.embedded.categories import EmbeddedCategoryRepository
+from repositories.embedded.sub_categories import EmbeddedSubCategoryRepository
+from repositories.embedded.prompts import EmbeddedPromptRepository
+from repositories.embedded.lesson_cache import EmbeddedLessonCacheRepository
+from repositories.embedded.lesson_jobs import EmbeddedLessonJobRepository
+from repositories.embedded.taxonomy import EmbeddedTaxonomyVersionRepository
+from repositories.embedded.rate_limits import EmbeddedRateLimitRepository
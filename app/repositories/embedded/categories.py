@@ -0,0 +1,8 @@
+from repositories.interfaces import BaseCategoryRepository
+from repositories.embedded.engine import EmbeddedRepository
+
+class EmbeddedCategoryRepository(EmbeddedRepository, BaseCategoryRepository):
+    table = "categories"
+
+    async def list_all(self):
+        return await self._find_all({})
@@ -0,0 +1,301 @@
+"""
+Embedded storage engine: SQLite in memory (STORAGE_BACKEND=memory) or in a
+local file (STORAGE_BACKEND=sqlite), for single-node deployments, tests and
+benchmarks that should not need a Mongo cluster.
+
+Each collection is a table of `(id, doc)` rows with the document stored as
+JSON. Indexes are SQLite expression indexes on json_extract(doc, '$.field')
+mirroring the Mongo IndexModels, and queries are written with the exact same
+expressions so the planner uses them. Ids are ObjectId hex strings, so they
+look like Mongo ids and sort by creation time.
+
+Statements run synchronously on the event loop: against a local database
+they take microseconds, less than handing them to a thread would cost.
+"""
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+# Sorts after every character, so [prefix, prefix + PREFIX_END) is a prefix range
+PREFIX_END = "\U0010ffff"
+
+def field(name: str) -> str:
+    """SQL expression for a document field; matches the expression indexes"""
+    if name in ("id", "_id"):
+        return "id"
+    return f"json_extract(doc, '$.{name}')"
+
+def to_sql(value):
+    """A Python value as json_extract() returns it from a stored document"""
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+def prefix_range(prefix: str) -> tuple:
+    return prefix, prefix + PREFIX_END
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def encode(document: dict) -> str:
+    # Fixed-width timestamps keep string order equal to time order
+    return orjson.dumps(
+        document,
+        default=_default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    ).decode()
+
+def decode(document_id: str, raw: str, datetime_fields=()) -> dict:
+    document = orjson.loads(raw)
+    document["id"] = document_id
+    for name in datetime_fields:
+        value = document.get(name)
+        if isinstance(value, str):
+            document[name] = datetime.strptime(value, DATETIME_FORMAT)
+    return document
+
+class Filter:
+    """A WHERE clause with its parameters; falsy when it matches everything"""
+
+    def __init__(self, where: str = "", params=()):
+        self.where = where
+        self.params = tuple(params)
+
+    def __bool__(self):
+        return bool(self.where)
+
+    def __and__(self, other: "Filter") -> "Filter":
+        if not self:
+            return other
+        if not other:
+            return self
+        return Filter(f"({self.where}) AND ({other.where})", self.params + other.params)
+
+    def __repr__(self):
+        return f"Filter({self.where!r}, {self.params!r})"
+
+def to_filter(query) -> Filter:
+    """Accept a Filter or a `{field: value}` equality dict, as the Mongo repositories do"""
+    if isinstance(query, Filter):
+        return query
+    if not query:
+        return Filter()
+    clauses = []
+    params = []
+    for name, value in query.items():
+        if value is None:
+            clauses.append(f"{field(name)} IS NULL")
+        else:
+            clauses.append(f"{field(name)} = ?")
+            params.append(to_sql(value))
+    return Filter(" AND ".join(clauses), params)
+
+class EmbeddedDatabase:
+    """
+    One SQLite connection shared by every embedded repository. Exposes the
+    same connect/ping/close_client lifecycle as the `database` module.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = None
+        self._schema = []
+
+    def register(self, statements):
+        """Add DDL run when the connection opens; repositories declare their tables and indexes here"""
+        self._schema.extend(statements)
+        if self._connection is not None:
+            for statement in statements:
+                self._connection.execute(statement)
+
+    def connect(self):
+        if self._connection is not None:
+            return self._connection
+        # Autocommit; multi-statement writes use transaction()
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        if self.path != ":memory:":
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+        for statement in self._schema:
+            connection.execute(statement)
+        self._connection = connection
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._connection if self._connection is not None else self.connect()
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        try:
+            return self.connection.execute(sql, params)
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE" in str(e):
+                raise DuplicateKeyError(str(e), 11000)
+            raise
+
+    def executemany(self, sql: str, rows) -> sqlite3.Cursor:
+        try:
+            return self.connection.executemany(sql, rows)
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE" in str(e):
+                raise DuplicateKeyError(str(e), 11000)
+            raise
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    async def ping(self) -> bool:
+        self.connection.execute("SELECT 1")
+        return True
+
+    def close_client(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class EmbeddedRepository:
+    """Base class for repositories stored in one table of an EmbeddedDatabase"""
+    table: str = ""
+    # Index DDL for this table, mirroring the Mongo repository's IndexModels
+    schema: tuple = ()
+    # Nothing for indexes.py to create: the schema comes with the table
+    indexes: list = []
+    # Fields stored as fixed-width strings and read back as datetimes
+    datetime_fields: tuple = ("created_at",)
+
+    def __init__(self, engine: EmbeddedDatabase):
+        self.engine = engine
+        engine.register([
+            f"CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, doc TEXT NOT NULL)",
+            *self.schema
+        ])
+
+    @property
+    def collection_name(self) -> str:
+        return self.table
+
+    async def ensure_indexes(self):
+        return None
+
+    def _decode(self, row):
+        if row is None:
+            return None
+        return decode(row[0], row[1], self.datetime_fields)
+
+    def _insert_row(self, document: dict) -> str:
+        document = dict(document)
+        document_id = str(document.pop("_id", None) or ObjectId())
+        document.pop("id", None)
+        self.engine.execute(f"INSERT INTO {self.table} (id, doc) VALUES (?, ?)", (document_id, encode(document)))
+        return document_id
+
+    async def insert(self, document: dict) -> str:
+        return self._insert_row(document)
+
+    async def insert_many(self, documents: list) -> list:
+        ids = []
+        with self.engine.transaction():
+            for document in documents:
+                try:
+                    ids.append(self._insert_row(document))
+                except DuplicateKeyError:
+                    ids.append(None)
+        return ids
+
+    async def get(self, document_id: str):
+        row = self.engine.execute(f"SELECT id, doc FROM {self.table} WHERE id = ?", (document_id,)).fetchone()
+        return self._decode(row)
+
+    async def exists(self, document_id: str) -> bool:
+        return self.engine.execute(f"SELECT 1 FROM {self.table} WHERE id = ?", (document_id,)).fetchone() is not None
+
+    async def delete(self, document_id: str) -> bool:
+        return self.engine.execute(f"DELETE FROM {self.table} WHERE id = ?", (document_id,)).rowcount > 0
+
+    async def count(self, query, estimated: bool = False) -> int:
+        # SQLite keeps no row count, so an estimate is as expensive as an exact count
+        condition = to_filter(query)
+        where = f" WHERE {condition.where}" if condition else ""
+        return self.engine.execute(f"SELECT count(*) FROM {self.table}{where}", condition.params).fetchone()[0]
+
+    def _find_one(self, query):
+        condition = to_filter(query)
+        where = f"WHERE {condition.where}" if condition else ""
+        row = self.engine.execute(f"SELECT id, doc FROM {self.table} {where} LIMIT 1", condition.params).fetchone()
+        return self._decode(row)
+
+    def _set_fields(self, document_id: str, values: dict, condition: Filter = None) -> int:
+        """json_set the given top-level fields of one document; returns the number of rows changed"""
+        assignments = []
+        params = []
+        for name, value in values.items():
+            assignments.append(f"'$.{name}', ?")
+            params.append(to_sql(value))
+        condition = Filter("id = ?", (document_id,)) & (condition or Filter())
+        cursor = self.engine.execute(
+            f"UPDATE {self.table} SET doc = json_set(doc, {', '.join(assignments)}) WHERE {condition.where}",
+            (*params, *condition.params)
+        )
+        return cursor.rowcount
+
+    async def _find_all(self, query, sort=None, skip: int = 0, limit: int = 0, columns: str = "id, doc"):
+        condition = to_filter(query)
+        sql = f"SELECT {columns} FROM {self.table}"
+        if condition:
+            sql += f" WHERE {condition.where}"
+        if sort:
+            direction = "DESC" if sort[1] == -1 else "ASC"
+            sql += f" ORDER BY {field(sort[0])} {direction}, id {direction}"
+        else:
+            sql += " ORDER BY rowid"
+        if limit or skip:
+            sql += f" LIMIT {int(limit) if limit else -1} OFFSET {int(skip)}"
+        return [self._decode(row) for row in self.engine.execute(sql, condition.params)]
+
+    async def _find_keyset(self, query, sort_field: str, sort_direction: int, limit: int,
+                           after=None, backwards: bool = False, columns: str = "id, doc"):
+        """Same contract as MongoRepository._find_keyset"""
+        direction = -sort_direction if backwards else sort_direction
+        condition = to_filter(query)
+        sort_expression = field(sort_field)
+        if after is not None:
+            value, document_id = after
+            value = to_sql(value)
+            operator = ">" if direction == 1 else "<"
+            # The leading range term is what lets SQLite seek the (field, id) index
+            condition = condition & Filter(
+                f"{sort_expression} {operator}= ? AND ({sort_expression} {operator} ? OR id {operator} ?)",
+                (value, value, document_id)
+            )
+
+        order = "ASC" if direction == 1 else "DESC"
+        sql = f"SELECT {columns} FROM {self.table}"
+        if condition:
+            sql += f" WHERE {condition.where}"
+        sql += f" ORDER BY {sort_expression} {order}, id {order} LIMIT {int(limit)}"
+        documents = [self._decode(row) for row in self.engine.execute(sql, condition.params)]
+        if backwards:
+            documents.reverse()
+        return documents
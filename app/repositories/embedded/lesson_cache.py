@@ -0,0 +1,29 @@
+from datetime import datetime
+from repositories.interfaces import BaseLessonCacheRepository
+from repositories.embedded.engine import EmbeddedRepository, field, encode, to_sql
+
+class EmbeddedLessonCacheRepository(EmbeddedRepository, BaseLessonCacheRepository):
+    """Persistent tier of the lesson cache, keyed by the cache key digest"""
+    table = "lesson_cache"
+    schema = (
+        f"CREATE INDEX IF NOT EXISTS lesson_cache_expires_at ON lesson_cache ({field('expires_at')})",
+    )
+    datetime_fields = ("created_at", "expires_at")
+
+    async def find_entry(self, key: str):
+        row = self.engine.execute(
+            f"SELECT id, doc FROM lesson_cache WHERE id = ? AND {field('expires_at')} > ?",
+            (key, to_sql(datetime.utcnow()))
+        ).fetchone()
+        return self._decode(row)
+
+    async def save_response(self, key: str, response: str, expires_at: datetime):
+        now = datetime.utcnow()
+        document = encode({"response": response, "expires_at": expires_at, "created_at": now})
+        with self.engine.transaction():
+            self.engine.execute(
+                "INSERT INTO lesson_cache (id, doc) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET doc = excluded.doc",
+                (key, document)
+            )
+            # Stands in for Mongo's TTL monitor; an index range delete
+            self.engine.execute(f"DELETE FROM lesson_cache WHERE {field('expires_at')} <= ?", (to_sql(now),))
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from repositories.interfaces import BaseLessonJobRepository
+from repositories.embedded.engine import EmbeddedRepository, field, to_sql
+
+class EmbeddedLessonJobRepository(EmbeddedRepository, BaseLessonJobRepository):
+    """Durable state of background lesson generation jobs"""
+    table = "lesson_jobs"
+    schema = (
+        f"CREATE INDEX IF NOT EXISTS lesson_jobs_status_created_at ON lesson_jobs "
+        f"({field('status')}, {field('created_at')}, id)",
+    )
+    datetime_fields = ("created_at", "updated_at", "started_at", "finished_at", "next_attempt_at")
+
+    async def create(self, request: dict) -> str:
+        now = datetime.utcnow()
+        return await self.insert({
+            "request": request,
+            "status": "queued",
+            "attempts": 0,
+            "prompt_id": None,
+            "error": None,
+            "next_attempt_at": None,
+            "created_at": now,
+            "updated_at": now
+        })
+
+    async def claim(self, job_id: str):
+        """Atomically move a queued job to running; returns None if another worker owns it"""
+        now = to_sql(datetime.utcnow())
+        claimed = self.engine.execute(
+            "UPDATE lesson_jobs SET doc = json_set(doc, '$.status', 'running', '$.started_at', ?, "
+            f"'$.updated_at', ?, '$.attempts', {field('attempts')} + 1) "
+            f"WHERE id = ? AND {field('status')} = 'queued'",
+            (now, now, job_id)
+        ).rowcount
+        return await self.get(job_id) if claimed else None
+
+    async def requeue(self, job_id: str, error: str, next_attempt_at=None):
+        self._set_fields(job_id, {
+            "status": "queued", "error": error, "next_attempt_at": next_attempt_at, "updated_at": datetime.utcnow()
+        })
+
+    async def release(self, job_id: str):
+        """See LessonJobRepository.release"""
+        self.engine.execute(
+            "UPDATE lesson_jobs SET doc = json_set(doc, '$.status', 'queued', '$.updated_at', ?, "
+            f"'$.attempts', {field('attempts')} - 1) "
+            f"WHERE id = ? AND {field('status')} = 'running'",
+            (to_sql(datetime.utcnow()), job_id)
+        )
+
+    async def complete(self, job_id: str, prompt_id: str):
+        now = datetime.utcnow()
+        self._set_fields(job_id, {
+            "status": "completed", "prompt_id": prompt_id, "error": None, "finished_at": now, "updated_at": now
+        })
+
+    async def fail(self, job_id: str, error: str):
+        now = datetime.utcnow()
+        self._set_fields(job_id, {"status": "failed", "error": error, "finished_at": now, "updated_at": now})
+
+    async def recover_unfinished(self, stale_after_seconds: int):
+        """See LessonJobRepository.recover_unfinished"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=stale_after_seconds)
+        self.engine.execute(
+            "UPDATE lesson_jobs SET doc = json_set(doc, '$.status', 'queued', '$.updated_at', ?) "
+            f"WHERE {field('status')} = 'running' AND {field('started_at')} < ?",
+            (to_sql(now), to_sql(stale_before))
+        )
+        rows = self.engine.execute(
+            f"SELECT id FROM lesson_jobs WHERE {field('status')} = 'queued' "
+            f"AND ({field('next_attempt_at')} IS NULL OR {field('next_attempt_at')} <= ?) "
+            f"ORDER BY {field('created_at')}, id",
+            (to_sql(now),)
+        ).fetchall()
+        return [row[0] for row in rows]
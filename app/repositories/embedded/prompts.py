@@ -0,0 +1,53 @@
+from repositories.interfaces import BasePromptRepository
+from repositories.prompts import PREVIEW_LENGTH, SUMMARY_FIELDS
+from repositories.embedded.engine import EmbeddedRepository, Filter, field, decode, to_filter, to_sql
+
+class EmbeddedPromptRepository(EmbeddedRepository, BasePromptRepository):
+    table = "prompts"
+    schema = (
+        f"CREATE INDEX IF NOT EXISTS prompts_user_id_created_at ON prompts "
+        f"({field('user_id')}, {field('created_at')} DESC, id DESC)",
+        f"CREATE INDEX IF NOT EXISTS prompts_created_at ON prompts ({field('created_at')} DESC, id DESC)",
+        f"CREATE INDEX IF NOT EXISTS prompts_category_id_created_at ON prompts "
+        f"({field('category_id')}, {field('created_at')} DESC, id DESC)",
+    )
+
+    async def list_history(self, query, limit: int, after=None, fields=SUMMARY_FIELDS):
+        """Same summaries as PromptRepository.list_history; the lesson body never leaves SQLite"""
+        summaries = await self._find_keyset(
+            query,
+            "created_at",
+            -1,
+            limit,
+            after=after,
+            columns=f"id, json_remove(doc, '$.response'), substr(coalesce({field('response')}, ''), 1, {PREVIEW_LENGTH})"
+        )
+        selected = set(fields) | {"created_at"}
+        for summary in summaries:
+            for name in [name for name in summary if name not in selected and name != "id"]:
+                del summary[name]
+        return summaries
+
+    async def iter_export(self, query, created_from=None, created_to=None, batch_size: int = 1000):
+        """Full lessons oldest first, one keyset page of `batch_size` at a time"""
+        condition = to_filter(query)
+        if created_from is not None:
+            condition = condition & Filter(f"{field('created_at')} >= ?", (to_sql(created_from),))
+        if created_to is not None:
+            condition = condition & Filter(f"{field('created_at')} < ?", (to_sql(created_to),))
+        after = None
+        while True:
+            documents = await self._find_keyset(condition, "created_at", 1, batch_size, after=after)
+            for document in documents:
+                yield document
+            if len(documents) < batch_size:
+                return
+            after = (documents[-1]["created_at"], documents[-1]["id"])
+
+    def _decode(self, row):
+        if row is None:
+            return None
+        document = decode(row[0], row[1], self.datetime_fields)
+        if len(row) > 2:
+            document["response_preview"] = row[2]
+        return document
@@ -0,0 +1,41 @@
+import time
+from repositories.interfaces import BaseRateLimitRepository
+from repositories.embedded.engine import EmbeddedRepository, field
+
+# Expired buckets are swept once every this many calls
+CLEANUP_EVERY = 1000
+
+class EmbeddedRateLimitRepository(EmbeddedRepository, BaseRateLimitRepository):
+    """Token buckets shared by all workers using the same SQLite file"""
+    table = "rate_limits"
+    schema = (
+        f"CREATE INDEX IF NOT EXISTS rate_limits_expires_at ON rate_limits ({field('expires_at')})",
+    )
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self._calls = 0
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        now = time.time()
+        refilled = (
+            f"min(:burst, {field('tokens')} + max(0, :now - {field('updated_at')}) * :rate)"
+        )
+        # One UPSERT refills and takes atomically; DO UPDATE sees the stored bucket
+        row = self.engine.execute(
+            "INSERT INTO rate_limits (id, doc) VALUES (:key, json_object("
+            "'tokens', min(:burst, :burst - :cost), 'updated_at', :now, 'expires_at', :expires_at, 'allowed', :burst >= :cost)) "
+            "ON CONFLICT (id) DO UPDATE SET doc = json_object("
+            f"'tokens', CASE WHEN {refilled} >= :cost THEN min(:burst, {refilled} - :cost) ELSE {refilled} END, "
+            "'updated_at', :now, 'expires_at', :expires_at, "
+            f"'allowed', {refilled} >= :cost) "
+            f"RETURNING {field('tokens')}, {field('allowed')}",
+            {"key": key, "rate": rate, "burst": burst, "cost": cost, "now": now, "expires_at": now + burst / rate}
+        ).fetchone()
+
+        self._calls += 1
+        if self._calls % CLEANUP_EVERY == 0:
+            self.engine.execute(f"DELETE FROM rate_limits WHERE {field('expires_at')} < ?", (now,))
+
+        tokens, allowed = row
+        return 0.0 if allowed else (cost - tokens) / rate
@@ -0,0 +1,14 @@
+from repositories.interfaces import BaseSubCategoryRepository
+from repositories.embedded.engine import EmbeddedRepository, field
+
+class EmbeddedSubCategoryRepository(EmbeddedRepository, BaseSubCategoryRepository):
+    table = "sub_categories"
+    schema = (
+        f"CREATE INDEX IF NOT EXISTS sub_categories_category_id ON sub_categories ({field('category_id')})",
+    )
+
+    async def list_all(self):
+        return await self._find_all({})
+
+    async def list_by_category(self, category_id: str):
+        return await self._find_all({"category_id": category_id})
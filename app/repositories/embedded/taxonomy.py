@@ -0,0 +1,22 @@
+from repositories.interfaces import BaseTaxonomyVersionRepository
+from repositories.taxonomy import TAXONOMY_VERSION_ID
+from repositories.embedded.engine import EmbeddedRepository, field
+
+class EmbeddedTaxonomyVersionRepository(EmbeddedRepository, BaseTaxonomyVersionRepository):
+    """Shared counter bumped on every taxonomy write so all workers can tell their cache is stale"""
+    table = "taxonomy_meta"
+
+    async def get_version(self) -> int:
+        row = self.engine.execute(
+            f"SELECT {field('version')} FROM taxonomy_meta WHERE id = ?", (TAXONOMY_VERSION_ID,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    async def bump(self) -> int:
+        row = self.engine.execute(
+            "INSERT INTO taxonomy_meta (id, doc) VALUES (?, '{\"version\": 1}') "
+            f"ON CONFLICT (id) DO UPDATE SET doc = json_set(doc, '$.version', {field('version')} + 1) "
+            f"RETURNING {field('version')}",
+            (TAXONOMY_VERSION_ID,)
+        ).fetchone()
+        return row[0]
@@ -0,0 +1,133 @@
+import re
+from pymongo.errors import DuplicateKeyError
+from repositories.interfaces import BaseUserRepository
+from repositories.users import normalize_name, with_search_fields
+from repositories.embedded.engine import EmbeddedRepository, Filter, field, prefix_range
+
+class EmbeddedUserRepository(EmbeddedRepository, BaseUserRepository):
+    table = "users"
+    schema = (
+        f"CREATE UNIQUE INDEX IF NOT EXISTS users_phone_unique ON users ({field('phone')})",
+        # Legacy users may have no id_number, so uniqueness only applies where it is set
+        f"CREATE UNIQUE INDEX IF NOT EXISTS users_id_number_unique ON users ({field('id_number')}) "
+        f"WHERE {field('id_number')} IS NOT NULL",
+        f"CREATE INDEX IF NOT EXISTS users_created_at_id ON users ({field('created_at')} DESC, id DESC)",
+        f"CREATE INDEX IF NOT EXISTS users_name_id ON users ({field('name')}, id)",
+        # The Mongo search_names array, one row per name suffix
+        "CREATE TABLE IF NOT EXISTS user_search_names ("
+        "name TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (name, user_id)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS user_search_names_user_id ON user_search_names (user_id)",
+    )
+
+    def _save_search_names(self, user_id: str, name: str):
+        names = with_search_fields({"name": name})["search_names"]
+        self.engine.executemany(
+            "INSERT OR IGNORE INTO user_search_names (name, user_id) VALUES (?, ?)",
+            [(search_name, user_id) for search_name in names]
+        )
+
+    def _insert_user(self, document: dict) -> str:
+        document = dict(document)
+        document.pop("search_names", None)
+        user_id = self._insert_row(document)
+        self._save_search_names(user_id, document.get("name", ""))
+        return user_id
+
+    async def insert(self, document: dict) -> str:
+        with self.engine.transaction():
+            return self._insert_user(document)
+
+    async def insert_many(self, documents: list) -> list:
+        ids = []
+        with self.engine.transaction():
+            for document in documents:
+                try:
+                    ids.append(self._insert_user(document))
+                except DuplicateKeyError:
+                    ids.append(None)
+        return ids
+
+    async def delete(self, document_id: str) -> bool:
+        with self.engine.transaction():
+            self.engine.execute("DELETE FROM user_search_names WHERE user_id = ?", (document_id,))
+            deleted = self.engine.execute("DELETE FROM users WHERE id = ?", (document_id,)).rowcount
+        return deleted > 0
+
+    async def find_for_login(self, name: str, phone: str, id_number: str):
+        return self._find_one(Filter(
+            f"{field('phone')} = ? AND {field('name')} = ? "
+            f"AND ({field('id_number')} = ? OR {field('id_number')} IS NULL)",
+            (phone, name, id_number)
+        ))
+
+    async def find_conflict(self, phone: str, id_number: str):
+        return self._find_one(Filter(f"{field('phone')} = ? OR {field('id_number')} = ?", (phone, id_number)))
+
+    def search_query(self, search, mode: str = "prefix") -> Filter:
+        """Same matching rules as UserRepository.search_query, as index range scans"""
+        if not search or not search.strip():
+            return Filter()
+
+        digits = search.replace("-", "").replace(" ", "")
+        if digits.isdigit():
+            low, high = prefix_range(digits)
+            return Filter(
+                f"({field('phone')} >= ? AND {field('phone')} < ?) "
+                f"OR ({field('id_number')} >= ? AND {field('id_number')} < ?)",
+                (low, high, low, high)
+            )
+
+        if mode == "text":
+            # Whole-word match on any word of the name, like the Mongo text index
+            words = [word for word in re.split(r"\W+", normalize_name(search)) if word]
+            if not words:
+                return Filter()
+            clauses = []
+            params = []
+            for word in words:
+                clauses.append("name = ? OR (name >= ? AND name < ?)")
+                params.extend((word, word + " ", word + "!"))
+            return Filter(
+                f"id IN (SELECT user_id FROM user_search_names WHERE {' OR '.join(clauses)})",
+                params
+            )
+
+        low, high = prefix_range(normalize_name(search))
+        return Filter("id IN (SELECT user_id FROM user_search_names WHERE name >= ? AND name < ?)", (low, high))
+
+    async def list_page(self, query, sort_by: str, sort_direction: int, skip: int, limit: int):
+        return await self._find_all(query, sort=(sort_by, sort_direction), skip=skip, limit=limit)
+
+    async def list_keyset(self, query, sort_by: str, sort_direction: int, limit: int,
+                          after=None, backwards: bool = False):
+        return await self._find_keyset(query, sort_by, sort_direction, limit, after=after, backwards=backwards)
+
+    async def backfill_search_fields(self, batch_size: int = 1000) -> int:
+        """Fill in search rows for users written without them, e.g. by an older version"""
+        rows = self.engine.execute(
+            f"SELECT id, {field('name')} FROM users "
+            "WHERE NOT EXISTS (SELECT 1 FROM user_search_names WHERE user_id = users.id)"
+        ).fetchall()
+        for start in range(0, len(rows), batch_size):
+            with self.engine.transaction():
+                for user_id, name in rows[start:start + batch_size]:
+                    self._save_search_names(user_id, name or "")
+        return len(rows)
+
+    async def backfill_id_numbers(self, rows, batch_size: int = 1000) -> dict:
+        result = {"updated": 0, "duplicates": 0}
+        condition = f"{field('phone')} = ? AND {field('id_number')} IS NULL"
+        rows = iter(rows)
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                return result
+            with self.engine.transaction():
+                for phone, id_number in batch:
+                    try:
+                        result["updated"] += self.engine.execute(
+                            f"UPDATE users SET doc = json_set(doc, '$.id_number', ?) WHERE {condition}",
+                            (id_number, phone)
+                        ).rowcount
+                    except DuplicateKeyError:
+                        result["duplicates"] += 1
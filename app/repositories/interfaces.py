@@ -0,0 +1,155 @@
+"""
+Storage-independent repository interfaces. The Mongo repositories and the
+embedded (SQLite) ones implement these; repositories/__init__.py picks one
+set according to STORAGE_BACKEND.
+
+`query` arguments are filters built by the repository itself (for example
+UserRepository.search_query) or plain `{field: value}` equality dicts, so
+callers never depend on a particular query language. Unique-key violations
+raise pymongo's DuplicateKeyError on every backend.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+class Repository(ABC):
+    @abstractmethod
+    async def insert(self, document: dict) -> str:
+        """Store `document` and return its new string id"""
+
+    @abstractmethod
+    async def insert_many(self, documents: list) -> list:
+        """
+        Store `documents` in one batch, continuing past duplicates. Returns the
+        new ids in document order, None where a unique index rejected one.
+        """
+
+    @abstractmethod
+    async def get(self, document_id: str) -> Optional[dict]:
+        """The document with a string `id` field, or None"""
+
+    @abstractmethod
+    async def exists(self, document_id: str) -> bool:
+        """Whether the document is stored, without reading it"""
+
+    @abstractmethod
+    async def delete(self, document_id: str) -> bool:
+        """Whether a document was deleted"""
+
+    async def ensure_indexes(self):
+        """Create the indexes this repository's queries need; a no-op where they come with the schema"""
+
+class BaseUserRepository(Repository):
+    @abstractmethod
+    async def find_for_login(self, name: str, phone: str, id_number: str):
+        """The user with these credentials; legacy users without an ID number match on name and phone"""
+
+    @abstractmethod
+    async def find_conflict(self, phone: str, id_number: str):
+        """The user already holding this phone or ID number, if any"""
+
+    @abstractmethod
+    def search_query(self, search, mode: str = "prefix"):
+        """Filter for the admin user search, to pass to count/list_page/list_keyset"""
+
+    @abstractmethod
+    async def count(self, query, estimated: bool = False) -> int:
+        """Matching documents; `estimated` may answer from metadata when there is no filter"""
+
+    @abstractmethod
+    async def list_page(self, query, sort_by: str, sort_direction: int, skip: int, limit: int) -> list: ...
+
+    @abstractmethod
+    async def list_keyset(self, query, sort_by: str, sort_direction: int, limit: int,
+                          after=None, backwards: bool = False) -> list: ...
+
+    @abstractmethod
+    async def backfill_search_fields(self, batch_size: int = 1000) -> int: ...
+
+    @abstractmethod
+    async def backfill_id_numbers(self, rows, batch_size: int = 1000) -> dict:
+        """Set id_number on legacy users from (phone, id_number) pairs; returns updated/duplicates counts"""
+
+class BaseCategoryRepository(Repository):
+    @abstractmethod
+    async def list_all(self) -> list: ...
+
+class BaseSubCategoryRepository(Repository):
+    @abstractmethod
+    async def list_all(self) -> list: ...
+
+    @abstractmethod
+    async def list_by_category(self, category_id: str) -> list: ...
+
+class BasePromptRepository(Repository):
+    @abstractmethod
+    async def count(self, query, estimated: bool = False) -> int:
+        """See BaseUserRepository.count"""
+
+    @abstractmethod
+    async def list_history(self, query, limit: int, after=None, fields=None) -> list:
+        """Newest-first page of lesson summaries after the `(created_at, id)` position `after`"""
+
+    @abstractmethod
+    def iter_export(self, query, created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                    batch_size: int = 1000) -> AsyncIterator[dict]:
+        """Full lessons matching `query` in [created_from, created_to), oldest first, read `batch_size` at a time"""
+
+class BaseLessonCacheRepository(ABC):
+    async def ensure_indexes(self):
+        """See Repository.ensure_indexes"""
+
+    @abstractmethod
+    async def find_entry(self, key: str) -> Optional[dict]:
+        """The unexpired entry's response and expires_at, or None"""
+
+    @abstractmethod
+    async def save_response(self, key: str, response: str, expires_at: datetime): ...
+
+class BaseLessonJobRepository(Repository):
+    @abstractmethod
+    async def create(self, request: dict) -> str: ...
+
+    @abstractmethod
+    async def claim(self, job_id: str):
+        """Atomically move a queued job to running; None if another worker owns it"""
+
+    @abstractmethod
+    async def requeue(self, job_id: str, error: str, next_attempt_at: Optional[datetime] = None): ...
+
+    @abstractmethod
+    async def release(self, job_id: str):
+        """Requeue a running job that was interrupted, handing back its attempt"""
+
+    @abstractmethod
+    async def complete(self, job_id: str, prompt_id: str): ...
+
+    @abstractmethod
+    async def fail(self, job_id: str, error: str): ...
+
+    @abstractmethod
+    async def recover_unfinished(self, stale_after_seconds: int) -> list:
+        """Requeue stale running jobs; ids of the queued jobs that are due, oldest first"""
+
+class BaseRateLimitRepository(ABC):
+    async def ensure_indexes(self):
+        """See Repository.ensure_indexes"""
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        """
+        Refill the token bucket `key` at `rate` tokens per second up to `burst`
+        and take `cost` tokens. Returns 0 when they were taken, otherwise the
+        seconds until enough tokens will be available. A negative `cost` gives
+        tokens back, up to `burst`.
+        """
+
+class BaseTaxonomyVersionRepository(ABC):
+    async def ensure_indexes(self):
+        """See Repository.ensure_indexes"""
+
+    @abstractmethod
+    async def get_version(self) -> int: ...
+
+    @abstractmethod
+    async def bump(self) -> int: ...
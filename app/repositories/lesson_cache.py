@@ -0,0 +1,25 @@
+from datetime import datetime
+from pymongo import IndexModel, ASCENDING
+from repositories.base import MongoRepository
+from repositories.interfaces import BaseLessonCacheRepository
+
+class LessonCacheRepository(MongoRepository, BaseLessonCacheRepository):
+    """Persistent tier of the lesson cache, keyed by the cache key digest"""
+    collection_name = "lesson_cache"
+    indexes = [
+        # Mongo's TTL monitor removes entries once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ]
+
+    async def find_entry(self, key: str):
+        return await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"response": 1, "expires_at": 1}
+        )
+
+    async def save_response(self, key: str, response: str, expires_at: datetime):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"response": response, "expires_at": expires_at, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
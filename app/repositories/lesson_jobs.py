@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, IndexModel, ASCENDING
+from repositories.base import MongoRepository, serialize_document
+from repositories.interfaces import BaseLessonJobRepository
+
+class LessonJobRepository(MongoRepository, BaseLessonJobRepository):
+    """Durable state of background lesson generation jobs"""
+    collection_name = "lesson_jobs"
+    indexes = [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ]
+
+    async def create(self, request: dict) -> str:
+        now = datetime.utcnow()
+        return await self.insert({
+            "request": request,
+            "status": "queued",
+            "attempts": 0,
+            "prompt_id": None,
+            "error": None,
+            "next_attempt_at": None,
+            "created_at": now,
+            "updated_at": now
+        })
+
+    async def claim(self, job_id: str):
+        """Atomically move a queued job to running; returns None if another worker owns it"""
+        now = datetime.utcnow()
+        job = await self.collection.find_one_and_update(
+            {"_id": ObjectId(job_id), "status": "queued"},
+            {"$set": {"status": "running", "started_at": now, "updated_at": now}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        return serialize_document(job)
+
+    async def requeue(self, job_id: str, error: str, next_attempt_at=None):
+        await self.collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": "queued", "error": error, "next_attempt_at": next_attempt_at, "updated_at": datetime.utcnow()}}
+        )
+
+    async def release(self, job_id: str):
+        """Requeue a running job that was interrupted, handing back its attempt"""
+        await self.collection.update_one(
+            {"_id": ObjectId(job_id), "status": "running"},
+            {"$set": {"status": "queued", "updated_at": datetime.utcnow()}, "$inc": {"attempts": -1}}
+        )
+
+    async def complete(self, job_id: str, prompt_id: str):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": "completed", "prompt_id": prompt_id, "error": None, "finished_at": now, "updated_at": now}}
+        )
+
+    async def fail(self, job_id: str, error: str):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": "failed", "error": error, "finished_at": now, "updated_at": now}}
+        )
+
+    async def recover_unfinished(self, stale_after_seconds: int):
+        """
+        Requeue jobs whose worker died mid-run and return the ids of the queued
+        jobs that are due, oldest first. Running jobs younger than
+        `stale_after_seconds` are assumed to belong to a live worker process and
+        are left alone; retries wait for their `next_attempt_at`.
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=stale_after_seconds)
+        await self.collection.update_many(
+            {"status": "running", "started_at": {"$lt": stale_before}},
+            {"$set": {"status": "queued", "updated_at": now}}
+        )
+        cursor = self.collection.find(
+            {"status": "queued", "$or": [{"next_attempt_at": None}, {"next_attempt_at": {"$lte": now}}]},
+            {"_id": 1}
+        ).sort("created_at", 1)
+        return [str(job["_id"]) async for job in cursor]
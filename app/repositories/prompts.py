@@ -0,0 +1,64 @@
+from datetime import datetime
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from repositories.base import MongoRepository, serialize_document
+from repositories.interfaces import BasePromptRepository
+
+PREVIEW_LENGTH = 200
+SUMMARY_FIELDS = ("user_id", "category_id", "sub_category_id", "prompt", "created_at", "completed", "response_preview")
+
+def summary_projection(fields=SUMMARY_FIELDS) -> dict:
+    """
+    Projection for lesson listings: never the full `response`, optionally a
+    `response_preview` truncated by the server. `created_at` is always kept
+    because it is the pagination key.
+    """
+    projection = {field: 1 for field in fields if field != "response_preview"}
+    projection["created_at"] = 1
+    if "response_preview" in fields:
+        projection["response_preview"] = {"$substrCP": [{"$ifNull": ["$response", ""]}, 0, PREVIEW_LENGTH]}
+    return projection
+
+def build_prompt_doc(prompt_request, response: str) -> dict:
+    """Build the stored lesson document for a `schemas.PromptRequest`"""
+    return {
+        "user_id": prompt_request.user_id,
+        "category_id": prompt_request.category_id,
+        "sub_category_id": prompt_request.sub_category_id,
+        "prompt": prompt_request.prompt,
+        "response": response,
+        "created_at": datetime.utcnow()
+    }
+
+class PromptRepository(MongoRepository, BasePromptRepository):
+    collection_name = "prompts"
+    indexes = [
+        # History pages and exports sort on (created_at, _id), so both keys end every index they use
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_id_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+        IndexModel([("category_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="category_id_created_at_id"),
+    ]
+
+    async def list_history(self, query: dict, limit: int, after=None, fields=SUMMARY_FIELDS):
+        """Newest-first page of lesson summaries after the `(created_at, id)` position `after`"""
+        return await self._find_keyset(
+            query,
+            "created_at",
+            -1,
+            limit,
+            after=after,
+            projection=summary_projection(fields)
+        )
+
+    async def iter_export(self, query: dict, created_from=None, created_to=None, batch_size: int = 1000):
+        """Full lessons oldest first, streamed from one batched cursor"""
+        query = dict(query)
+        created_at = {}
+        if created_from is not None:
+            created_at["$gte"] = created_from
+        if created_to is not None:
+            created_at["$lt"] = created_to
+        if created_at:
+            query["created_at"] = created_at
+        cursor = self.collection.find(query).sort([("created_at", ASCENDING), ("_id", ASCENDING)]).batch_size(batch_size)
+        async for document in cursor:
+            yield serialize_document(document)
@@ -0,0 +1,41 @@
+import time
+from datetime import datetime, timedelta
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from repositories.base import MongoRepository
+from repositories.interfaces import BaseRateLimitRepository
+
+class RateLimitRepository(MongoRepository, BaseRateLimitRepository):
+    """Token buckets shared by all workers, one document per bucket key"""
+    collection_name = "rate_limits"
+    indexes = [
+        # A bucket untouched for burst / rate seconds is full again, the same as no document
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ]
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        """Refill and take in one pipeline update (MongoDB 4.2+), so concurrent workers cannot overspend"""
+        now = time.time()
+        elapsed = {"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": {"$min": [burst, {"$add": [
+                    {"$ifNull": ["$tokens", burst]},
+                    {"$multiply": [elapsed, rate]}
+                ]}]}}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", cost]},
+                    "tokens": {"$cond": [
+                        {"$gte": ["$tokens", cost]},
+                        {"$min": [burst, {"$subtract": ["$tokens", cost]}]},
+                        "$tokens"
+                    ]},
+                    "updated_at": now,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=burst / rate),
+                }},
+            ],
+            projection={"tokens": 1, "allowed": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if bucket["allowed"] else (cost - bucket["tokens"]) / rate
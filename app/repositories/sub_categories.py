@@ -0,0 +1,16 @@
+from pymongo import IndexModel, ASCENDING
+from repositories.base import MongoRepository
+from repositories.interfaces import BaseSubCategoryRepository
+
+class SubCategoryRepository(MongoRepository, BaseSubCategoryRepository):
+    collection_name = "sub_categories"
+    indexes = [
+        IndexModel([("category_id", ASCENDING)], name="category_id"),
+    ]
+
+    async def list_all(self):
+        return await self._find_all({})
+
+    async def list_by_category(self, category_id: str):
+        return await self._find_all({"category_id": category_id})
+
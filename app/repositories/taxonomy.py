@@ -0,0 +1,22 @@
+from pymongo import ReturnDocument
+from repositories.base import MongoRepository
+from repositories.interfaces import BaseTaxonomyVersionRepository
+
+TAXONOMY_VERSION_ID = "taxonomy"
+
+class TaxonomyVersionRepository(MongoRepository, BaseTaxonomyVersionRepository):
+    """Shared counter bumped on every taxonomy write so all workers can tell their cache is stale"""
+    collection_name = "taxonomy_meta"
+
+    async def get_version(self) -> int:
+        meta = await self.collection.find_one({"_id": TAXONOMY_VERSION_ID})
+        return meta["version"] if meta else 0
+
+    async def bump(self) -> int:
+        meta = await self.collection.find_one_and_update(
+            {"_id": TAXONOMY_VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return meta["version"]
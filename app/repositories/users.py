@@ -0,0 +1,145 @@
+import re
+from pymongo import IndexModel, UpdateOne, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import BulkWriteError
+from repositories.base import MongoRepository, serialize_document
+from repositories.interfaces import BaseUserRepository
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.casefold().split())
+
+def with_search_fields(document: dict) -> dict:
+    """
+    Add the lower-case shadow field used by the indexed name search: the full
+    normalized name plus every suffix starting at a word, so an anchored
+    prefix matches the first name, the last name or the whole name.
+    """
+    words = normalize_name(document.get("name", "")).split(" ")
+    document["search_names"] = [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+    return document
+
+class UserRepository(MongoRepository, BaseUserRepository):
+    collection_name = "users"
+    indexes = [
+        IndexModel([("phone", ASCENDING)], name="phone_unique", unique=True),
+        # Legacy users may have no id_number, so uniqueness only applies where it is set
+        IndexModel(
+            [("id_number", ASCENDING)],
+            name="id_number_unique",
+            unique=True,
+            partialFilterExpression={"id_number": {"$exists": True}}
+        ),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)], name="name_id"),
+        IndexModel([("search_names", ASCENDING)], name="search_names"),
+        IndexModel([("name", TEXT)], name="name_text"),
+    ]
+    projection = {"search_names": 0}
+
+    async def insert(self, document: dict) -> str:
+        return await super().insert(with_search_fields(document))
+
+    async def insert_many(self, documents: list) -> list:
+        return await super().insert_many([with_search_fields(document) for document in documents])
+
+    async def find_for_login(self, name: str, phone: str, id_number: str):
+        """
+        The user with these credentials, in one phone_unique lookup. Legacy
+        users stored without an ID number match on name and phone alone.
+        """
+        return serialize_document(await self.collection.find_one({
+            "phone": phone,
+            "name": name,
+            "$or": [{"id_number": id_number}, {"id_number": {"$exists": False}}]
+        }, self.projection))
+
+    async def find_conflict(self, phone: str, id_number: str):
+        """The user already holding this phone or ID number, if any"""
+        return serialize_document(await self.collection.find_one(
+            {"$or": [{"phone": phone}, {"id_number": id_number}]},
+            self.projection
+        ))
+
+    def search_query(self, search, mode: str = "prefix") -> dict:
+        """
+        Build an index-backed filter for the admin user search.
+        Digit-only input (dashes and spaces ignored) is an anchored prefix of
+        the phone or ID number. A complete number is its own prefix, and a
+        partly typed one still matches. Other input is an anchored prefix of any
+        word of the name, or a full-text match on the name when `mode` is "text".
+        """
+        if not search or not search.strip():
+            return {}
+
+        digits = search.replace("-", "").replace(" ", "")
+        if digits.isdigit():
+            prefix = {"$regex": "^" + re.escape(digits)}
+            return {"$or": [{"phone": prefix}, {"id_number": prefix}]}
+
+        if mode == "text":
+            return {"$text": {"$search": search}}
+
+        return {"search_names": {"$regex": "^" + re.escape(normalize_name(search))}}
+
+    async def list_page(self, query: dict, sort_by: str, sort_direction: int, skip: int, limit: int):
+        return await self._find_all(
+            query,
+            sort=(sort_by, sort_direction),
+            skip=skip,
+            limit=limit
+        )
+
+    async def list_keyset(self, query: dict, sort_by: str, sort_direction: int, limit: int,
+                          after=None, backwards: bool = False):
+        return await self._find_keyset(
+            query,
+            sort_by,
+            sort_direction,
+            limit,
+            after=after,
+            backwards=backwards
+        )
+
+    async def backfill_search_fields(self, batch_size: int = 1000) -> int:
+        """Populate `search_names` on users created before the indexed search existed"""
+        updated = 0
+        batch = []
+        cursor = self.collection.find({"search_names": {"$exists": False}}, {"name": 1})
+        async for user in cursor:
+            fields = with_search_fields({"name": user.get("name", "")})
+            batch.append(UpdateOne({"_id": user["_id"]}, {"$set": fields}))
+            if len(batch) >= batch_size:
+                updated += (await self.collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await self.collection.bulk_write(batch, ordered=False)).modified_count
+        return updated
+
+    async def backfill_id_numbers(self, rows, batch_size: int = 1000) -> dict:
+        """
+        Set `id_number` on legacy users from (phone, id_number) pairs. Users
+        that already have one are left alone; pairs whose ID number belongs to
+        another user are counted as duplicates and skipped.
+        """
+        result = {"updated": 0, "duplicates": 0}
+
+        async def flush(batch):
+            try:
+                result["updated"] += (await self.collection.bulk_write(batch, ordered=False)).modified_count
+            except BulkWriteError as e:
+                result["updated"] += e.details.get("nModified", 0)
+                result["duplicates"] += sum(1 for error in e.details.get("writeErrors", []) if error.get("code") == 11000)
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+
+        batch = []
+        for phone, id_number in rows:
+            batch.append(UpdateOne(
+                {"phone": phone, "id_number": {"$exists": False}},
+                {"$set": {"id_number": id_number}}
+            ))
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+        return result
@@ -1,29 +1,38 @@
-from fastapi import APIRouter, HTTPException
-from config import db
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Optional
 from schemas import Category
-from bson import ObjectId
+from repositories import categories_repository
+from services.taxonomy_cache import taxonomy_cache
+from http_cache import etag_matches, not_modified, cache_headers, TAXONOMY_CACHE_CONTROL
+from bulk_import import import_rows, detect_format, FORMAT_PATTERN
 
 router = APIRouter()
-categories_collection = db["categories"]
 
 @router.post("/categories")
-def create_category(category: Category):
-    result = categories_collection.insert_one(category.dict())
-    return {"id": str(result.inserted_id), "message": "Category created successfully"}
+async def create_category(category: Category):
+    category_id = await categories_repository.insert(category.dict())
+    await taxonomy_cache.invalidate()
+    return {"id": category_id, "message": "Category created successfully"}
+
+@router.post("/categories/import")
+async def import_categories(request: Request, format: Optional[str] = Query(None, regex=FORMAT_PATTERN)):
+    """Bulk-create categories from an NDJSON or CSV upload (name)"""
+    report = await import_rows(request, detect_format(request, format), Category, categories_repository, Category.dict)
+    if report.inserted:
+        await taxonomy_cache.invalidate()
+    return report.as_dict()
 
 @router.get("/categories")
-def list_categories():
-    categories = list(categories_collection.find({}))
-    for category in categories:
-        category["id"] = str(category["_id"])
-        del category["_id"]
-    return categories
+async def list_categories(request: Request):
+    categories = await taxonomy_cache.categories()
+    body, etag = taxonomy_cache.rendered("categories", categories)
+    if etag_matches(request, etag):
+        return not_modified(etag, TAXONOMY_CACHE_CONTROL)
+    return Response(body, media_type="application/json", headers=cache_headers(etag, TAXONOMY_CACHE_CONTROL))
 
 @router.get("/categories/{category_id}")
-def get_category(category_id: str):
-    category = categories_collection.find_one({"_id": ObjectId(category_id)})
+async def get_category(category_id: str):
+    category = await categories_repository.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    category["id"] = str(category["_id"])
-    del category["_id"]
     return category
\ No newline at end of file
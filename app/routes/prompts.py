@@ -1,115 +1,415 @@
-from fastapi import APIRouter, HTTPException
-from config import db
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse
 from schemas import PromptRequest
-from services.ai_service import generate_lesson
-from bson import ObjectId
+from services.ai_service import generate_lesson, stream_lesson, LessonCapacityError
+from services.lesson_cache import lesson_cache
+from services.lesson_jobs import lesson_job_queue
+from services.lesson_batch import LessonBatch, LESSON_BATCH_MAX_ITEMS
+from repositories import prompts_repository, lesson_jobs_repository
+from repositories.prompts import build_prompt_doc, SUMMARY_FIELDS
+from pagination import encode_cursor, decode_cursor, InvalidCursorError
+from serialization import FastJSONResponse
+from rate_limit import rate_limiter, request_identity
+from http_cache import content_etag, etag_matches, not_modified, cache_headers, LESSON_CACHE_CONTROL
+from exports import export_response, export_query, as_stored_time, EXPORT_BATCH_SIZE, FORMAT_PATTERN as EXPORT_FORMAT_PATTERN
 from datetime import datetime
+from typing import List, Optional
+import orjson
+import asyncio
+import json
+import logging
 
 router = APIRouter()
-prompts_collection = db["prompts"]
-categories_collection = db["categories"]
-sub_categories_collection = db["sub_categories"]
+logger = logging.getLogger(__name__)
+
+# Strong references to lesson streams that outlive their HTTP response
+_background_tasks = set()
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @router.post("/prompts")
-async def create_prompt(prompt_request: PromptRequest):
-    """Create new lesson"""
+async def create_prompt(
+    prompt_request: PromptRequest,
+    request: Request,
+    bypass_cache: bool = Query(False),
+    run_async: bool = Query(False, alias="async")
+):
+    """Create new lesson, or queue it as a background job with ?async=true"""
+    await rate_limiter.check("lessons", request_identity(request, [prompt_request.user_id]))
+    if run_async:
+        return await enqueue_prompt(prompt_request, bypass_cache)
+
     try:
-        print(f"Creating new lesson for user: {prompt_request.user_id}")
-        print(f"Category: {prompt_request.category_id}, Sub-category: {prompt_request.sub_category_id}")
-        print(f"Question: {prompt_request.prompt}")
-        
-        category_name = ""
-        sub_category_name = ""
-        
-        try:
-            if prompt_request.category_id:
-                category = categories_collection.find_one({"_id": ObjectId(prompt_request.category_id)})
-                category_name = category["name"] if category else ""
-                
-            if prompt_request.sub_category_id:
-                sub_category = sub_categories_collection.find_one({"_id": ObjectId(prompt_request.sub_category_id)})
-                sub_category_name = sub_category["name"] if sub_category else ""
-        except:
-            if prompt_request.category_id:
-                category = categories_collection.find_one({"_id": prompt_request.category_id})
-                category_name = category["name"] if category else ""
-                
-            if prompt_request.sub_category_id:
-                sub_category = sub_categories_collection.find_one({"_id": prompt_request.sub_category_id})
-                sub_category_name = sub_category["name"] if sub_category else ""
-        
-        ai_response = await generate_lesson(prompt_request.prompt)
-        
-        prompt_doc = {
-            "user_id": prompt_request.user_id,
-            "category_id": prompt_request.category_id,
-            "sub_category_id": prompt_request.sub_category_id,
-            "prompt": prompt_request.prompt,
-            "response": ai_response,
-            "created_at": datetime.utcnow()
-        }
+        logger.debug(
+            "Creating new lesson for user %s (category %s, sub-category %s)",
+            prompt_request.user_id, prompt_request.category_id, prompt_request.sub_category_id
+        )
+
+        ai_response = await generate_lesson(
+            prompt_request.prompt,
+            prompt_request.category_id,
+            prompt_request.sub_category_id,
+            use_cache=not bypass_cache
+        )
         
-        result = prompts_collection.insert_one(prompt_doc)
+        prompt_id = await prompts_repository.insert(build_prompt_doc(prompt_request, ai_response))
         
-        print("Lesson created successfully")
+        logger.info("Lesson created", extra={"prompt_id": prompt_id})
         
         return {
             "success": True,
-            "id": str(result.inserted_id),
+            "id": prompt_id,
             "response": ai_response,
             "message": "Lesson generated successfully"
         }
         
+    except LessonCapacityError as e:
+        logger.warning("Rejecting lesson request: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        print(f"Error creating lesson: {e}")
+        logger.exception("Error creating lesson")
         raise HTTPException(status_code=500, detail=f"Error generating lesson: {str(e)}")
 
+async def enqueue_prompt(prompt_request: PromptRequest, bypass_cache: bool):
+    try:
+        job_id = await lesson_job_queue.enqueue(prompt_request, use_cache=not bypass_cache)
+    except Exception as e:
+        logger.exception("Error queueing lesson")
+        raise HTTPException(status_code=500, detail=f"Error queueing lesson: {str(e)}")
+
+    logger.info("Lesson job queued", extra={"job_id": job_id})
+    return JSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/prompts/jobs/{job_id}",
+            "message": "Lesson generation queued"
+        }
+    )
+
+@router.post("/prompts/batch")
+async def create_prompt_batch(
+    prompt_requests: List[PromptRequest],
+    request: Request,
+    bypass_cache: bool = Query(False),
+    stream: bool = Query(False)
+):
+    """
+    Generate several lessons concurrently and store them in one write.
+    With ?stream=true each item's result is sent as an NDJSON line as soon
+    as it finishes and is saved, followed by a summary line.
+    """
+    if not prompt_requests:
+        raise HTTPException(status_code=400, detail="The batch is empty")
+    if len(prompt_requests) > LESSON_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch holds at most {LESSON_BATCH_MAX_ITEMS} prompts")
+    await rate_limiter.check(
+        "lesson_batches",
+        request_identity(request, [prompt_request.user_id for prompt_request in prompt_requests]),
+        cost=len(prompt_requests)
+    )
+
+    batch = LessonBatch(prompt_requests, use_cache=not bypass_cache)
+    if stream:
+        # As with /prompts/stream, the batch runs in its own task so lessons
+        # already paid for are still saved if the client disconnects.
+        lines = asyncio.Queue()
+        task = asyncio.create_task(_produce_batch_stream(batch, lines))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        return StreamingResponse(_drain(lines), media_type="application/x-ndjson")
+
+    try:
+        items = [item async for item in batch.results()]
+        saved = await batch.save()
+    except Exception:
+        logger.exception("Error creating lesson batch")
+        raise HTTPException(status_code=500, detail="Error saving lesson batch")
+
+    logger.info("Lesson batch created", extra=batch.summary())
+    items.sort(key=lambda item: item["index"])
+    return {"success": batch.failed == 0, **batch.summary(), "saved": saved, "items": items}
+
+async def _produce_batch_stream(batch: LessonBatch, lines: asyncio.Queue):
+    """Put each saved item of `batch` into `lines` as NDJSON, then the summary line"""
+    error = None
+    try:
+        async for item in batch.saved_results():
+            await lines.put(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE))
+        logger.info("Lesson batch created", extra=batch.summary())
+    except Exception:
+        logger.exception("Error creating streamed lesson batch")
+        error = "Error creating lesson batch"
+    finally:
+        summary = {"done": True, **batch.summary(), "saved": batch.saved}
+        if error:
+            summary["error"] = error
+        await lines.put(orjson.dumps(summary, option=orjson.OPT_APPEND_NEWLINE))
+        await lines.put(None)
+
+async def _drain(lines: asyncio.Queue):
+    while True:
+        line = await lines.get()
+        if line is None:
+            break
+        yield line
+
+@router.get("/prompts/jobs/{job_id}")
+async def get_prompt_job(job_id: str):
+    """Get the status of a background lesson job, with the lesson once it is ready"""
+    try:
+        job = await lesson_jobs_repository.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Lesson job not found")
+
+        result = None
+        if job["status"] == "completed":
+            result = await prompts_repository.get(job["prompt_id"])
+
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "error": job["error"],
+            "prompt_id": job["prompt_id"],
+            "result": result,
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"]
+        }
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching lesson job %s", job_id)
+        raise HTTPException(status_code=500, detail="Error fetching lesson job")
+
+async def _produce_lesson_stream(prompt_request: PromptRequest, events: asyncio.Queue):
+    """Pull the lesson from the generator into `events` and persist whatever was produced"""
+    parts = []
+    completed = False
+    try:
+        async for text in stream_lesson(prompt_request.prompt):
+            parts.append(text)
+            await events.put(format_sse("token", {"text": text}))
+        completed = True
+    except LessonCapacityError as e:
+        logger.warning("Rejecting lesson stream: %s", e)
+        await events.put(format_sse("error", {"error": str(e), "status_code": 503}))
+    except Exception as e:
+        logger.exception("Error streaming lesson")
+        await events.put(format_sse("error", {"error": f"Error generating lesson: {str(e)}", "status_code": 500}))
+
+    try:
+        if parts:
+            prompt_doc = build_prompt_doc(prompt_request, "".join(parts))
+            prompt_doc["completed"] = completed
+            prompt_id = await prompts_repository.insert(prompt_doc)
+            logger.info("Streamed lesson saved", extra={"prompt_id": prompt_id, "completed": completed})
+            await events.put(format_sse("done", {"id": prompt_id, "completed": completed}))
+    except Exception:
+        logger.exception("Error saving streamed lesson")
+        await events.put(format_sse("error", {"error": "Error saving lesson", "status_code": 500}))
+    finally:
+        await events.put(None)
+
+@router.post("/prompts/stream")
+async def stream_prompt(prompt_request: PromptRequest, request: Request):
+    """Create new lesson, streaming it to the client as Server-Sent Events"""
+    await rate_limiter.check("lessons", request_identity(request, [prompt_request.user_id]))
+    logger.debug("Streaming new lesson for user %s", prompt_request.user_id)
+
+    # Generation runs in its own task so the lesson is still completed and
+    # saved if the client disconnects halfway through the stream.
+    events = asyncio.Queue()
+    task = asyncio.create_task(_produce_lesson_stream(prompt_request, events))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+    async def event_stream():
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/prompts/cache/stats")
+async def get_lesson_cache_stats():
+    """Lesson cache hit/miss counters"""
+    return lesson_cache.stats()
+
+def parse_fields(fields):
+    """Validate the comma-separated `fields` selection of a lesson listing"""
+    if not fields:
+        return SUMMARY_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in SUMMARY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(SUMMARY_FIELDS)}"
+        )
+    return selected
+
+async def count_prompts(query: dict, count: str):
+    if count == "none":
+        return None
+    return await prompts_repository.count(query, estimated=count == "estimated")
+
+async def list_prompt_history(query: dict, limit: int, cursor, fields, count: str = "none"):
+    """
+    One page of lesson summaries; full lesson bodies are only served by
+    GET /prompts/{id}. `count` adds the total of all pages, which clients
+    usually need with the first page only.
+    """
+    selected_fields = parse_fields(fields)
+    after = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor, "created_at")
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        after = (position["value"], position["id"])
+
+    total, prompts = await asyncio.gather(
+        count_prompts(query, count),
+        prompts_repository.list_history(query, limit + 1, after, selected_fields)
+    )
+    has_next = len(prompts) > limit
+    prompts = prompts[:limit]
+
+    next_cursor = None
+    if has_next:
+        next_cursor = encode_cursor("created_at", prompts[-1]["created_at"], prompts[-1]["id"], "next")
+
+    return FastJSONResponse({
+        "prompts": prompts,
+        "total": total,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_next": has_next
+    })
+
 @router.get("/users/{user_id}/prompts")
-def get_user_prompts(user_id: str):
-    """Get all lessons for a user"""
+async def get_user_prompts(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    fields: str = Query(None),
+    count: str = Query("none", regex="^(exact|estimated|none)$")
+):
+    """Get a page of lesson summaries for a user, newest first"""
     try:
-        prompts = list(prompts_collection.find({"user_id": user_id}).sort("created_at", -1))
+        return await list_prompt_history({"user_id": user_id}, limit, cursor, fields, count)
         
-        for prompt in prompts:
-            prompt["id"] = str(prompt["_id"])
-            del prompt["_id"]
-            
-        return prompts
-        
-    except Exception as e:
-        print(f"Error fetching user prompts: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching prompts of user %s", user_id)
         raise HTTPException(status_code=500, detail="Error fetching user learning history")
 
 @router.get("/prompts")
-def list_all_prompts():
-    """Get all lessons (for admin dashboard)"""
+async def list_all_prompts(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    fields: str = Query(None),
+    count: str = Query("none", regex="^(exact|estimated|none)$")
+):
+    """Get a page of lesson summaries (for admin dashboard), newest first"""
     try:
-        prompts = list(prompts_collection.find({}).sort("created_at", -1))
+        return await list_prompt_history({}, limit, cursor, fields, count)
         
-        for prompt in prompts:
-            prompt["id"] = str(prompt["_id"])
-            del prompt["_id"]
-            
-        return prompts
-        
-    except Exception as e:
-        print(f"Error fetching all prompts: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching all prompts")
         raise HTTPException(status_code=500, detail="Error fetching prompts")
 
+def export_lessons(query: dict, format: str, created_from, created_to, gzip: bool, name: str):
+    """Stream every matching lesson, oldest first; see exports.py"""
+    created_from, created_to = as_stored_time(created_from), as_stored_time(created_to)
+    if created_from and created_to and created_from >= created_to:
+        raise HTTPException(status_code=400, detail="`from` must be earlier than `to`")
+    lessons = prompts_repository.iter_export(query, created_from, created_to, batch_size=EXPORT_BATCH_SIZE)
+    return export_response(lessons, format, gzip, name)
+
+@router.get("/prompts/export")
+async def export_all_prompts(
+    format: str = Query("ndjson", regex=EXPORT_FORMAT_PATTERN),
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    user_id: str = Query(None),
+    category_id: str = Query(None),
+    sub_category_id: str = Query(None),
+    gzip: bool = Query(False)
+):
+    """Export lessons with their full bodies as NDJSON or CSV (for offline analysis)"""
+    return export_lessons(
+        export_query(user_id, category_id, sub_category_id),
+        format, created_from, created_to, gzip, "lessons"
+    )
+
+@router.get("/users/{user_id}/prompts/export")
+async def export_user_prompts(
+    user_id: str,
+    format: str = Query("ndjson", regex=EXPORT_FORMAT_PATTERN),
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    category_id: str = Query(None),
+    sub_category_id: str = Query(None),
+    gzip: bool = Query(False)
+):
+    """Export one user's lessons as NDJSON or CSV"""
+    return export_lessons(
+        export_query(user_id, category_id, sub_category_id),
+        format, created_from, created_to, gzip, f"lessons-user-{user_id}"
+    )
+
+@router.get("/categories/{category_id}/prompts/export")
+async def export_category_prompts(
+    category_id: str,
+    format: str = Query("ndjson", regex=EXPORT_FORMAT_PATTERN),
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    sub_category_id: str = Query(None),
+    gzip: bool = Query(False)
+):
+    """Export the lessons of one category as NDJSON or CSV"""
+    return export_lessons(
+        export_query(None, category_id, sub_category_id),
+        format, created_from, created_to, gzip, f"lessons-category-{category_id}"
+    )
+
 @router.get("/prompts/{prompt_id}")
-def get_prompt(prompt_id: str):
+async def get_prompt(prompt_id: str, request: Request):
     """Get single lesson"""
+    # Lessons are immutable once stored, so the id alone identifies the
+    # representation and a revalidation only has to check the lesson exists.
+    etag = content_etag({"prompt_id": prompt_id})
+
     try:
-        prompt = prompts_collection.find_one({"_id": ObjectId(prompt_id)})
+        if etag_matches(request, etag):
+            if not await prompts_repository.exists(prompt_id):
+                raise HTTPException(status_code=404, detail="Lesson not found")
+            return not_modified(etag, LESSON_CACHE_CONTROL)
+
+        prompt = await prompts_repository.get(prompt_id)
         
         if not prompt:
             raise HTTPException(status_code=404, detail="Lesson not found")
-            
-        prompt["id"] = str(prompt["_id"])
-        del prompt["_id"]
         
-        return prompt
+        return FastJSONResponse(prompt, headers=cache_headers(etag, LESSON_CACHE_CONTROL))
         
-    except Exception as e:
-        print(f"Error fetching prompt: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching prompt %s", prompt_id)
         raise HTTPException(status_code=500, detail="Error fetching lesson")
\ No newline at end of file
@@ -1,81 +1,98 @@
-from fastapi import APIRouter, HTTPException
-from config import db
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Optional
 from schemas import SubCategory
 from bson import ObjectId
+from repositories import sub_categories_repository
+from services.taxonomy_cache import taxonomy_cache
+from http_cache import etag_matches, not_modified, cache_headers, TAXONOMY_CACHE_CONTROL
+from bulk_import import import_rows, detect_format, FORMAT_PATTERN
+import logging
 
 router = APIRouter()
-sub_categories_collection = db["sub_categories"]
+logger = logging.getLogger(__name__)
 
 @router.post("/sub-categories")
-def create_sub_category(sub_category: SubCategory):
+async def create_sub_category(sub_category: SubCategory):
     """Create new sub-category"""
     try:
-        print(f"Creating sub-category: {sub_category.name} for category: {sub_category.category_id}")
-        
-        result = sub_categories_collection.insert_one({
+        sub_category_id = await sub_categories_repository.insert({
             "name": sub_category.name,
             "category_id": sub_category.category_id
         })
+        await taxonomy_cache.invalidate()
         
-        print(f"Sub-category created successfully with ID: {result.inserted_id}")
+        logger.info("Sub-category created", extra={"sub_category_id": sub_category_id, "category_id": sub_category.category_id})
         
         return {
             "success": True,
-            "id": str(result.inserted_id),
+            "id": sub_category_id,
             "name": sub_category.name,
             "category_id": sub_category.category_id,
             "message": "Sub-category created successfully"
         }
         
     except Exception as e:
-        print(f"Error creating sub-category: {e}")
+        logger.exception("Error creating sub-category")
         raise HTTPException(status_code=500, detail=f"Error creating sub-category: {str(e)}")
 
+@router.post("/sub-categories/import")
+async def import_sub_categories(request: Request, format: Optional[str] = Query(None, regex=FORMAT_PATTERN)):
+    """Bulk-create sub-categories from an NDJSON or CSV upload (name, category_id)"""
+    try:
+        report = await import_rows(
+            request,
+            detect_format(request, format),
+            SubCategory,
+            sub_categories_repository,
+            lambda sub_category: {"name": sub_category.name, "category_id": sub_category.category_id}
+        )
+        if report.inserted:
+            await taxonomy_cache.invalidate()
+        return report.as_dict()
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error importing sub-categories")
+        raise HTTPException(status_code=500, detail="Error importing sub-categories")
+
 @router.get("/sub-categories")
-def list_sub_categories():
+async def list_sub_categories(request: Request):
     """Get list of all sub-categories"""
     try:
-        sub_categories = list(sub_categories_collection.find({}))
-        
-        for sub_category in sub_categories:
-            sub_category["id"] = str(sub_category["_id"])
-            del sub_category["_id"]
-            
-        print(f"Retrieved {len(sub_categories)} sub-categories")
-        return sub_categories
+        sub_categories = await taxonomy_cache.sub_categories()
+        body, etag = taxonomy_cache.rendered("sub_categories", sub_categories)
+        if etag_matches(request, etag):
+            return not_modified(etag, TAXONOMY_CACHE_CONTROL)
+
+        return Response(body, media_type="application/json", headers=cache_headers(etag, TAXONOMY_CACHE_CONTROL))
         
-    except Exception as e:
-        print(f"Error fetching sub-categories: {e}")
+    except Exception:
+        logger.exception("Error fetching sub-categories")
         raise HTTPException(status_code=500, detail="Error fetching sub-categories")
 
 @router.get("/categories/{category_id}/sub-categories")
-def get_sub_categories_by_category(category_id: str):
+async def get_sub_categories_by_category(category_id: str, request: Request):
     """Get sub-categories for a specific category"""
     try:
-        sub_categories = list(sub_categories_collection.find({"category_id": category_id}))
-        
-        for sub_category in sub_categories:
-            sub_category["id"] = str(sub_category["_id"])
-            del sub_category["_id"]
-            
-        print(f"Retrieved {len(sub_categories)} sub-categories for category {category_id}")
-        return sub_categories
+        sub_categories = await taxonomy_cache.sub_categories_for(category_id)
+        body, etag = taxonomy_cache.rendered(f"sub_categories:{category_id}", sub_categories)
+        if etag_matches(request, etag):
+            return not_modified(etag, TAXONOMY_CACHE_CONTROL)
+
+        return Response(body, media_type="application/json", headers=cache_headers(etag, TAXONOMY_CACHE_CONTROL))
         
-    except Exception as e:
-        print(f"Error fetching sub-categories for category {category_id}: {e}")
+    except Exception:
+        logger.exception("Error fetching sub-categories for category %s", category_id)
         raise HTTPException(status_code=500, detail="Error fetching sub-categories")
 
 @router.get("/sub-categories/{sub_category_id}")
-def get_sub_category(sub_category_id: str):
+async def get_sub_category(sub_category_id: str):
     """Get single sub-category details"""
     try:
-        sub_category = sub_categories_collection.find_one({"_id": ObjectId(sub_category_id)})
+        sub_category = await sub_categories_repository.get(sub_category_id)
         
         if not sub_category:
             raise HTTPException(status_code=404, detail="Sub-category not found")
-            
-        sub_category["id"] = str(sub_category["_id"])
-        del sub_category["_id"]
         
         return sub_category
         
@@ -83,20 +100,21 @@ def get_sub_category(sub_category_id: str):
         raise HTTPException(status_code=400, detail="Invalid sub-category ID format")
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error fetching sub-category {sub_category_id}: {e}")
+    except Exception:
+        logger.exception("Error fetching sub-category %s", sub_category_id)
         raise HTTPException(status_code=500, detail="Error fetching sub-category")
 
 @router.delete("/sub-categories/{sub_category_id}")
-def delete_sub_category(sub_category_id: str):
+async def delete_sub_category(sub_category_id: str):
     """Delete sub-category"""
     try:
-        result = sub_categories_collection.delete_one({"_id": ObjectId(sub_category_id)})
+        deleted = await sub_categories_repository.delete(sub_category_id)
         
-        if result.deleted_count == 0:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Sub-category not found")
+        await taxonomy_cache.invalidate()
             
-        print(f"Sub-category {sub_category_id} deleted successfully")
+        logger.info("Sub-category deleted", extra={"sub_category_id": sub_category_id})
         
         return {
             "success": True,
@@ -107,6 +125,6 @@ def delete_sub_category(sub_category_id: str):
         raise HTTPException(status_code=400, detail="Invalid sub-category ID format")
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error deleting sub-category {sub_category_id}: {e}")
+    except Exception:
+        logger.exception("Error deleting sub-category %s", sub_category_id)
         raise HTTPException(status_code=500, detail="Error deleting sub-category")
\ No newline at end of file
@@ -1,94 +1,88 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from config import db
-from schemas import User, Token, UserLogin
-from auth import create_access_token, verify_token
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from schemas import User, Token, UserLogin, RefreshRequest
+from auth import create_access_token, create_refresh_token, decode_refresh_token, verify_token
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
+from typing import Optional
+from repositories import users_repository
+from serialization import FastJSONResponse
+from pagination import encode_cursor, decode_cursor, InvalidCursorError
+from bulk_import import import_rows, detect_format, FORMAT_PATTERN
+import asyncio
+import logging
 
 router = APIRouter()
-users_collection = db["users"]
+logger = logging.getLogger(__name__)
+
+async def duplicate_user_detail(phone: str, id_number: str) -> str:
+    """After a duplicate key error, one lookup tells which unique field collided"""
+    conflict = await users_repository.find_conflict(phone, id_number)
+    if conflict is None or conflict.get("phone") == phone:
+        return "User with this phone number already exists"
+    return "User with this ID number already exists"
 
 @router.post("/users/register", response_model=Token)
-def register_user(user: User):
+async def register_user(user: User):
     try:
-        print(f"=== REGISTER USER REQUEST ===")
-        print(f"Registering new user: {user.name} ({user.phone})")
-
-        existing_user = users_collection.find_one({"phone": user.phone})
-        if existing_user:
-            print(f"User already exists with phone: {user.phone}")
-            raise HTTPException(
-                status_code=400, 
-                detail="User with this phone number already exists"
-            )
- 
-        existing_user_by_id = users_collection.find_one({"id_number": user.id_number})
-        if existing_user_by_id:
-            print(f"User already exists with ID number: {user.id_number}")
-            raise HTTPException(
-                status_code=400, 
-                detail="User with this ID number already exists"
-            )
-
         user_doc = {
             "name": user.name,
             "phone": user.phone,
             "id_number": user.id_number,
             "created_at": datetime.utcnow()
         }
-        
-        print(f"Inserting user document: {user_doc}")
-        result = users_collection.insert_one(user_doc)
+
+        # The unique phone and id_number indexes reject duplicates atomically
+        try:
+            user_id = await users_repository.insert(user_doc)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=400,
+                detail=await duplicate_user_detail(user.phone, user.id_number)
+            )
         
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
-            data={"sub": str(result.inserted_id)}, 
+            data={"sub": user_id}, 
             expires_delta=access_token_expires
         )
         
-        print(f"User registered successfully with ID: {result.inserted_id}")
+        logger.info("User registered", extra={"user_id": user_id})
         
         return Token(
             access_token=access_token,
             token_type="bearer",
-            user_id=str(result.inserted_id),
+            user_id=user_id,
             name=user.name,
-            id_number=user.id_number
+            id_number=user.id_number,
+            refresh_token=create_refresh_token(user_id, user.name, user.id_number)
         )
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error registering user: {e}")
+    except Exception:
+        logger.exception("Error registering user")
         raise HTTPException(status_code=500, detail="Error registering user")
 
+async def record_legacy_id_number(user: User):
+    """
+    A legacy user's first login records the ID number they give, so later
+    logins must match it. Returns the user as logged in now, or None when a
+    concurrent login recorded a different ID number first.
+    """
+    result = await users_repository.backfill_id_numbers([(user.phone, user.id_number)])
+    if result["duplicates"]:
+        raise HTTPException(status_code=400, detail="User with this ID number already exists")
+    return await users_repository.find_for_login(user.name, user.phone, user.id_number)
+
 @router.post("/users/login", response_model=Token)
-def login_user(user: User):
+async def login_user(user: User):
     try:
-        print(f"=== LOGIN USER REQUEST ===")
-        print(f"Login attempt for: {user.name} ({user.phone})")
-        
-        existing_user = users_collection.find_one({
-            "name": user.name,
-            "phone": user.phone,
-            "id_number": user.id_number
-        })
+        existing_user = await users_repository.find_for_login(user.name, user.phone, user.id_number)
+        if existing_user and not existing_user.get("id_number"):
+            existing_user = await record_legacy_id_number(user)
 
         if not existing_user:
-            old_user = users_collection.find_one({
-                "name": user.name,
-                "phone": user.phone
-            })
-            
-            if old_user and "id_number" not in old_user:
-                users_collection.update_one(
-                    {"_id": old_user["_id"]},
-                    {"$set": {"id_number": user.id_number}}
-                )
-                existing_user = users_collection.find_one({"_id": old_user["_id"]})
-
-        if not existing_user:
-            print(f"User not found: {user.name} ({user.phone})")
             raise HTTPException(
                 status_code=404,
                 detail="User not found. Please check your details or register first."
@@ -96,88 +90,176 @@ def login_user(user: User):
 
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
-            data={"sub": str(existing_user["_id"])}, 
+            data={"sub": existing_user["id"]}, 
             expires_delta=access_token_expires
         )
         
-        print(f"Login successful for user ID: {existing_user['_id']}")
+        logger.info("User logged in", extra={"user_id": existing_user["id"]})
 
         return Token(
             access_token=access_token,
             token_type="bearer",
-            user_id=str(existing_user["_id"]),
+            user_id=existing_user["id"],
             name=existing_user["name"],
-            id_number=existing_user.get("id_number", "")
+            id_number=existing_user.get("id_number", ""),
+            refresh_token=create_refresh_token(
+                existing_user["id"], existing_user["name"], existing_user.get("id_number", "")
+            )
         )
             
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error logging in user: {e}")
+    except Exception:
+        logger.exception("Error logging in user")
         raise HTTPException(status_code=500, detail="Error logging in user")
 
+@router.post("/users/import")
+async def import_users(request: Request, format: Optional[str] = Query(None, regex=FORMAT_PATTERN)):
+    """Bulk-register users from an NDJSON or CSV upload (name, phone, id_number)"""
+    try:
+        report = await import_rows(
+            request,
+            detect_format(request, format),
+            User,
+            users_repository,
+            lambda user: {
+                "name": user.name,
+                "phone": user.phone,
+                "id_number": user.id_number,
+                "created_at": datetime.utcnow()
+            },
+            duplicate_message="User with this phone number or ID number already exists"
+        )
+        return report.as_dict()
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error importing users")
+        raise HTTPException(status_code=500, detail="Error importing users")
+
+@router.post("/users/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest):
+    """Issue a new access token from a refresh token, without a database lookup"""
+    payload = decode_refresh_token(request.refresh_token)
+    access_token = create_access_token(
+        data={"sub": payload["sub"]},
+        expires_delta=timedelta(minutes=30)
+    )
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        user_id=payload["sub"],
+        name=payload.get("name") or "",
+        id_number=payload.get("id_number"),
+        refresh_token=request.refresh_token
+    )
+
 @router.get("/users")
-def list_users(
+async def list_users(
     page: int = Query(1, ge=1), 
     limit: int = Query(10, ge=1, le=100),
     search: str = Query(None),
     sort_by: str = Query("created_at", regex="^(name|phone|created_at)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$")
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    pagination: str = Query("page", regex="^(page|cursor)$"),
+    cursor: str = Query(None),
+    count: str = Query("exact", regex="^(exact|estimated|none)$"),
+    search_mode: str = Query("prefix", regex="^(prefix|text)$")
 ):
+    """
+    List users. Page-number mode (`page`) is kept for existing clients; pass
+    `pagination=cursor` or a `cursor` from a previous response for keyset
+    pagination, which stays fast on deep pages. `count` selects an exact
+    total, a metadata-based estimate (unfiltered lists only) or no total.
+    """
     try:
-        skip = (page - 1) * limit
-
-        query = {}
-        if search:
-            query = {
-                "$or": [
-                    {"name": {"$regex": search, "$options": "i"}},
-                    {"phone": {"$regex": search, "$options": "i"}},
-                    {"id_number": {"$regex": search, "$options": "i"}}
-                ]
-            }
+        sort_direction = -1 if sort_order == "desc" else 1
+        query = users_repository.search_query(search, search_mode)
 
-        total = users_collection.count_documents(query)
+        if cursor or pagination == "cursor":
+            return await list_users_by_cursor(query, search, sort_by, sort_order, sort_direction, limit, cursor, count)
 
-        sort_direction = -1 if sort_order == "desc" else 1
-        users = list(users_collection.find(query)
-                    .sort(sort_by, sort_direction)
-                    .skip(skip)
-                    .limit(limit))
-        
-        for user in users:
-            user["id"] = str(user["_id"])
-            del user["_id"]
+        skip = (page - 1) * limit
+        total, users = await asyncio.gather(
+            count_users(query, count),
+            users_repository.list_page(query, sort_by, sort_direction, skip, limit + 1)
+        )
+        has_next = len(users) > limit
+        users = users[:limit]
             
-        return {
+        return FastJSONResponse({
             "users": users,
             "total": total,
             "page": page,
             "limit": limit,
-            "pages": (total + limit - 1) // limit,
-            "has_next": page * limit < total,
+            "pages": (total + limit - 1) // limit if total is not None else None,
+            "has_next": has_next,
             "has_prev": page > 1,
             "search": search,
             "sort_by": sort_by,
             "sort_order": sort_order
-        }
+        })
         
-    except Exception as e:
-        print(f"Error fetching users: {e}")
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Error fetching users")
         raise HTTPException(status_code=500, detail="Error fetching users list")
 
+async def count_users(query: dict, count: str):
+    if count == "none":
+        return None
+    return await users_repository.count(query, estimated=count == "estimated")
+
+async def list_users_by_cursor(query: dict, search, sort_by: str, sort_order: str, sort_direction: int,
+                               limit: int, cursor, count: str):
+    after = None
+    backwards = False
+    if cursor:
+        position = decode_cursor(cursor, sort_by)
+        after = (position["value"], position["id"])
+        backwards = position["direction"] == "prev"
+
+    total, users = await asyncio.gather(
+        count_users(query, count),
+        users_repository.list_keyset(query, sort_by, sort_direction, limit + 1, after, backwards)
+    )
+
+    # One extra row tells whether another page exists in the walking direction
+    has_more = len(users) > limit
+    if has_more:
+        users = users[1:] if backwards else users[:limit]
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else cursor is not None
+
+    next_cursor = None
+    prev_cursor = None
+    if users and has_next:
+        next_cursor = encode_cursor(sort_by, users[-1].get(sort_by), users[-1]["id"], "next")
+    if users and has_prev:
+        prev_cursor = encode_cursor(sort_by, users[0].get(sort_by), users[0]["id"], "prev")
+
+    return FastJSONResponse({
+        "users": users,
+        "total": total,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "search": search,
+        "sort_by": sort_by,
+        "sort_order": sort_order
+    })
+
 @router.get("/users/{user_id}")
-def get_user(user_id: str):
+async def get_user(user_id: str):
     """קבלת פרטי משתמש בודד"""
     try:
-        print(f"=== GET USER REQUEST === ID: {user_id}")
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        user = await users_repository.get(user_id)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-            
-        user["id"] = str(user["_id"])
-        del user["_id"]
         
         return user
         
@@ -185,79 +267,73 @@ def get_user(user_id: str):
         raise HTTPException(status_code=400, detail="Invalid user ID format")
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Error fetching user {user_id}: {e}")
+    except Exception:
+        logger.exception("Error fetching user %s", user_id)
         raise HTTPException(status_code=500, detail="Error fetching user details")
 
 @router.get("/users/me/profile")
-def get_current_user_profile(current_user_id: str = Depends(verify_token)):
+async def get_current_user_profile(current_user_id: str = Depends(verify_token)):
     """קבלת פרופיל המשתמש המחובר"""
     try:
-        user = users_collection.find_one({"_id": ObjectId(current_user_id)})
+        user = await users_repository.get(current_user_id)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-            
-        user["id"] = str(user["_id"])
-        del user["_id"]
         
         return user
         
-    except Exception as e:
-        print(f"Error fetching current user profile: {e}")
+    except Exception:
+        logger.exception("Error fetching current user profile")
         raise HTTPException(status_code=500, detail="Error fetching user profile")
 
 @router.delete("/users/{user_id}")
-def delete_user(user_id: str):
+async def delete_user(user_id: str):
     """מחיקת משתמש (למנהל)"""
     try:
-        result = users_collection.delete_one({"_id": ObjectId(user_id)})
+        deleted = await users_repository.delete(user_id)
         
-        if result.deleted_count == 0:
+        if not deleted:
             raise HTTPException(status_code=404, detail="User not found")
         
         return {"message": "User deleted successfully"}
         
     except ObjectId.InvalidId:
         raise HTTPException(status_code=400, detail="Invalid user ID format")
-    except Exception as e:
-        print(f"Error deleting user: {e}")
+    except Exception:
+        logger.exception("Error deleting user %s", user_id)
         raise HTTPException(status_code=500, detail="Error deleting user")
 
 @router.post("/users")
-def legacy_create_user(user: User):
+async def legacy_create_user(user: User):
     """Legacy endpoint - מחזיר רק פרטי משתמש ללא JWT"""
-    existing_user = users_collection.find_one({
-        "name": user.name,
-        "phone": user.phone,
-        "id_number": user.id_number
-    })
-    
-    if existing_user:
-        return {
-            "id": str(existing_user["_id"]),
-            "name": existing_user["name"],
-            "phone": existing_user["phone"],
-            "id_number": existing_user["id_number"],
-            "message": "User logged in successfully"
-        }
-    
-    phone_exists = users_collection.find_one({"phone": user.phone})
-    id_exists = users_collection.find_one({"id_number": user.id_number})
-    
-    if phone_exists:
-        raise HTTPException(status_code=400, detail="Phone number already registered with different details")
-    if id_exists:
+    try:
+        user_id = await users_repository.insert({
+            "name": user.name,
+            "phone": user.phone,
+            "id_number": user.id_number,
+            "created_at": datetime.utcnow()
+        })
+    except DuplicateKeyError:
+        existing_user = await users_repository.find_conflict(user.phone, user.id_number)
+        if (
+            existing_user
+            and existing_user["name"] == user.name
+            and existing_user["phone"] == user.phone
+            and existing_user.get("id_number") == user.id_number
+        ):
+            return {
+                "id": existing_user["id"],
+                "name": existing_user["name"],
+                "phone": existing_user["phone"],
+                "id_number": existing_user["id_number"],
+                "message": "User logged in successfully"
+            }
+        if existing_user is None or existing_user["phone"] == user.phone:
+            raise HTTPException(status_code=400, detail="Phone number already registered with different details")
         raise HTTPException(status_code=400, detail="ID number already registered with different details")
-    
-    result = users_collection.insert_one({
-        "name": user.name,
-        "phone": user.phone,
-        "id_number": user.id_number,
-        "created_at": datetime.utcnow()
-    })
+
     return {
-        "id": str(result.inserted_id),
+        "id": user_id,
         "name": user.name,
         "phone": user.phone,
         "id_number": user.id_number,
@@ -265,7 +341,7 @@ def legacy_create_user(user: User):
     }
 
 @router.get("/users/debug/test")
-def test_users_endpoint():
+async def test_users_endpoint():
     """טסט endpoint לוודא שהRouter עובד"""
     return {
         "message": "Users router is working",
@@ -273,6 +349,8 @@ def test_users_endpoint():
         "available_endpoints": [
             "POST /api/users/register (returns JWT)",
             "POST /api/users/login (returns JWT)", 
+            "POST /api/users/refresh (new JWT from a refresh token)",
+            "POST /api/users/import (NDJSON or CSV bulk registration)",
             "GET /api/users (with pagination & filtering)",
             "GET /api/users/{user_id}",
             "GET /api/users/me/profile (JWT required)",
@@ -27,6 +27,10 @@ class Token(BaseModel):
     user_id: str
     name: str
     id_number: Optional[str] = None
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     user_id: Optional[str] = None
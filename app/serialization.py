@@ -0,0 +1,23 @@
+"""
+Fast JSON rendering with orjson.
+
+FastJSONResponse is the app-wide default response class. List endpoints
+return it directly, which also skips FastAPI's jsonable_encoder pass over
+every document; datetimes are handled natively by orjson and any ObjectId
+that reaches the response is rendered as its string form.
+"""
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
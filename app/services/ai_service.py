@@ -1,56 +1,227 @@
 import os
-from openai import OpenAI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from services.lesson_cache import lesson_cache, cache_key
+from metrics import registry, LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_ERRORS, LESSON_FALLBACKS, LESSON_REJECTIONS
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Check if API key exists
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
-    print(" Missing OPENAI_API_KEY in environment variables")
-    print(" Using mock service instead of real AI")
+    logger.warning("Missing OPENAI_API_KEY in environment variables, using mock service instead of real AI")
     api_key = None
 
-client = OpenAI(api_key=api_key)
+# Upstream concurrency limits: at most LLM_MAX_CONCURRENCY completions run at
+# once, at most LLM_MAX_QUEUE callers wait for a slot, and anything beyond
+# that is rejected immediately instead of piling up behind the semaphore.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "100"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+client = AsyncOpenAI(api_key=api_key, timeout=LLM_TIMEOUT_SECONDS, max_retries=1) if api_key else None
+
+_generation_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_waiting_for_slot = 0
+
+# Lesson generations currently running, keyed by lesson cache key
+_in_flight = {}
+
+class LessonCapacityError(Exception):
+    """Raised when the lesson generator is saturated and the request is rejected"""
+
+@asynccontextmanager
+async def generation_slot():
+    """Hold one of the LLM_MAX_CONCURRENCY upstream slots, failing fast when the wait queue is full"""
+    global _waiting_for_slot
+    if _generation_semaphore.locked() and _waiting_for_slot >= LLM_MAX_QUEUE:
+        LESSON_REJECTIONS.inc()
+        raise LessonCapacityError("Lesson generation queue is full, please retry shortly")
+
+    _waiting_for_slot += 1
+    try:
+        await asyncio.wait_for(_generation_semaphore.acquire(), LLM_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        LESSON_REJECTIONS.inc()
+        raise LessonCapacityError("Timed out waiting for a lesson generation slot")
+    finally:
+        _waiting_for_slot -= 1
+
+    try:
+        yield
+    finally:
+        _generation_semaphore.release()
+
+def generation_load() -> dict:
+    return {
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "max_queue": LLM_MAX_QUEUE,
+        "waiting": _waiting_for_slot,
+        "in_flight": len(_in_flight),
+    }
+
+registry.callback(
+    "lesson_generation_load",
+    "Lesson generations waiting for an upstream slot and in flight",
+    "gauge",
+    ("state",),
+    lambda: [(("waiting",), _waiting_for_slot), (("in_flight",), len(_in_flight))]
+)
 
-async def generate_lesson(prompt: str) -> str:
+LESSON_MODEL = "gpt-4o-mini"
+MOCK_STREAM_CHUNK_SIZE = 64
+
+def lesson_messages(prompt: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": "You are an educational AI assistant. Create comprehensive, engaging lessons based on the user's request. Structure your response with clear sections, examples, and key takeaways."
+        },
+        {
+            "role": "user", 
+            "content": f"Create a detailed lesson about: {prompt}"
+        }
+    ]
+
+async def generate_lesson(prompt: str, category_id: Optional[str] = None,
+                          sub_category_id: Optional[str] = None, use_cache: bool = True) -> str:
     """
-    Generate a lesson using OpenAI GPT API or mock service
+    Generate a lesson using OpenAI GPT API or mock service.
+    Lessons from OpenAI are cached by normalized prompt and category;
+    pass use_cache=False to skip the lookup and force a fresh lesson.
     """
-    if not api_key:
-        print(f" Using mock AI lesson for: {prompt}")
+    if not client:
+        logger.debug("Using mock AI lesson")
+        LESSON_FALLBACKS.inc("complete", "not_configured")
         return generate_mock_lesson(prompt)
+
+    key = cache_key(prompt, category_id, sub_category_id)
+    if use_cache:
+        cached = await lesson_cache.get(key)
+        if cached is not None:
+            logger.debug("Serving cached AI lesson")
+            return cached
     
+    ai_response = await _single_flight(key, lambda: _generate_and_cache_lesson(key, prompt))
+
+    if ai_response is None:
+        LESSON_FALLBACKS.inc("complete", "upstream_error")
+        return generate_mock_lesson(prompt)
+    if not ai_response:
+        return "No response from AI"
+    return ai_response
+
+async def _generate_and_cache_lesson(key: str, prompt: str) -> Optional[str]:
+    async with generation_slot():
+        ai_response = await _generate_openai_lesson(prompt)
+    if ai_response:
+        await lesson_cache.set(key, ai_response)
+    return ai_response
+
+async def _single_flight(key: str, generate):
+    """
+    Share one in-flight generation between all concurrent callers with the same key.
+    Waiters are shielded from each other: a cancelled caller stops waiting but the
+    shared generation keeps running for the rest, and its error reaches every waiter.
+    """
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(generate())
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _finish_flight(key, done))
+    else:
+        logger.debug("Joining in-flight AI lesson generation")
+    return await asyncio.shield(task)
+
+def _finish_flight(key: str, task: asyncio.Future):
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    # Mark the error as retrieved in case every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+async def _generate_openai_lesson(prompt: str) -> Optional[str]:
+    """Return the lesson text, or None when the upstream call failed"""
+    started = time.perf_counter()
     try:
-        print(f" Generating AI lesson for: {prompt}")
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an educational AI assistant. Create comprehensive, engaging lessons based on the user's request. Structure your response with clear sections, examples, and key takeaways."
-                },
-                {
-                    "role": "user", 
-                    "content": f"Create a detailed lesson about: {prompt}"
-                }
-            ],
+        response = await asyncio.wait_for(client.chat.completions.create(
+            model=LESSON_MODEL,
+            messages=lesson_messages(prompt),
             max_tokens=1000,
             temperature=0.7
-        )
+        ), LLM_TIMEOUT_SECONDS)
         
-        ai_response = response.choices[0].message.content
-        if not ai_response:
-            return "No response from AI"
-            
-        print(f"AI lesson generated successfully")
-        return ai_response
+        elapsed = time.perf_counter() - started
+        LLM_REQUEST_SECONDS.observe(elapsed, "complete", "success")
+        if response.usage:
+            LLM_TOKENS.inc(LESSON_MODEL, "prompt", amount=response.usage.prompt_tokens)
+            LLM_TOKENS.inc(LESSON_MODEL, "completion", amount=response.usage.completion_tokens)
+        logger.info("AI lesson generated", extra={"llm_ms": round(elapsed * 1000, 2)})
+        return response.choices[0].message.content or ""
         
     except Exception as error:
-        print(f" Error generating AI response: {error}")
-        print(f" Falling back to mock service")
-        return generate_mock_lesson(prompt)
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "complete", "error")
+        LLM_ERRORS.inc("complete", type(error).__name__)
+        logger.warning("Error generating AI response, falling back to mock service: %s", error)
+        return None
+
+async def stream_lesson(prompt: str) -> AsyncIterator[str]:
+    """
+    Yield lesson text chunks as they are generated by OpenAI or the mock service
+    """
+    if not client:
+        logger.debug("Streaming mock AI lesson")
+        LESSON_FALLBACKS.inc("stream", "not_configured")
+        async for chunk in stream_mock_lesson(prompt):
+            yield chunk
+        return
+
+    async with generation_slot():
+        received_text = False
+        started = time.perf_counter()
+        try:
+            stream = await asyncio.wait_for(client.chat.completions.create(
+                model=LESSON_MODEL,
+                messages=lesson_messages(prompt),
+                max_tokens=1000,
+                temperature=0.7,
+                stream=True
+            ), LLM_TIMEOUT_SECONDS)
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    received_text = True
+                    yield text
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "stream", "success")
+
+        except Exception as error:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "stream", "error")
+            LLM_ERRORS.inc("stream", type(error).__name__)
+            # Once tokens have reached the client we cannot switch to the
+            # mock lesson without producing a garbled mix of both.
+            if received_text:
+                raise
+            LESSON_FALLBACKS.inc("stream", "upstream_error")
+            logger.warning("Error streaming AI response, falling back to mock service: %s", error)
+            async for chunk in stream_mock_lesson(prompt):
+                yield chunk
+
+async def stream_mock_lesson(prompt: str, chunk_size: int = MOCK_STREAM_CHUNK_SIZE) -> AsyncIterator[str]:
+    lesson = generate_mock_lesson(prompt)
+    for start in range(0, len(lesson), chunk_size):
+        yield lesson[start:start + chunk_size]
+        await asyncio.sleep(0)
 
 def generate_mock_lesson(prompt: str) -> str:
     return f"""#  AI Learning Lesson: {prompt}
@@ -0,0 +1,117 @@
+import os
+import asyncio
+import logging
+from typing import AsyncIterator, List
+from bson import ObjectId
+from schemas import PromptRequest
+from repositories import prompts_repository
+from repositories.prompts import build_prompt_doc
+from services.ai_service import generate_lesson, LessonCapacityError
+
+logger = logging.getLogger(__name__)
+
+LESSON_BATCH_MAX_ITEMS = int(os.getenv("LESSON_BATCH_MAX_ITEMS", "100"))
+LESSON_BATCH_CONCURRENCY = int(os.getenv("LESSON_BATCH_CONCURRENCY", "8"))
+
+class LessonBatch:
+    """
+    Fan a list of prompt requests out to generate_lesson, at most `concurrency`
+    at a time, and store the generated lessons with one insert_many.
+    Lesson ids are assigned as each item completes; results() reports them
+    before the batch is saved, saved_results() only once they are stored.
+    """
+
+    def __init__(self, prompt_requests: List[PromptRequest], use_cache: bool = True,
+                 concurrency: int = None):
+        self.prompt_requests = prompt_requests
+        self.use_cache = use_cache
+        self.concurrency = concurrency or LESSON_BATCH_CONCURRENCY
+        # Completed lessons not stored yet
+        self.documents = []
+        self.completed = 0
+        self.failed = 0
+        self.saved = 0
+
+    async def _generate(self, index: int, semaphore: asyncio.Semaphore) -> dict:
+        prompt_request = self.prompt_requests[index]
+        async with semaphore:
+            try:
+                response = await generate_lesson(
+                    prompt_request.prompt,
+                    prompt_request.category_id,
+                    prompt_request.sub_category_id,
+                    use_cache=self.use_cache
+                )
+            except LessonCapacityError as e:
+                self.failed += 1
+                return {"index": index, "status": "rejected", "error": str(e)}
+            except Exception:
+                logger.exception("Error generating lesson %s of a batch", index)
+                self.failed += 1
+                return {"index": index, "status": "failed", "error": "Error generating lesson"}
+
+        document = build_prompt_doc(prompt_request, response)
+        document["_id"] = ObjectId()
+        self.documents.append(document)
+        self.completed += 1
+        return {"index": index, "status": "completed", "id": str(document["_id"]), "response": response}
+
+    def _start(self) -> list:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return [asyncio.create_task(self._generate(index, semaphore)) for index in range(len(self.prompt_requests))]
+
+    async def results(self) -> AsyncIterator[dict]:
+        """Yield each item's result as soon as it finishes; unfinished items are cancelled on early exit"""
+        tasks = self._start()
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def saved_results(self) -> AsyncIterator[dict]:
+        """
+        Like results(), but completed lessons are stored before their items are
+        yielded, so every id handed out points to a saved lesson. Items that
+        finish together are stored with one insert_many; if that write fails
+        they are reported as failed instead.
+        """
+        pending = self._start()
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                items = sorted((task.result() for task in done), key=lambda item: item["index"])
+                try:
+                    await self.save()
+                except Exception:
+                    logger.exception("Error saving lessons of a batch")
+                    self.documents = []
+                    for item in items:
+                        if item["status"] == "completed":
+                            item.update(status="failed", error="Error saving lesson")
+                            del item["id"], item["response"]
+                            self.completed -= 1
+                            self.failed += 1
+                for item in items:
+                    yield item
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def save(self) -> int:
+        """Store the completed lessons not stored yet in one write; returns how many were stored"""
+        if not self.documents:
+            return 0
+        documents, self.documents = self.documents, []
+        ids = await prompts_repository.insert_many(documents)
+        saved = sum(1 for document_id in ids if document_id is not None)
+        self.saved += saved
+        return saved
+
+    def summary(self) -> dict:
+        return {
+            "total": len(self.prompt_requests),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,114 @@
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from repositories import lesson_cache_repository
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LESSON_CACHE_MAX_ENTRIES = int(os.getenv("LESSON_CACHE_MAX_ENTRIES", "1000"))
+LESSON_CACHE_TTL_SECONDS = int(os.getenv("LESSON_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LESSON_CACHE_PERSISTENT = os.getenv("LESSON_CACHE_PERSISTENT", "false").lower() == "true"
+
+# Sentence punctuation around a word; symbols such as the + of "C++", the #
+# of "C#" or the leading dot of ".NET" are part of the word and stay
+_OPENING_PUNCTUATION = "\"'\u201c\u2018([{<\u00bf\u00a1"
+_CLOSING_PUNCTUATION = "\"'\u201d\u2019)]}>.,;:!?\u2026"
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case the prompt, strip sentence punctuation from each word and collapse whitespace"""
+    words = (word.lstrip(_OPENING_PUNCTUATION).rstrip(_CLOSING_PUNCTUATION) for word in prompt.casefold().split())
+    return " ".join(word for word in words if word)
+
+def cache_key(prompt: str, category_id: Optional[str] = None, sub_category_id: Optional[str] = None) -> str:
+    raw = "\x1f".join([category_id or "", sub_category_id or "", normalize_prompt(prompt)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class LessonCache:
+    """In-process LRU of generated lessons with TTL, backed by an optional Mongo tier"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, persistent: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response
+            del self._entries[key]
+
+        if self.persistent:
+            try:
+                entry = await lesson_cache_repository.find_entry(key)
+            except Exception as e:
+                logger.warning("Lesson cache lookup failed: %s", e)
+                entry = None
+            if entry is not None:
+                self.persistent_hits += 1
+                # Keep the stored expiry, so a promoted entry cannot outlive it
+                remaining = (entry["expires_at"] - datetime.utcnow()).total_seconds()
+                self._remember(key, entry["response"], min(self.ttl_seconds, remaining))
+                return entry["response"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, response: str):
+        self._remember(key, response)
+        if self.persistent:
+            expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            try:
+                await lesson_cache_repository.save_response(key, response, expires_at)
+            except Exception as e:
+                logger.warning("Lesson cache write failed: %s", e)
+
+    def _remember(self, key: str, response: str, ttl_seconds: Optional[float] = None):
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self.persistent,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+lesson_cache = LessonCache(LESSON_CACHE_MAX_ENTRIES, LESSON_CACHE_TTL_SECONDS, LESSON_CACHE_PERSISTENT)
+
+registry.callback(
+    "lesson_cache_lookups_total",
+    "Lesson cache lookups by result",
+    "counter",
+    ("result",),
+    lambda: [
+        (("hit",), lesson_cache.hits),
+        (("persistent_hit",), lesson_cache.persistent_hits),
+        (("miss",), lesson_cache.misses),
+    ]
+)
@@ -0,0 +1,156 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from schemas import PromptRequest
+from repositories import lesson_jobs_repository, prompts_repository
+from repositories.prompts import build_prompt_doc
+from services.ai_service import generate_lesson, LessonCapacityError
+
+logger = logging.getLogger(__name__)
+
+LESSON_JOB_WORKERS = int(os.getenv("LESSON_JOB_WORKERS", "4"))
+LESSON_JOB_MAX_ATTEMPTS = int(os.getenv("LESSON_JOB_MAX_ATTEMPTS", "3"))
+LESSON_JOB_STALE_SECONDS = int(os.getenv("LESSON_JOB_STALE_SECONDS", "300"))
+LESSON_JOB_RETRY_DELAY_SECONDS = float(os.getenv("LESSON_JOB_RETRY_DELAY_SECONDS", "2"))
+LESSON_JOB_SWEEP_SECONDS = float(os.getenv("LESSON_JOB_SWEEP_SECONDS", "30"))
+
+class LessonJobQueue:
+    """
+    In-process worker pool for background lesson generation.
+    Job state lives in the lesson_jobs collection. Every sweep_seconds the
+    pool queues the jobs that are due: new work, retries whose
+    next_attempt_at has passed and running jobs whose worker died, so jobs
+    survive restarts of this or any other process.
+    """
+
+    def __init__(self, workers: int, sweep_seconds: float = LESSON_JOB_SWEEP_SECONDS):
+        self.worker_count = workers
+        self.sweep_seconds = sweep_seconds
+        self._queue = asyncio.Queue()
+        # Ids in _queue, so a sweep does not queue them twice
+        self._queued = set()
+        self._running = set()
+        self._retries = {}
+        self._workers = []
+        self._sweeper = None
+
+    async def start(self):
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+        recovered = await self.sweep()
+        self._sweeper = asyncio.create_task(self._sweep_periodically())
+        logger.info("Lesson job queue started with %s workers, %s jobs recovered", self.worker_count, recovered)
+
+    async def stop(self):
+        interrupted = set(self._running)
+        tasks = [*self._workers, *([self._sweeper] if self._sweeper else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for handle in self._retries.values():
+            handle.cancel()
+        # Jobs cut off mid-run go back to the queue without using up an attempt
+        for job_id in interrupted:
+            try:
+                await lesson_jobs_repository.release(job_id)
+            except Exception as e:
+                logger.warning("Could not release lesson job %s: %s", job_id, e)
+        # Whatever was queued here is still queued in storage for the next sweep
+        self._queue = asyncio.Queue()
+        self._queued.clear()
+        self._running.clear()
+        self._retries.clear()
+        self._workers = []
+        self._sweeper = None
+
+    async def enqueue(self, prompt_request: PromptRequest, use_cache: bool = True) -> str:
+        request = prompt_request.dict()
+        request["use_cache"] = use_cache
+        job_id = await lesson_jobs_repository.create(request)
+        self._put(job_id)
+        return job_id
+
+    async def sweep(self) -> int:
+        """Queue the due jobs this process is not already handling; returns how many"""
+        try:
+            due = await lesson_jobs_repository.recover_unfinished(LESSON_JOB_STALE_SECONDS)
+        except Exception as e:
+            logger.warning("Could not recover lesson jobs: %s", e)
+            return 0
+        added = 0
+        for job_id in due:
+            if job_id not in self._queued and job_id not in self._running:
+                self._put(job_id)
+                added += 1
+        return added
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize(),
+            "running": len(self._running),
+            "retrying": len(self._retries),
+        }
+
+    def _put(self, job_id: str):
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    def _retry(self, job_id: str):
+        self._retries.pop(job_id, None)
+        if job_id not in self._queued and job_id not in self._running:
+            self._put(job_id)
+
+    async def _sweep_periodically(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            await self.sweep()
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Lesson job %s crashed", job_id)
+            finally:
+                self._running.discard(job_id)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await lesson_jobs_repository.claim(job_id)
+        if not job:
+            return
+        # Claimed by this process, so stop() may hand it back
+        self._running.add(job_id)
+
+        try:
+            request = dict(job["request"])
+            use_cache = request.pop("use_cache", True)
+            prompt_request = PromptRequest(**request)
+            ai_response = await generate_lesson(
+                prompt_request.prompt,
+                prompt_request.category_id,
+                prompt_request.sub_category_id,
+                use_cache=use_cache
+            )
+            prompt_id = await prompts_repository.insert(build_prompt_doc(prompt_request, ai_response))
+        except Exception as e:
+            if isinstance(e, LessonCapacityError) or job["attempts"] < LESSON_JOB_MAX_ATTEMPTS:
+                logger.warning("Lesson job %s will be retried: %s", job_id, e)
+                next_attempt_at = datetime.utcnow() + timedelta(seconds=LESSON_JOB_RETRY_DELAY_SECONDS)
+                await lesson_jobs_repository.requeue(job_id, str(e), next_attempt_at)
+                # The worker moves on; a restart leaves the retry to the sweep
+                self._retries[job_id] = asyncio.get_running_loop().call_later(
+                    LESSON_JOB_RETRY_DELAY_SECONDS, self._retry, job_id
+                )
+            else:
+                logger.error("Lesson job %s failed: %s", job_id, e)
+                await lesson_jobs_repository.fail(job_id, str(e))
+            return
+
+        await lesson_jobs_repository.complete(job_id, prompt_id)
+        logger.info("Lesson job %s completed", job_id)
+
+lesson_job_queue = LessonJobQueue(LESSON_JOB_WORKERS)
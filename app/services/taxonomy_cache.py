@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import logging
+from http_cache import body_etag
+from serialization import dumps
+from repositories import categories_repository, sub_categories_repository, taxonomy_version_repository
+
+logger = logging.getLogger(__name__)
+
+TAXONOMY_REFRESH_SECONDS = float(os.getenv("TAXONOMY_REFRESH_SECONDS", "30"))
+MAX_RENDERED_BODIES = 1024
+
+class TaxonomyCache:
+    """
+    Process-local copy of categories and sub-categories, loaded on first use.
+    Writes in this process invalidate it immediately; other workers notice the
+    bumped version counter within TAXONOMY_REFRESH_SECONDS and reload.
+    Returned lists are shared and must not be mutated by callers.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.version = None
+        # Bumped by invalidate(); a load that started under an older generation is dropped
+        self._generation = 0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._categories = []
+        self._sub_categories = []
+        self._category_names = {}
+        self._sub_category_names = {}
+        self._sub_categories_by_category = {}
+        self._rendered = {}
+
+    async def categories(self) -> list:
+        await self._ensure_fresh()
+        return self._categories
+
+    async def sub_categories(self) -> list:
+        await self._ensure_fresh()
+        return self._sub_categories
+
+    async def sub_categories_for(self, category_id: str) -> list:
+        await self._ensure_fresh()
+        return self._sub_categories_by_category.get(category_id, [])
+
+    async def category_name(self, category_id: str) -> str:
+        await self._ensure_fresh()
+        return self._category_names.get(category_id, "")
+
+    async def sub_category_name(self, sub_category_id: str) -> str:
+        await self._ensure_fresh()
+        return self._sub_category_names.get(sub_category_id, "")
+
+    def rendered(self, key: str, data) -> tuple:
+        """
+        JSON body and content ETag of a list returned by this cache. Both are
+        computed once per load, so repeated reads skip serialization entirely.
+        """
+        cached = self._rendered.get(key)
+        if cached is None:
+            body = dumps(data)
+            cached = (body, body_etag(body))
+            # Unknown category ids must not grow the memo without bound
+            if len(self._rendered) < MAX_RENDERED_BODIES:
+                self._rendered[key] = cached
+        return cached
+
+    async def invalidate(self):
+        """Call after any taxonomy write; forces a reload here and signals the other workers"""
+        self._generation += 1
+        self.version = None
+        await taxonomy_version_repository.bump()
+
+    async def _ensure_fresh(self):
+        if self.version is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return
+            while True:
+                generation = self._generation
+                version = await taxonomy_version_repository.get_version()
+                if version == self.version:
+                    break
+                loaded = await self._fetch()
+                # A write here during the load may not be in `loaded`; load again
+                if generation == self._generation:
+                    self._apply(*loaded)
+                    self.version = version
+                    break
+            self._checked_at = time.monotonic()
+
+    async def _fetch(self) -> tuple:
+        return await asyncio.gather(
+            categories_repository.list_all(),
+            sub_categories_repository.list_all()
+        )
+
+    def _apply(self, categories: list, sub_categories: list):
+        by_category = {}
+        for sub_category in sub_categories:
+            by_category.setdefault(sub_category.get("category_id"), []).append(sub_category)
+
+        self._categories = categories
+        self._sub_categories = sub_categories
+        self._category_names = {category["id"]: category.get("name", "") for category in categories}
+        self._sub_category_names = {sub_category["id"]: sub_category.get("name", "") for sub_category in sub_categories}
+        self._sub_categories_by_category = by_category
+        self._rendered = {}
+        logger.info("Taxonomy cache loaded: %s categories, %s sub-categories", len(categories), len(sub_categories))
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "categories": len(self._categories),
+            "sub_categories": len(self._sub_categories),
+        }
+
+taxonomy_cache = TaxonomyCache(TAXONOMY_REFRESH_SECONDS)
@@ -0,0 +1,68 @@
+import importlib
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from repositories.embedded import (
+    EmbeddedDatabase,
+    EmbeddedUserRepository,
+    EmbeddedCategoryRepository,
+    EmbeddedSubCategoryRepository,
+    EmbeddedPromptRepository,
+    EmbeddedLessonCacheRepository,
+    EmbeddedLessonJobRepository,
+    EmbeddedTaxonomyVersionRepository,
+    EmbeddedRateLimitRepository,
+)
+
+EMBEDDED_REPOSITORIES = {
+    "users_repository": EmbeddedUserRepository,
+    "categories_repository": EmbeddedCategoryRepository,
+    "sub_categories_repository": EmbeddedSubCategoryRepository,
+    "prompts_repository": EmbeddedPromptRepository,
+    "lesson_cache_repository": EmbeddedLessonCacheRepository,
+    "lesson_jobs_repository": EmbeddedLessonJobRepository,
+    "taxonomy_version_repository": EmbeddedTaxonomyVersionRepository,
+    "rate_limits_repository": EmbeddedRateLimitRepository,
+}
+
+# Modules that import repository singletons by name, and so hold their own reference
+REPOSITORY_USERS = (
+    "routes.users",
+    "routes.categories",
+    "routes.sub_categories",
+    "routes.prompts",
+    "services.lesson_batch",
+    "services.lesson_cache",
+    "services.lesson_jobs",
+    "services.taxonomy_cache",
+    "rate_limit",
+)
+
+@pytest.fixture
+def engine():
+    """An in-memory SQLite database; override it to wrap the engine"""
+    engine = EmbeddedDatabase(":memory:")
+    yield engine
+    engine.close_client()
+
+@pytest.fixture
+def storage(engine, monkeypatch):
+    """Every repository on the embedded `engine`, swapped in wherever the app imported the Mongo one"""
+    repositories = {name: repository_class(engine) for name, repository_class in EMBEDDED_REPOSITORIES.items()}
+    for module_name in REPOSITORY_USERS:
+        module = importlib.import_module(module_name)
+        for name, repository in repositories.items():
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, repository)
+    return SimpleNamespace(engine=engine, **repositories)
+
+@pytest.fixture
+def api_client(storage):
+    """Build a TestClient for a bare app serving `routers` under /api, on the embedded storage"""
+    def make(*routers) -> TestClient:
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router, prefix="/api")
+        return TestClient(app)
+    return make
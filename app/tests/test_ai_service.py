@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from services import ai_service
+
+@pytest.mark.asyncio
+async def test_generation_slot_rejects_when_queue_full(monkeypatch):
+    """Callers beyond the wait queue are rejected without waiting"""
+    monkeypatch.setattr(ai_service, "_generation_semaphore", asyncio.Semaphore(1))
+    monkeypatch.setattr(ai_service, "LLM_MAX_QUEUE", 1)
+
+    release = asyncio.Event()
+
+    async def hold_slot():
+        async with ai_service.generation_slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold_slot())
+    waiter = asyncio.create_task(hold_slot())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ai_service.LessonCapacityError):
+        async with ai_service.generation_slot():
+            pass
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert ai_service.generation_load()["waiting"] == 0
+
+@pytest.mark.asyncio
+async def test_mock_lesson_streams_in_chunks():
+    """The offline mock path streams the same lesson in several chunks"""
+    chunks = [chunk async for chunk in ai_service.stream_mock_lesson("photosynthesis")]
+    assert len(chunks) > 1
+    assert "".join(chunks) == ai_service.generate_mock_lesson("photosynthesis")
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    """Pretend OpenAI is configured and count upstream lesson generations"""
+    calls = []
+    release = asyncio.Event()
+
+    async def fake_generate(prompt):
+        calls.append(prompt)
+        await release.wait()
+        if prompt.startswith("fail"):
+            raise RuntimeError("upstream exploded")
+        return f"Lesson about {prompt}"
+
+    monkeypatch.setattr(ai_service, "client", object())
+    monkeypatch.setattr(ai_service, "_generate_openai_lesson", fake_generate)
+    ai_service.lesson_cache.clear()
+    yield calls, release
+    ai_service.lesson_cache.clear()
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_share_one_upstream_call(fake_upstream):
+    calls, release = fake_upstream
+    requests = [
+        ai_service.generate_lesson("What is photosynthesis?", "science", "biology")
+        for _ in range(30)
+    ]
+    waiters = asyncio.gather(*requests)
+    await asyncio.sleep(0.01)
+    release.set()
+
+    lessons = await waiters
+    assert len(calls) == 1
+    assert set(lessons) == {"Lesson about What is photosynthesis?"}
+    assert ai_service.generation_load()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_generation(fake_upstream):
+    calls, release = fake_upstream
+    first = asyncio.create_task(ai_service.generate_lesson("Explain gravity"))
+    second = asyncio.create_task(ai_service.generate_lesson("explain gravity!"))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    release.set()
+
+    assert await second == "Lesson about Explain gravity"
+    assert first.cancelled()
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_upstream_error_reaches_every_waiter(fake_upstream):
+    calls, release = fake_upstream
+    waiters = asyncio.gather(
+        *(ai_service.generate_lesson("fail this lesson") for _ in range(5)),
+        return_exceptions=True
+    )
+    await asyncio.sleep(0.01)
+    release.set()
+
+    results = await waiters
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
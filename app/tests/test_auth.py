@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+import auth
+from auth import (
+    VerifiedTokenCache,
+    create_access_token,
+    create_refresh_token,
+    decode_access_token,
+    token_cache,
+)
+from routes.users import refresh_access_token
+from schemas import RefreshRequest
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+def test_verified_token_is_served_from_cache(monkeypatch):
+    token = create_access_token({"sub": "user-1"})
+    assert decode_access_token(token) == "user-1"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("token was decoded again")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail)
+    assert decode_access_token(token) == "user-1"
+
+def test_cache_honors_token_expiry_and_size():
+    cache = VerifiedTokenCache(max_entries=2)
+    cache.set("expired", "user-1", time.time() - 1)
+    assert cache.get("expired") is None
+
+    cache.set("a", "user-a", time.time() + 60)
+    cache.set("b", "user-b", time.time() + 60)
+    assert cache.get("a") == "user-a"
+    cache.set("c", "user-c", time.time() + 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "user-a"
+    assert len(cache) == 2
+
+def test_expired_and_refresh_tokens_are_not_access_tokens():
+    expired = create_access_token({"sub": "user-1"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(HTTPException) as exc:
+        decode_access_token(expired)
+    assert exc.value.status_code == 401
+
+    with pytest.raises(HTTPException):
+        decode_access_token(create_refresh_token("user-1", "Dana Cohen", "123456789"))
+
+@pytest.mark.asyncio
+async def test_refresh_issues_access_token_without_database():
+    refresh_token = create_refresh_token("user-1", "Dana Cohen", "123456789")
+
+    token = await refresh_access_token(RefreshRequest(refresh_token=refresh_token))
+
+    assert token.user_id == "user-1"
+    assert token.name == "Dana Cohen"
+    assert token.refresh_token == refresh_token
+    assert decode_access_token(token.access_token) == "user-1"
+
+    with pytest.raises(HTTPException):
+        await refresh_access_token(RefreshRequest(refresh_token=token.access_token))
@@ -0,0 +1,59 @@
+import pytest
+import routes.users
+from bulk_import import csv_rows, ndjson_rows
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(rows):
+    return [row async for row in rows]
+
+@pytest.mark.asyncio
+async def test_csv_rows_across_chunks_and_quoted_newlines():
+    data = 'name,category_id\r\n"Fractions, part 1",c1\n"Multi\nline",c2\nshort\n'.encode()
+
+    rows = await collect(csv_rows(chunked(data)))
+
+    assert rows == [
+        (2, {"name": "Fractions, part 1", "category_id": "c1"}),
+        (3, {"name": "Multi\nline", "category_id": "c2"}),
+        (5, "Expected 2 columns, got 1"),
+    ]
+
+@pytest.mark.asyncio
+async def test_ndjson_rows_report_bad_lines():
+    data = b'{"name": "Math"}\n\nnot json\n[1, 2]\n{"name": "Art"}'
+
+    rows = await collect(ndjson_rows(chunked(data)))
+
+    assert rows[0] == (1, {"name": "Math"})
+    assert rows[1][0] == 3 and rows[1][1].startswith("Invalid JSON")
+    assert rows[2] == (4, "Expected a JSON object")
+    assert rows[3] == (5, {"name": "Art"})
+
+@pytest.fixture
+def client(api_client):
+    return api_client(routes.users.router)
+
+def test_user_import_reports_invalid_and_duplicate_rows(client, storage, monkeypatch):
+    monkeypatch.setattr("bulk_import.IMPORT_BATCH_SIZE", 2)
+    body = "\n".join([
+        "name,phone,id_number",
+        "Dana Cohen,050-123-4567,123456789",
+        "Avi Levi,0529999999,555555555",
+        "X,0521111111,111111111",
+        "Dana Again,0501234567,999999999",
+        "Noa Bar,0533333333,333333333",
+    ])
+
+    response = client.post("/api/users/import", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["format"] == "csv"
+    assert (report["received"], report["inserted"], report["failed"]) == (5, 3, 2)
+    assert [error["row"] for error in report["errors"]] == [4, 5]
+    assert report["errors"][0]["error"].startswith("name:")
+    assert "already exists" in report["errors"][1]["error"]
+    assert storage.engine.execute("SELECT count(*) FROM users").fetchone()[0] == 3
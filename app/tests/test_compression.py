@@ -0,0 +1,46 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from compression import CompressionMiddleware, choose_encoding
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+@app.get("/large")
+def large():
+    return {"response": "# Lesson\n" + "Photosynthesis turns light into chemical energy. " * 100}
+
+@app.get("/small")
+def small():
+    return {"message": "OK"}
+
+@app.get("/stream")
+def stream():
+    async def events():
+        for i in range(5):
+            yield f"event: token\ndata: chunk {i}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+client = TestClient(app)
+
+def test_choose_encoding_respects_quality_values():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+
+def test_large_response_is_gzipped():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert "Photosynthesis" in response.json()["response"]
+    assert int(response.headers["content-length"]) < len(response.content)
+
+def test_small_response_is_left_alone():
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"message": "OK"}
+
+def test_streaming_response_is_compressed_per_chunk():
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "data: chunk 4" in response.text
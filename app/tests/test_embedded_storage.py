@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+import pytest
+from pymongo.errors import DuplicateKeyError
+from repositories.embedded import (
+    EmbeddedUserRepository,
+    EmbeddedPromptRepository,
+    EmbeddedLessonCacheRepository,
+    EmbeddedLessonJobRepository,
+    EmbeddedTaxonomyVersionRepository,
+)
+from repositories.embedded.engine import to_filter
+
+def query_plan(engine, table, query, order_by):
+    condition = to_filter(query)
+    where = f"WHERE {condition.where}" if condition else ""
+    rows = engine.execute(
+        f"EXPLAIN QUERY PLAN SELECT id FROM {table} {where} ORDER BY {order_by} LIMIT 10",
+        condition.params
+    ).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+@pytest.mark.asyncio
+async def test_users_unique_keys_raise_duplicate_key_error(engine):
+    users = EmbeddedUserRepository(engine)
+    await users.insert({"name": "Dana Cohen", "phone": "0501234567", "id_number": "123456789", "created_at": datetime.utcnow()})
+
+    with pytest.raises(DuplicateKeyError):
+        await users.insert({"name": "Other", "phone": "0501234567", "id_number": "987654321", "created_at": datetime.utcnow()})
+    # Legacy users without an ID number do not collide with each other
+    await users.insert({"name": "Legacy One", "phone": "0500000001", "created_at": datetime.utcnow()})
+    await users.insert({"name": "Legacy Two", "phone": "0500000002", "created_at": datetime.utcnow()})
+    assert await users.count({}) == 3
+
+@pytest.mark.asyncio
+async def test_user_search_matches_name_words_and_number_prefixes(engine):
+    users = EmbeddedUserRepository(engine)
+    await users.insert({"name": "Dana Cohen", "phone": "0501234567", "id_number": "123456789", "created_at": datetime.utcnow()})
+    await users.insert({"name": "Avi Levi", "phone": "0529999999", "id_number": "555555555", "created_at": datetime.utcnow()})
+
+    assert await users.count(users.search_query("coh")) == 1
+    assert await users.count(users.search_query("dana co")) == 1
+    assert await users.count(users.search_query("050")) == 1
+    assert await users.count(users.search_query("052-999-9999")) == 1
+    assert await users.count(users.search_query("levi", "text")) == 1
+    assert await users.count(users.search_query("lev", "text")) == 0
+    page = await users.list_page(users.search_query("avi"), "created_at", -1, 0, 10)
+    assert [user["name"] for user in page] == ["Avi Levi"]
+    assert "search_names" not in page[0]
+
+@pytest.mark.asyncio
+async def test_prompt_history_pages_by_keyset_without_bodies(engine):
+    prompts = EmbeddedPromptRepository(engine)
+    started = datetime(2026, 1, 1)
+    for i in range(5):
+        await prompts.insert({
+            "user_id": "u1",
+            "prompt": f"Lesson {i}",
+            "response": "x" * 500,
+            "created_at": started + timedelta(minutes=i)
+        })
+
+    first = await prompts.list_history({"user_id": "u1"}, 2)
+    assert [p["prompt"] for p in first] == ["Lesson 4", "Lesson 3"]
+    assert "response" not in first[0]
+    assert len(first[0]["response_preview"]) == 200
+
+    after = (first[-1]["created_at"], first[-1]["id"])
+    second = await prompts.list_history({"user_id": "u1"}, 2, after=after, fields=("prompt",))
+    assert [p["prompt"] for p in second] == ["Lesson 2", "Lesson 1"]
+    assert set(second[0]) == {"id", "prompt", "created_at"}
+
+@pytest.mark.asyncio
+async def test_lesson_jobs_are_claimed_once(engine):
+    jobs = EmbeddedLessonJobRepository(engine)
+    job_id = await jobs.create({"prompt": "Teach me fractions"})
+
+    claimed = await jobs.claim(job_id)
+    assert claimed["status"] == "running"
+    assert claimed["attempts"] == 1
+    assert await jobs.claim(job_id) is None
+
+    await jobs.requeue(job_id, "busy")
+    assert await jobs.recover_unfinished(300) == [job_id]
+
+@pytest.mark.asyncio
+async def test_lesson_cache_and_taxonomy_version(engine):
+    cache = EmbeddedLessonCacheRepository(engine)
+    expires_at = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0)
+    await cache.save_response("key", "lesson", expires_at)
+    await cache.save_response("old", "lesson", datetime.utcnow() - timedelta(hours=1))
+    entry = await cache.find_entry("key")
+    assert (entry["response"], entry["expires_at"]) == ("lesson", expires_at)
+    assert await cache.find_entry("old") is None
+
+    taxonomy = EmbeddedTaxonomyVersionRepository(engine)
+    assert await taxonomy.get_version() == 0
+    assert await taxonomy.bump() == 1
+    assert await taxonomy.bump() == 2
+
+HOT_QUERIES = [
+    (EmbeddedUserRepository, "users", {"phone": "0501234567"}, "id"),
+    (EmbeddedUserRepository, "users", {"id_number": "123456789"}, "id"),
+    (EmbeddedUserRepository, "users", {}, "json_extract(doc, '$.created_at') DESC, id DESC"),
+    (EmbeddedPromptRepository, "prompts", {"user_id": "u1"}, "json_extract(doc, '$.created_at') DESC, id DESC"),
+    (EmbeddedPromptRepository, "prompts", {}, "json_extract(doc, '$.created_at') DESC, id DESC"),
+    (EmbeddedPromptRepository, "prompts", {"category_id": "c1"}, "json_extract(doc, '$.created_at') ASC, id ASC"),
+]
+
+@pytest.mark.parametrize("repository_class,table,query,order_by", HOT_QUERIES)
+def test_hot_queries_use_an_index(engine, repository_class, table, query, order_by):
+    repository_class(engine)
+    plan = query_plan(engine, table, query, order_by)
+    assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+def test_user_name_search_uses_the_search_table_index(engine):
+    users = EmbeddedUserRepository(engine)
+    plan = query_plan(engine, "users", users.search_query("dan"), "json_extract(doc, '$.created_at') DESC, id DESC")
+    assert "user_search_names" in plan and "SCAN user_search_names" not in plan, plan
+
+@pytest.mark.asyncio
+async def test_legacy_user_login_and_id_number_backfill(engine):
+    users = EmbeddedUserRepository(engine)
+    await users.insert({"name": "Dana Cohen", "phone": "0501234567", "id_number": "123456789", "created_at": datetime.utcnow()})
+    await users.insert({"name": "Legacy", "phone": "0500000001", "created_at": datetime.utcnow()})
+
+    assert (await users.find_for_login("Dana Cohen", "0501234567", "123456789"))["name"] == "Dana Cohen"
+    assert await users.find_for_login("Dana Cohen", "0501234567", "999999999") is None
+    assert (await users.find_for_login("Legacy", "0500000001", "555555555"))["name"] == "Legacy"
+    assert (await users.find_conflict("0000000000", "123456789"))["phone"] == "0501234567"
+
+    result = await users.backfill_id_numbers([("0500000001", "123456789"), ("0500000001", "555555555")])
+    assert result == {"updated": 1, "duplicates": 1}
+    assert await users.find_for_login("Legacy", "0500000001", "123456789") is None
+    assert (await users.find_for_login("Legacy", "0500000001", "555555555"))["id_number"] == "555555555"
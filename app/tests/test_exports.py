@@ -0,0 +1,66 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+import routes.prompts
+from services.taxonomy_cache import taxonomy_cache
+
+STARTED = datetime(2026, 1, 1)
+
+@pytest.fixture
+def client(api_client, storage, monkeypatch):
+    for i in range(5):
+        storage.engine.execute(
+            "INSERT INTO prompts (id, doc) VALUES (?, json_object('user_id', ?, 'category_id', ?, "
+            "'prompt', ?, 'response', ?, 'created_at', ?))",
+            (f"p{i}", "u1" if i < 4 else "u2", "c1" if i % 2 else "c2", f"Lesson {i}",
+             f"Body {i}\nwith \"quotes\"", (STARTED + timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%S.%f"))
+        )
+    monkeypatch.setattr(routes.prompts, "EXPORT_BATCH_SIZE", 2)
+
+    async def category_name(category_id):
+        return {"c1": "Math", "c2": "Science"}.get(category_id, "")
+
+    async def sub_category_name(sub_category_id):
+        return ""
+
+    monkeypatch.setattr(taxonomy_cache, "category_name", category_name)
+    monkeypatch.setattr(taxonomy_cache, "sub_category_name", sub_category_name)
+    return api_client(routes.prompts.router)
+
+def test_ndjson_export_streams_every_batch_oldest_first(client):
+    response = client.get("/api/prompts/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="lessons-' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ["p0", "p1", "p2", "p3", "p4"]
+    assert rows[1]["category_name"] == "Math"
+    assert rows[0]["response"] == 'Body 0\nwith "quotes"'
+
+def test_export_filters_by_user_category_and_date_range(client):
+    response = client.get("/api/users/u1/prompts/export", params={
+        "from": "2026-01-02T00:00:00Z",
+        "to": "2026-01-04T00:00:00",
+    })
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == ["p1", "p2"]
+
+    response = client.get("/api/categories/c1/prompts/export")
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == ["p1", "p3"]
+
+    response = client.get("/api/prompts/export", params={"from": "2026-01-03T00:00:00", "to": "2026-01-02T00:00:00"})
+    assert response.status_code == 400
+
+def test_gzipped_csv_export(client):
+    response = client.get("/api/prompts/export", params={"format": "csv", "gzip": "true", "category_id": "c2"})
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.csv.gz"')
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert [row["id"] for row in rows] == ["p0", "p2", "p4"]
+    assert rows[0]["response"] == 'Body 0\nwith "quotes"'
+    assert rows[0]["category_name"] == "Science"
+    assert rows[0]["created_at"] == "2026-01-01T00:00:00"
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from health import DatabaseHealth
+
+def make_health(ping, max_age=60):
+    return DatabaseHealth(refresh_seconds=0.01, ping_timeout=0.05, max_age=max_age, ping=ping)
+
+@pytest.mark.asyncio
+async def test_ready_after_successful_ping():
+    async def ping():
+        return True
+
+    health = make_health(ping)
+    await health.check()
+
+    assert health.is_ready()
+    assert health.status()["error"] is None
+
+@pytest.mark.asyncio
+async def test_slow_database_times_out_instead_of_hanging():
+    async def ping():
+        await asyncio.sleep(10)
+
+    health = make_health(ping)
+    await health.check()
+
+    assert not health.is_ready()
+    assert health.status()["latency_ms"] < 1000
+
+@pytest.mark.asyncio
+async def test_background_refresh_picks_up_recovery():
+    calls = []
+
+    async def ping():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("down")
+        return True
+
+    health = make_health(ping)
+    await health.start()
+    assert not health.is_ready()
+
+    await asyncio.sleep(0.05)
+    await health.stop()
+    assert health.is_ready()
+
+@pytest.mark.asyncio
+async def test_stale_result_is_not_ready():
+    async def ping():
+        return True
+
+    health = make_health(ping, max_age=0)
+    await health.check()
+    await asyncio.sleep(0.01)
+
+    assert not health.is_ready()
+
+@pytest.mark.asyncio
+async def test_not_ready_until_unique_indexes_exist():
+    missing = ["users.phone_unique"]
+
+    async def ping():
+        return True
+
+    async def missing_indexes():
+        return list(missing)
+
+    health = DatabaseHealth(refresh_seconds=0.01, ping_timeout=0.05, max_age=60, ping=ping,
+                            missing_indexes=missing_indexes)
+    await health.check()
+    assert health.reachable
+    assert not health.is_ready()
+    assert "users.phone_unique" in health.status()["error"]
+
+    missing.clear()
+    await health.check()
+    assert health.is_ready()
+    assert health.indexes_ok
@@ -0,0 +1,19 @@
+from starlette.requests import Request
+from http_cache import content_etag, etag_matches
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_content_etag_is_stable_and_content_sensitive():
+    categories = [{"id": "1", "name": "Science"}]
+    assert content_etag(categories) == content_etag([{"name": "Science", "id": "1"}])
+    assert content_etag(categories) != content_etag([{"id": "1", "name": "History"}])
+
+def test_if_none_match_handling():
+    etag = content_etag({"prompt_id": "abc"})
+    assert etag_matches(make_request(etag), etag)
+    assert etag_matches(make_request(f'"other", W/{etag}'), etag)
+    assert etag_matches(make_request("*"), etag)
+    assert not etag_matches(make_request('"other"'), etag)
+    assert not etag_matches(make_request(), etag)
@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import ServerSelectionTimeoutError
+from config import MONGO_URI, MONGO_DB
+from indexes import index_registry
+
+pytestmark = pytest.mark.skipif(not (MONGO_URI and MONGO_DB), reason="MONGO_URI and MONGO_DB are not set")
+
+@pytest.fixture(scope="module")
+def db():
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except ServerSelectionTimeoutError as e:
+        client.close()
+        pytest.skip(f"MongoDB is not reachable: {e}")
+    database = client[MONGO_DB]
+    for collection_name, indexes in index_registry().items():
+        database[collection_name].create_indexes(indexes)
+    yield database
+    client.close()
+
+def plan_stages(plan):
+    """Yield every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+# The boundary _find_keyset adds for a cursor at (created_at, _id)
+AFTER_CURSOR = {"$or": [
+    {"created_at": {"$lt": datetime(2026, 1, 1)}},
+    {"created_at": datetime(2026, 1, 1), "_id": {"$lt": ObjectId()}},
+]}
+
+HOT_QUERIES = [
+    ("users", {"phone": "0501234567"}, None),
+    ("users", {"id_number": "123456789"}, None),
+    ("users", {"phone": "0501234567", "name": "Dana", "$or": [{"id_number": "123456789"}, {"id_number": {"$exists": False}}]}, None),
+    ("users", {"$or": [{"phone": "0501234567"}, {"id_number": "123456789"}]}, None),
+    ("users", {}, [("created_at", -1), ("_id", -1)]),
+    ("users", {"search_names": {"$regex": "^dan"}}, None),
+    ("users", {"$or": [{"phone": {"$regex": "^050"}}, {"id_number": {"$regex": "^050"}}]}, None),
+    # list_history through _find_keyset: the first page, then pages after a cursor
+    ("prompts", {"user_id": str(ObjectId())}, HISTORY_SORT),
+    ("prompts", {"$and": [{"user_id": str(ObjectId())}, AFTER_CURSOR]}, HISTORY_SORT),
+    ("prompts", {}, HISTORY_SORT),
+    ("prompts", AFTER_CURSOR, HISTORY_SORT),
+    # iter_export, with and without a filter or time range
+    ("prompts", {}, [("created_at", 1), ("_id", 1)]),
+    ("prompts", {"created_at": {"$gte": datetime(2026, 1, 1), "$lt": datetime(2026, 2, 1)}}, [("created_at", 1), ("_id", 1)]),
+    ("prompts", {"user_id": str(ObjectId())}, [("created_at", 1), ("_id", 1)]),
+    ("prompts", {"category_id": str(ObjectId())}, [("created_at", 1), ("_id", 1)]),
+    ("sub_categories", {"category_id": str(ObjectId())}, None),
+    ("lesson_jobs", {"status": "queued", "$or": [{"next_attempt_at": None}, {"next_attempt_at": {"$lte": datetime(2026, 1, 1)}}]}, [("created_at", 1)]),
+    ("lesson_jobs", {"status": "running", "started_at": {"$lt": datetime(2026, 1, 1)}}, None),
+]
+
+@pytest.mark.parametrize("collection_name,query,sort", HOT_QUERIES)
+def test_hot_query_uses_an_index(db, collection_name, query, sort):
+    cursor = db[collection_name].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    plan = cursor.explain()["queryPlanner"]["winningPlan"]
+    stages = set(plan_stages(plan))
+    assert "COLLSCAN" not in stages, f"{collection_name} {query} is a collection scan"
+    assert "SORT" not in stages, f"{collection_name} {query} sorts {sort} in memory"
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi import FastAPI
+import routes.prompts
+import services.lesson_batch
+from services.ai_service import LessonCapacityError
+
+class FakeGenerator:
+    """Sleeps `delay` seconds per lesson and records the peak concurrency"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, prompt, category_id=None, sub_category_id=None, use_cache=True):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay(prompt) if callable(self.delay) else self.delay)
+            if "busy" in prompt:
+                raise LessonCapacityError("Lesson generation queue is full, please retry shortly")
+            return f"Lesson about {prompt}"
+        finally:
+            self.running -= 1
+
+@pytest.fixture
+def prompts(storage):
+    repository = storage.prompts_repository
+    writes = []
+    insert_many = repository.insert_many
+
+    async def counting_insert_many(documents):
+        writes.append(len(documents))
+        return await insert_many(documents)
+
+    repository.insert_many = counting_insert_many
+    repository.writes = writes
+    return repository
+
+@pytest.fixture
+def client(api_client, prompts):
+    return api_client(routes.prompts.router)
+
+def batch(count, extra=()):
+    return [{"user_id": "u1", "prompt": f"topic number {i}"} for i in range(count)] + list(extra)
+
+def test_batch_runs_concurrently_and_saves_once(client, prompts, monkeypatch):
+    generator = FakeGenerator(0.1)
+    monkeypatch.setattr(services.lesson_batch, "generate_lesson", generator)
+    monkeypatch.setattr(services.lesson_batch, "LESSON_BATCH_CONCURRENCY", 8)
+
+    started = time.perf_counter()
+    response = client.post("/api/prompts/batch", json=batch(16, [{"user_id": "u1", "prompt": "busy topic"}]))
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["completed"], body["failed"], body["saved"]) == (17, 16, 1, 16)
+    assert [item["index"] for item in body["items"]] == list(range(17))
+    assert body["items"][16]["status"] == "rejected"
+    assert generator.peak == 8
+    # 17 items of 0.1s through a window of 8 take three rounds, not seventeen
+    assert elapsed < 0.8
+    assert prompts.writes == [16]
+    assert prompts.engine.execute("SELECT count(*) FROM prompts").fetchone()[0] == 16
+
+def test_streamed_batch_reports_items_as_they_finish(client, prompts, monkeypatch):
+    generator = FakeGenerator(lambda prompt: 0.2 if prompt.endswith("0") else 0.01)
+    monkeypatch.setattr(services.lesson_batch, "generate_lesson", generator)
+
+    response = client.post("/api/prompts/batch", params={"stream": "true"}, json=batch(3))
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {"done": True, "total": 3, "completed": 3, "failed": 0, "saved": 3}
+    assert lines[2]["index"] == 0
+    assert {line["id"] for line in lines[:3]} == {row[0] for row in prompts.engine.execute("SELECT id FROM prompts")}
+
+def test_batch_size_is_limited(client, monkeypatch):
+    monkeypatch.setattr(routes.prompts, "LESSON_BATCH_MAX_ITEMS", 2)
+    assert client.post("/api/prompts/batch", json=batch(3)).status_code == 400
+    assert client.post("/api/prompts/batch", json=[]).status_code == 400
+
+@pytest.mark.asyncio
+async def test_streamed_batch_saves_every_lesson_when_the_client_disconnects(prompts, monkeypatch):
+    generator = FakeGenerator(lambda prompt: 0.01 if prompt.endswith("0") else 0.2)
+    monkeypatch.setattr(services.lesson_batch, "generate_lesson", generator)
+    app = FastAPI()
+    app.include_router(routes.prompts.router, prefix="/api")
+
+    # Drive the ASGI app by hand: the client reads one line, then goes away
+    body = json.dumps(batch(3)).encode()
+    first_line = asyncio.Event()
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(body)
+            return {"type": "http.request", "body": body, "more_body": False}
+        await first_line.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            received.append(message["body"])
+            first_line.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/prompts/batch", "raw_path": b"/api/prompts/batch",
+        "query_string": b"stream=true", "root_path": "", "server": ("test", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    await app(scope, receive, send)
+    await asyncio.gather(*routes.prompts._background_tasks)
+
+    sent = json.loads(received[1])
+    assert sent["index"] == 0
+    stored = {row[0] for row in prompts.engine.execute("SELECT id FROM prompts")}
+    assert len(stored) == 3
+    assert sent["id"] in stored
+
+def test_streamed_batch_reports_unsaved_lessons_as_failed(client, prompts, monkeypatch):
+    monkeypatch.setattr(services.lesson_batch, "generate_lesson", FakeGenerator(0))
+
+    async def failing_insert_many(documents):
+        raise RuntimeError("database is down")
+
+    prompts.insert_many = failing_insert_many
+    response = client.post("/api/prompts/batch", params={"stream": "true"}, json=batch(2))
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["status"] for line in lines[:2]] == ["failed", "failed"]
+    assert all("id" not in line for line in lines[:2])
+    assert lines[-1] == {"done": True, "total": 2, "completed": 0, "failed": 2, "saved": 0}
@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from services.lesson_cache import LessonCache, cache_key, normalize_prompt
+
+def test_normalized_prompts_share_a_key():
+    """Case, punctuation and whitespace differences map to the same cache key"""
+    assert normalize_prompt("  What is   Photosynthesis?! ") == "what is photosynthesis"
+    assert cache_key("What is photosynthesis?", "science", "biology") == cache_key("what is  photosynthesis", "science", "biology")
+    assert cache_key("What is photosynthesis?", "science", "biology") != cache_key("What is photosynthesis?", "science", "chemistry")
+
+def test_symbols_inside_words_keep_prompts_apart():
+    assert normalize_prompt("What is (C++)?") == "what is c++"
+    keys = {cache_key(prompt) for prompt in ("what is C++", "what is C#", "what is C", "what is .NET", "what is NET")}
+    assert len(keys) == 5
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_counters():
+    cache = LessonCache(max_entries=2, ttl_seconds=60)
+    await cache.set("a", "lesson a")
+    await cache.set("b", "lesson b")
+    assert await cache.get("a") == "lesson a"
+
+    await cache.set("c", "lesson c")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "lesson a"
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_misses():
+    cache = LessonCache(max_entries=10, ttl_seconds=0)
+    await cache.set("a", "lesson a")
+    assert await cache.get("a") is None
+
+@pytest.mark.asyncio
+async def test_persistent_hits_keep_the_stored_expiry(storage):
+    await storage.lesson_cache_repository.save_response("a", "lesson a", datetime.utcnow() + timedelta(seconds=30))
+    cache = LessonCache(max_entries=10, ttl_seconds=3600, persistent=True)
+
+    assert await cache.get("a") == "lesson a"
+    assert cache.persistent_hits == 1
+    expires_at, _ = cache._entries["a"]
+    assert expires_at - time.monotonic() <= 30
@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+import routes.prompts
+import services.lesson_jobs
+from rate_limit import rate_limiter
+from schemas import PromptRequest
+from services.ai_service import LessonCapacityError
+from services.lesson_jobs import LessonJobQueue
+
+class FlakyGenerator:
+    """Raises the queued errors first, then returns a lesson"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self, prompt, category_id=None, sub_category_id=None, use_cache=True):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"Lesson about {prompt}"
+
+@pytest.fixture
+def queue(storage, monkeypatch):
+    queue = LessonJobQueue(workers=2)
+    monkeypatch.setattr(routes.prompts, "lesson_job_queue", queue)
+    monkeypatch.setattr(services.lesson_jobs, "LESSON_JOB_RETRY_DELAY_SECONDS", 0)
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    return queue
+
+@pytest_asyncio.fixture
+async def client(queue):
+    app = FastAPI()
+    app.include_router(routes.prompts.router, prefix="/api")
+    await queue.start()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    await queue.stop()
+
+async def wait_for_job(client, job_id, statuses=("completed", "failed")):
+    for _ in range(200):
+        job = (await client.get(f"/api/prompts/jobs/{job_id}")).json()
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {job['status']}")
+
+async def enqueue(client):
+    response = await client.post("/api/prompts", params={"async": "true"}, json={"user_id": "u1", "prompt": "fractions"})
+    assert response.status_code == 202
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_queued_lesson_is_generated_and_polled(client, monkeypatch):
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", FlakyGenerator())
+
+    accepted = await enqueue(client)
+    assert accepted["status"] == "queued"
+    assert accepted["status_url"] == f"/api/prompts/jobs/{accepted['job_id']}"
+
+    job = await wait_for_job(client, accepted["job_id"])
+    assert (job["status"], job["attempts"], job["error"]) == ("completed", 1, None)
+    assert job["result"]["id"] == job["prompt_id"]
+    assert job["result"]["response"] == "Lesson about fractions"
+    assert (await client.get("/api/prompts/jobs/0123456789abcdef01234567")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_capacity_error_requeues_the_job(client, monkeypatch):
+    busy = LessonCapacityError("Lesson generation queue is full, please retry shortly")
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", FlakyGenerator(busy, busy, busy))
+    # Capacity errors do not use up attempts
+    monkeypatch.setattr(services.lesson_jobs, "LESSON_JOB_MAX_ATTEMPTS", 1)
+
+    job = await wait_for_job(client, (await enqueue(client))["job_id"])
+
+    assert (job["status"], job["attempts"]) == ("completed", 4)
+
+@pytest.mark.asyncio
+async def test_job_fails_after_the_last_attempt(client, monkeypatch):
+    generator = FlakyGenerator(*[RuntimeError("model unavailable")] * 5)
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", generator)
+    monkeypatch.setattr(services.lesson_jobs, "LESSON_JOB_MAX_ATTEMPTS", 2)
+
+    job = await wait_for_job(client, (await enqueue(client))["job_id"])
+
+    assert (job["status"], job["attempts"], job["error"], job["result"]) == ("failed", 2, "model unavailable", None)
+    assert generator.calls == 2
+
+async def wait_for_status(jobs, job_id, status):
+    for _ in range(200):
+        job = await jobs.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {job['status']}")
+
+@pytest.mark.asyncio
+async def test_sweeps_recover_queued_and_stale_running_jobs(storage, queue, monkeypatch):
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", FlakyGenerator())
+    jobs = storage.lesson_jobs_repository
+    queued = await jobs.create({"user_id": "u1", "prompt": "queued"})
+    stale = await jobs.create({"user_id": "u1", "prompt": "stale"})
+    recent = await jobs.create({"user_id": "u1", "prompt": "recent"})
+    await jobs.claim(stale)
+    await jobs.claim(recent)
+    # A worker of a previous process claimed this one long ago and never finished it
+    jobs._set_fields(stale, {"started_at": datetime.utcnow() - timedelta(hours=1)})
+
+    await queue.start()
+    try:
+        assert (await wait_for_status(jobs, queued, "completed"))["attempts"] == 1
+        assert (await wait_for_status(jobs, stale, "completed"))["attempts"] == 2
+        # Still within LESSON_JOB_STALE_SECONDS, so possibly running elsewhere
+        assert (await jobs.get(recent))["status"] == "running"
+
+        # Once it goes stale, the next sweep picks it up without a restart
+        jobs._set_fields(recent, {"started_at": datetime.utcnow() - timedelta(hours=1)})
+        assert await queue.sweep() == 1
+        assert (await wait_for_status(jobs, recent, "completed"))["attempts"] == 2
+    finally:
+        await queue.stop()
+
+@pytest.mark.asyncio
+async def test_stop_requeues_interrupted_jobs(storage, queue, monkeypatch):
+    jobs = storage.lesson_jobs_repository
+    started = asyncio.Event()
+
+    async def hanging_generator(prompt, category_id=None, sub_category_id=None, use_cache=True):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", hanging_generator)
+    await queue.start()
+    job_id = await queue.enqueue(PromptRequest(user_id="u1", prompt="fractions"))
+    await asyncio.wait_for(started.wait(), 1)
+    await queue.stop()
+
+    job = await jobs.get(job_id)
+    assert (job["status"], job["attempts"]) == ("queued", 0)
+
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", FlakyGenerator())
+    await queue.start()
+    try:
+        assert (await wait_for_status(jobs, job_id, "completed"))["attempts"] == 1
+    finally:
+        await queue.stop()
+
+@pytest.mark.asyncio
+async def test_waiting_retries_do_not_hold_a_worker(storage, monkeypatch):
+    jobs = storage.lesson_jobs_repository
+    queue = LessonJobQueue(workers=1)
+    monkeypatch.setattr(services.lesson_jobs, "LESSON_JOB_RETRY_DELAY_SECONDS", 60)
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", FlakyGenerator(RuntimeError("model unavailable")))
+
+    await queue.start()
+    try:
+        retried = await queue.enqueue(PromptRequest(user_id="u1", prompt="retried"))
+        other = await queue.enqueue(PromptRequest(user_id="u1", prompt="other"))
+        await wait_for_status(jobs, other, "completed")
+
+        job = await jobs.get(retried)
+        assert (job["status"], job["error"]) == ("queued", "model unavailable")
+        assert job["next_attempt_at"] > datetime.utcnow() + timedelta(seconds=50)
+        # Not due yet, so no other process picks it up either
+        assert await jobs.recover_unfinished(300) == []
+        assert queue.stats()["retrying"] == 1
+    finally:
+        await queue.stop()
+
+@pytest.mark.asyncio
+async def test_invalid_stored_request_fails_the_job_not_the_worker(storage, queue, monkeypatch):
+    jobs = storage.lesson_jobs_repository
+    monkeypatch.setattr(services.lesson_jobs, "generate_lesson", FlakyGenerator())
+    monkeypatch.setattr(services.lesson_jobs, "LESSON_JOB_MAX_ATTEMPTS", 1)
+    broken = await jobs.create({"user_id": "u1"})
+
+    await queue.start()
+    try:
+        assert (await wait_for_status(jobs, broken, "failed"))["attempts"] == 1
+        job_id = await queue.enqueue(PromptRequest(user_id="u1", prompt="fractions"))
+        await wait_for_status(jobs, job_id, "completed")
+    finally:
+        await queue.stop()
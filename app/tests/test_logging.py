@@ -0,0 +1,83 @@
+import json
+import logging
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from logging_config import (
+    JsonFormatter,
+    ContextQueueHandler,
+    RequestLoggingMiddleware,
+    correlation_id,
+    redact_headers,
+    should_log,
+)
+
+app = FastAPI()
+app.add_middleware(RequestLoggingMiddleware, sample_rate=0.0, log_headers=True)
+
+@app.get("/ok")
+def ok():
+    logging.getLogger("test.route").info("handled")
+    return {"message": "OK"}
+
+@app.get("/missing")
+def missing():
+    raise HTTPException(status_code=404, detail="Not found")
+
+client = TestClient(app)
+
+def test_formatter_writes_json_with_extra_fields():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "lesson %s", ("abc",), None)
+    record.correlation_id = "req-1"
+    record.duration_ms = 12.5
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "lesson abc"
+    assert entry["level"] == "INFO"
+    assert entry["correlation_id"] == "req-1"
+    assert entry["duration_ms"] == 12.5
+
+def test_queue_handler_captures_correlation_id_of_caller():
+    records = []
+
+    class ListQueue:
+        def put_nowait(self, record):
+            records.append(record)
+
+    token = correlation_id.set("req-2")
+    try:
+        handler = ContextQueueHandler(ListQueue())
+        handler.emit(logging.LogRecord("test", logging.INFO, __file__, 1, "hi %s", ("there",), None))
+    finally:
+        correlation_id.reset(token)
+
+    assert records[0].correlation_id == "req-2"
+    assert records[0].getMessage() == "hi there"
+
+def test_redact_headers_hides_credentials():
+    headers = redact_headers([(b"authorization", b"Bearer secret"), (b"accept", b"application/json")])
+    assert headers == {"authorization": "[REDACTED]", "accept": "application/json"}
+
+def test_should_log_samples_only_successes():
+    assert should_log(500, 1.0, sample_rate=0.0)
+    assert should_log(404, 1.0, sample_rate=0.0)
+    assert not should_log(200, 1.0, sample_rate=0.0)
+    assert should_log(200, 1.0, sample_rate=1.0)
+
+def test_request_id_is_echoed_and_sampled_successes_skipped(caplog):
+    with caplog.at_level(logging.INFO):
+        response = client.get("/ok", headers={"X-Request-ID": "abc-123"})
+
+    assert response.headers["x-request-id"] == "abc-123"
+    assert [record for record in caplog.records if record.name == "access"] == []
+
+def test_errors_are_logged_with_redacted_headers(caplog):
+    with caplog.at_level(logging.INFO):
+        response = client.get("/missing", headers={"Authorization": "Bearer secret"})
+
+    access = [record for record in caplog.records if record.name == "access"]
+    assert len(access) == 1
+    assert access[0].status == 404
+    assert access[0].headers["authorization"] == "[REDACTED]"
+    assert len(response.headers["x-request-id"]) == 32
+    assert "secret" not in JsonFormatter().format(access[0])
@@ -0,0 +1,67 @@
+import threading
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from metrics import Registry, MetricsMiddleware, MongoCommandListener, HTTP_REQUEST_SECONDS, MONGO_COMMAND_SECONDS
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/items/{item_id}")
+def get_item(item_id: str):
+    return {"id": item_id}
+
+client = TestClient(app)
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+
+def test_counter_merges_thread_shards_and_escapes_labels():
+    registry = Registry()
+    counter = registry.counter("events_total", "Events", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc('say "hi"')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 'events_total{kind="say \\"hi\\""} 4000' in registry.render().splitlines()
+
+def test_requests_are_labelled_by_route_template():
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nowhere")
+
+    values = HTTP_REQUEST_SECONDS.values()
+    assert sum(values[("GET", "/items/{item_id}", "200")][:-1]) == 2
+    assert ("GET", "unmatched", "404") in values
+
+def test_mongo_listener_times_commands_by_collection():
+    listener = MongoCommandListener()
+    started = SimpleNamespace(command_name="find", command={"find": "test_metrics_users"}, connection_id=("h", 1), request_id=7)
+    succeeded = SimpleNamespace(command_name="find", connection_id=("h", 1), request_id=7, duration_micros=2500)
+
+    listener.started(started)
+    listener.succeeded(succeeded)
+
+    state = MONGO_COMMAND_SECONDS.values()[("test_metrics_users", "find")]
+    assert sum(state[:-1]) == 1
+    assert state[-1] == 0.0025
@@ -0,0 +1,23 @@
+import pytest
+from datetime import datetime
+from pagination import encode_cursor, decode_cursor, InvalidCursorError
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 15, 10, 30)
+    cursor = encode_cursor("created_at", created_at, "65a4f0c2e4b0a1b2c3d4e5f6", "next")
+    position = decode_cursor(cursor, "created_at")
+    assert position["value"].replace(tzinfo=None) == created_at
+    assert position["id"] == "65a4f0c2e4b0a1b2c3d4e5f6"
+    assert position["direction"] == "next"
+
+def test_cursor_rejects_other_sort_and_garbage():
+    cursor = encode_cursor("name", "Dana", "65a4f0c2e4b0a1b2c3d4e5f6", "prev")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "created_at")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor", "name")
+
+@pytest.mark.parametrize("document_id", ["not-an-object-id", "65a4f0c2e4b0a1b2c3d4e5f", 12, None])
+def test_cursor_rejects_malformed_ids(document_id):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor("name", "Dana", document_id, "next"), "name")
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import pytest
+import routes.prompts
+
+STARTED = datetime(2026, 1, 1)
+# Ids in ObjectId format, as the repositories assign them
+IDS = [f"{i:024x}" for i in range(5)]
+
+@pytest.fixture
+def client(api_client, storage):
+    for i in range(5):
+        storage.engine.execute(
+            "INSERT INTO prompts (id, doc) VALUES (?, json_object('user_id', ?, 'prompt', ?, 'response', ?, 'created_at', ?))",
+            (IDS[i], "u1" if i < 4 else "u2", f"Lesson {i}", f"{i}" * 300,
+             (STARTED + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.%f"))
+        )
+    return api_client(routes.prompts.router)
+
+def test_user_history_follows_next_cursor_to_the_end(client):
+    response = client.get("/api/users/u1/prompts", params={"limit": 3, "count": "exact"})
+    assert response.status_code == 200
+    first = response.json()
+    assert [p["id"] for p in first["prompts"]] == [IDS[3], IDS[2], IDS[1]]
+    assert (first["total"], first["has_next"]) == (4, True)
+
+    second = client.get("/api/users/u1/prompts", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    assert [p["id"] for p in second["prompts"]] == [IDS[0]]
+    assert (second["total"], second["has_next"], second["next_cursor"]) == (None, False, None)
+
+def test_listings_carry_a_preview_instead_of_the_body(client):
+    prompts = client.get("/api/prompts", params={"count": "estimated"}).json()
+
+    assert prompts["total"] == 5
+    lesson = prompts["prompts"][0]
+    assert "response" not in lesson
+    assert lesson["response_preview"] == "4" * 200
+    assert client.get(f"/api/prompts/{IDS[4]}").json()["response"] == "4" * 300
+
+def test_fields_selects_summary_fields(client):
+    lesson = client.get("/api/prompts", params={"fields": "prompt"}).json()["prompts"][0]
+    # created_at is the pagination key, so it is always included
+    assert set(lesson) == {"id", "prompt", "created_at"}
+
+    response = client.get("/api/prompts", params={"fields": "prompt,response"})
+    assert response.status_code == 400
+    assert "Unknown fields: response" in response.json()["detail"]
+
+def test_bad_cursor_and_count_are_rejected(client):
+    assert client.get("/api/prompts", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/prompts", params={"count": "all"}).status_code == 422
+
+@pytest.mark.parametrize("if_none_match", ["etag", "*"])
+def test_revalidation_checks_that_the_lesson_exists(client, storage, if_none_match):
+    etag = client.get(f"/api/prompts/{IDS[0]}").headers["ETag"]
+    headers = {"If-None-Match": etag if if_none_match == "etag" else "*"}
+    assert client.get(f"/api/prompts/{IDS[0]}", headers=headers).status_code == 304
+
+    missing = f"{99:024x}"
+    assert client.get(f"/api/prompts/{missing}", headers={"If-None-Match": "*"}).status_code == 404
+
+    storage.engine.execute("DELETE FROM prompts WHERE id = ?", (IDS[0],))
+    assert client.get(f"/api/prompts/{IDS[0]}", headers=headers).status_code == 404
@@ -0,0 +1,127 @@
+import time
+import pytest
+from fastapi import HTTPException
+import routes.prompts
+import services.lesson_batch
+from auth import create_access_token
+from rate_limit import (
+    Limit,
+    MemoryBuckets,
+    RateLimiter,
+    RateLimitPolicy,
+    parse_limit,
+    rate_limiter,
+)
+from repositories.embedded import EmbeddedRateLimitRepository
+
+def test_parse_limit():
+    limit = parse_limit("10/60")
+    assert limit.rate == pytest.approx(10 / 60)
+    assert limit.burst == 10
+    assert parse_limit("5/1:20").burst == 20
+    assert parse_limit("") is None
+    with pytest.raises(ValueError):
+        parse_limit("ten per minute")
+
+def test_memory_bucket_refills_over_time():
+    buckets = MemoryBuckets(max_buckets=10)
+    limit = Limit(rate=1.0, burst=2)
+
+    assert buckets.take_now("k", limit, 1, now=0.0) == 0
+    assert buckets.take_now("k", limit, 1, now=0.0) == 0
+    assert buckets.take_now("k", limit, 1, now=0.0) == pytest.approx(1.0)
+    assert buckets.take_now("k", limit, 1, now=0.5) == pytest.approx(0.5)
+    assert buckets.take_now("k", limit, 1, now=1.0) == 0
+
+def test_memory_buckets_stay_bounded():
+    buckets = MemoryBuckets(max_buckets=3)
+    limit = Limit(rate=1.0, burst=5)
+    for i in range(10):
+        buckets.take_now(f"user-{i}", limit, 1, now=float(i))
+    assert len(buckets) <= 3
+
+@pytest.mark.asyncio
+async def test_shared_buckets_in_sqlite(engine):
+    repository = EmbeddedRateLimitRepository(engine)
+
+    assert await repository.take("k", rate=0.5, burst=2) == 0
+    assert await repository.take("k", rate=0.5, burst=2) == 0
+    assert await repository.take("k", rate=0.5, burst=2) == pytest.approx(2.0, abs=0.01)
+    assert await repository.take("other", rate=0.5, burst=2) == 0
+
+    # Giving tokens back never fills a bucket past its burst
+    assert await repository.take("k", rate=0.5, burst=2, cost=-5) == 0
+    assert await repository.take("k", rate=0.5, burst=2, cost=2) == 0
+    assert await repository.take("k", rate=0.5, burst=2) > 0
+
+@pytest.mark.asyncio
+async def test_a_global_rejection_does_not_charge_the_user():
+    buckets = MemoryBuckets(1000)
+    user, overall = Limit(1e-3, 2), Limit(1e-3, 1)
+    limiter = RateLimiter({"p": RateLimitPolicy("p", per_user=user, overall=overall)}, buckets)
+    await limiter.check("p", "u1")
+
+    with pytest.raises(HTTPException) as rejected:
+        await limiter.check("p", "u2")
+    assert rejected.value.status_code == 429
+    # u2 still has the whole burst
+    assert buckets.take_now("p:user:u2", user, 2, now=time.monotonic()) == 0
+
+@pytest.mark.asyncio
+async def test_memory_check_costs_microseconds():
+    limiter = RateLimiter({"p": RateLimitPolicy("p", Limit(1e9, 1e9), Limit(1e9, 1e9))}, MemoryBuckets(1000))
+    started = time.perf_counter()
+    for i in range(10000):
+        await limiter.check("p", f"user-{i % 100}")
+    assert (time.perf_counter() - started) / 10000 < 50e-6
+
+@pytest.fixture
+def client(api_client, monkeypatch):
+    async def generate_lesson(prompt, category_id=None, sub_category_id=None, use_cache=True):
+        return f"Lesson about {prompt}"
+
+    monkeypatch.setattr(routes.prompts, "generate_lesson", generate_lesson)
+    monkeypatch.setattr(services.lesson_batch, "generate_lesson", generate_lesson)
+    monkeypatch.setattr(rate_limiter, "buckets", MemoryBuckets(1000))
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "policies", {
+        "lessons": RateLimitPolicy("lessons", per_user=Limit(0.1, 2), overall=Limit(0.1, 3)),
+        "lesson_batches": RateLimitPolicy("lesson_batches", per_user=Limit(0.1, 3)),
+    })
+    return api_client(routes.prompts.router)
+
+def lesson(user_id):
+    return {"user_id": user_id, "prompt": "Teach me fractions"}
+
+def signed_in(user_id):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user_id})}"}
+
+def test_per_user_and_global_quotas_return_429(client):
+    assert client.post("/api/prompts", json=lesson("u1"), headers=signed_in("u1")).status_code == 200
+    assert client.post("/api/prompts", json=lesson("u1"), headers=signed_in("u1")).status_code == 200
+
+    response = client.post("/api/prompts", json=lesson("u1"), headers=signed_in("u1"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+
+    # Another user still has their own quota, until the global bucket runs out
+    assert client.post("/api/prompts", json=lesson("u2"), headers=signed_in("u2")).status_code == 200
+    response = client.post("/api/prompts", json=lesson("u3"), headers=signed_in("u3"))
+    assert response.status_code == 429
+    assert "lessons" in response.json()["detail"]
+
+def test_anonymous_clients_are_limited_by_address_whatever_user_id_they_send(client):
+    assert client.post("/api/prompts", json=lesson("a")).status_code == 200
+    assert client.post("/api/prompts", json=lesson("b")).status_code == 200
+    assert client.post("/api/prompts", json=lesson("c")).status_code == 429
+
+def test_signed_in_users_only_create_their_own_lessons(client):
+    assert client.post("/api/prompts", json=lesson("u2"), headers=signed_in("u1")).status_code == 403
+
+    items = [lesson("u1"), lesson("u1"), lesson("u2")]
+    assert client.post("/api/prompts/batch", json=items, headers=signed_in("u1")).status_code == 403
+
+def test_batch_is_charged_per_prompt_to_the_caller(client):
+    items = [lesson("a"), lesson("b")]
+    assert client.post("/api/prompts/batch", json=items).status_code == 200
+    assert client.post("/api/prompts/batch", json=items).status_code == 429
@@ -0,0 +1,13 @@
+from datetime import datetime
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from serialization import FastJSONResponse
+
+def test_fast_response_matches_default_encoding():
+    content = {"id": "65a4f0c2e4b0a1b2c3d4e5f6", "name": "דנה", "created_at": datetime(2024, 1, 15, 10, 30, 0, 123000)}
+    assert FastJSONResponse(content).body == JSONResponse(jsonable_encoder(content)).body
+
+def test_object_ids_are_rendered_as_strings():
+    object_id = ObjectId()
+    assert FastJSONResponse({"_id": object_id}).body == f'{{"_id":"{object_id}"}}'.encode()
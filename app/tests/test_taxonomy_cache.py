@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+import routes.categories
+import routes.sub_categories
+from services.taxonomy_cache import TaxonomyCache
+
+@pytest.fixture
+def loads(storage, monkeypatch):
+    """Counts how often the taxonomy is read from storage"""
+    counter = {"categories": 0}
+    list_all = storage.categories_repository.list_all
+
+    async def counting_list_all():
+        counter["categories"] += 1
+        return await list_all()
+
+    monkeypatch.setattr(storage.categories_repository, "list_all", counting_list_all)
+    return counter
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_memory(storage, loads):
+    category_id = await storage.categories_repository.insert({"name": "Math"})
+    await storage.sub_categories_repository.insert({"name": "Fractions", "category_id": category_id})
+    cache = TaxonomyCache(refresh_seconds=60)
+
+    assert [c["name"] for c in await cache.categories()] == ["Math"]
+    assert await cache.category_name(category_id) == "Math"
+    assert [s["name"] for s in await cache.sub_categories_for(category_id)] == ["Fractions"]
+    assert await cache.sub_categories_for("unknown") == []
+    assert loads["categories"] == 1
+
+@pytest.mark.asyncio
+async def test_other_workers_reload_once_the_version_changes(storage, loads):
+    writer = TaxonomyCache(refresh_seconds=60)
+    reader = TaxonomyCache(refresh_seconds=60)
+    assert await reader.categories() == []
+
+    await storage.categories_repository.insert({"name": "Math"})
+    await writer.invalidate()
+
+    # The reader only checks the shared version every refresh_seconds
+    assert await reader.categories() == []
+    reader._checked_at -= 61
+    assert [c["name"] for c in await reader.categories()] == ["Math"]
+
+    # An unchanged version costs a version check, not a reload
+    loaded = loads["categories"]
+    reader._checked_at -= 61
+    await reader.categories()
+    assert loads["categories"] == loaded
+
+@pytest.mark.asyncio
+async def test_a_load_in_flight_during_a_write_is_not_kept(storage, monkeypatch):
+    cache = TaxonomyCache(refresh_seconds=60)
+    list_all = storage.categories_repository.list_all
+    release = asyncio.Event()
+    calls = []
+
+    async def slow_list_all():
+        categories = await list_all()
+        calls.append(len(categories))
+        if len(calls) == 1:
+            await release.wait()
+        return categories
+
+    monkeypatch.setattr(storage.categories_repository, "list_all", slow_list_all)
+    reader = asyncio.create_task(cache.categories())
+    while not calls:
+        await asyncio.sleep(0)
+
+    # The write lands after the in-flight load read the categories
+    await storage.categories_repository.insert({"name": "Math"})
+    await cache.invalidate()
+    release.set()
+
+    assert [c["name"] for c in await reader] == ["Math"]
+    assert [c["name"] for c in await cache.categories()] == ["Math"]
+    assert calls == [0, 1]
+
+@pytest.fixture
+def client(api_client, monkeypatch):
+    cache = TaxonomyCache(refresh_seconds=60)
+    monkeypatch.setattr(routes.categories, "taxonomy_cache", cache)
+    monkeypatch.setattr(routes.sub_categories, "taxonomy_cache", cache)
+    return api_client(routes.categories.router, routes.sub_categories.router)
+
+def test_writes_invalidate_the_cache_of_this_worker(client):
+    assert client.get("/api/categories").json() == []
+
+    category_id = client.post("/api/categories", json={"name": "Math"}).json()["id"]
+    assert [c["name"] for c in client.get("/api/categories").json()] == ["Math"]
+
+    sub_category_id = client.post("/api/sub-categories", json={"name": "Fractions", "category_id": category_id}).json()["id"]
+    assert [s["id"] for s in client.get(f"/api/categories/{category_id}/sub-categories").json()] == [sub_category_id]
+
+    assert client.delete(f"/api/sub-categories/{sub_category_id}").status_code == 200
+    assert client.get("/api/sub-categories").json() == []
+    assert client.get(f"/api/categories/{category_id}/sub-categories").json() == []
@@ -0,0 +1,87 @@
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+import routes.users
+from routes.users import register_user, login_user, legacy_create_user
+from repositories.embedded import EmbeddedDatabase
+from schemas import User
+
+class CountingDatabase(EmbeddedDatabase):
+    """Counts statements against the users table, as database round trips"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.statements = 0
+
+    def execute(self, sql, params=()):
+        self.statements += "users" in sql
+        return super().execute(sql, params)
+
+@pytest.fixture
+def engine():
+    engine = CountingDatabase(":memory:")
+    yield engine
+    engine.close_client()
+
+@pytest.fixture(autouse=True)
+def use_storage(storage):
+    # Creating the repositories runs their schema statements
+    storage.engine.statements = 0
+
+DANA = User(name="Dana Cohen", phone="0501234567", id_number="123456789")
+
+@pytest.mark.asyncio
+async def test_register_and_login_take_one_round_trip(engine):
+    token = await register_user(DANA)
+    assert token.name == "Dana Cohen"
+    # The user row itself; the search-name rows go in the same transaction
+    assert engine.statements == 1
+
+    engine.statements = 0
+    token = await login_user(DANA)
+    assert token.id_number == "123456789"
+    assert engine.statements == 1
+
+@pytest.mark.asyncio
+async def test_duplicate_registration_names_the_colliding_field(engine):
+    await register_user(DANA)
+
+    with pytest.raises(HTTPException) as exc:
+        await register_user(User(name="Other", phone="0501234567", id_number="987654321"))
+    assert exc.value.status_code == 400
+    assert "phone" in exc.value.detail
+
+    with pytest.raises(HTTPException) as exc:
+        await register_user(User(name="Other", phone="0529999999", id_number="123456789"))
+    assert "ID number" in exc.value.detail
+
+@pytest.mark.asyncio
+async def test_legacy_create_user_logs_in_existing_user(engine):
+    created = await legacy_create_user(DANA)
+    assert created["message"] == "User registered successfully"
+
+    again = await legacy_create_user(DANA)
+    assert again["id"] == created["id"]
+    assert again["message"] == "User logged in successfully"
+
+    with pytest.raises(HTTPException) as exc:
+        await legacy_create_user(User(name="Dana Cohen", phone="0529999999", id_number="123456789"))
+    assert "ID number" in exc.value.detail
+
+@pytest.mark.asyncio
+async def test_first_login_records_a_legacy_users_id_number(engine):
+    users = routes.users.users_repository
+    await users.insert({"name": "Legacy", "phone": "0500000001", "created_at": datetime.utcnow()})
+    await register_user(DANA)
+
+    with pytest.raises(HTTPException) as exc:
+        await login_user(User(name="Legacy", phone="0500000001", id_number="123456789"))
+    assert exc.value.status_code == 400
+
+    token = await login_user(User(name="Legacy", phone="0500000001", id_number="111111111"))
+    assert token.id_number == "111111111"
+    assert (await users.get(token.user_id))["id_number"] == "111111111"
+
+    with pytest.raises(HTTPException) as exc:
+        await login_user(User(name="Legacy", phone="0500000001", id_number="222222222"))
+    assert exc.value.status_code == 404
@@ -0,0 +1,70 @@
+import pytest
+import routes.users
+from pagination import encode_cursor
+from repositories.users import UserRepository, with_search_fields
+
+users = UserRepository()
+
+def test_search_names_cover_each_word():
+    document = with_search_fields({"name": "  Dana   Cohen Levi "})
+    assert document["search_names"] == ["dana cohen levi", "cohen levi", "levi"]
+
+def test_name_search_is_an_escaped_anchored_prefix():
+    query = users.search_query("Co.hen*")
+    assert query == {"search_names": {"$regex": "^" + r"co\.hen\*"}}
+
+def test_digit_only_search_is_a_phone_or_id_prefix_at_any_length():
+    assert users.search_query("050-123-4567") == {
+        "$or": [{"phone": {"$regex": "^0501234567"}}, {"id_number": {"$regex": "^0501234567"}}]
+    }
+    # Nine digits of a ten-digit phone are still a partial number
+    assert users.search_query("050123456") == {
+        "$or": [{"phone": {"$regex": "^050123456"}}, {"id_number": {"$regex": "^050123456"}}]
+    }
+
+def test_short_digit_search_is_a_prefix():
+    assert users.search_query("050") == {"$or": [{"phone": {"$regex": "^050"}}, {"id_number": {"$regex": "^050"}}]}
+
+def test_text_mode_and_empty_search():
+    assert users.search_query("dana", "text") == {"$text": {"$search": "dana"}}
+    assert users.search_query("   ") == {}
+
+@pytest.fixture
+def client(api_client):
+    client = api_client(routes.users.router)
+    for name, phone, id_number in [
+        ("Dana Cohen", "0501234567", "123456789012"),
+        ("Avi Levi", "0529999999", "555555555"),
+        ("Noa Cohen", "0531111111", "123456780000"),
+    ]:
+        response = client.post("/api/users/register", json={"name": name, "phone": phone, "id_number": id_number})
+        assert response.status_code == 200
+    return client
+
+def searched_names(client, search, **params):
+    response = client.get("/api/users", params={"search": search, "sort_by": "name", "sort_order": "asc", **params})
+    assert response.status_code == 200
+    return [user["name"] for user in response.json()["users"]]
+
+@pytest.mark.parametrize("search, names", [
+    ("cohen", ["Dana Cohen", "Noa Cohen"]),
+    ("dana co", ["Dana Cohen"]),
+    ("050123456", ["Dana Cohen"]),
+    ("050-123-4567", ["Dana Cohen"]),
+    ("1234567", ["Dana Cohen", "Noa Cohen"]),
+    ("12345678901", ["Dana Cohen"]),
+    ("0599", []),
+])
+def test_list_users_search(client, search, names):
+    assert searched_names(client, search) == names
+
+def test_list_users_search_with_cursor_pages(client):
+    response = client.get("/api/users", params={"search": "cohen", "pagination": "cursor", "limit": 1, "sort_by": "name"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [user["name"] for user in body["users"]] == ["Noa Cohen"]
+    assert body["total"] == 2
+
+def test_cursor_with_a_malformed_id_is_a_bad_request(client):
+    cursor = encode_cursor("created_at", "2026-01-01T00:00:00", "not-an-object-id", "next")
+    assert client.get("/api/users", params={"cursor": cursor}).status_code == 400
@@ -24,10 +24,17 @@ interface Prompt {
   id: string;
   user_id: string;
   prompt: string;
-  response: string;
+  response_preview: string;
   created_at: string;
 }
 
+interface PromptPage {
+  prompts: Prompt[];
+  total: number | null;
+  next_cursor: string | null;
+  has_next: boolean;
+}
+
 interface PaginatedUsers {
   users: User[];
   total: number;
@@ -62,6 +69,8 @@ const AdminDashboard: React.FC = () => {
   const [selectedCategoryForSub, setSelectedCategoryForSub] = useState('');
   
   const [prompts, setPrompts] = useState<Prompt[]>([]);
+  const [promptsTotal, setPromptsTotal] = useState(0);
+  const [promptsCursor, setPromptsCursor] = useState<string | null>(null);
   const [promptsLoading, setPromptsLoading] = useState(false);
   
   const [stats, setStats] = useState({
@@ -213,12 +222,25 @@ const AdminDashboard: React.FC = () => {
     }
   };
 
-  const fetchPrompts = async () => {
+  // Lesson history is keyset-paginated: the first page also asks for the total,
+  // later pages continue from the previous page's next_cursor
+  const fetchPrompts = async (cursor: string | null = null) => {
     setPromptsLoading(true);
     try {
-      const response = await fetch('http://localhost:8000/api/prompts');
-      const data = await response.json();
-      setPrompts(Array.isArray(data) ? data : []);
+      const params = new URLSearchParams({ limit: '50' });
+      if (cursor) {
+        params.append('cursor', cursor);
+      } else {
+        params.append('count', 'estimated');
+      }
+      const response = await fetch(`http://localhost:8000/api/prompts?${params}`);
+      const data: PromptPage = await response.json();
+      const page = Array.isArray(data.prompts) ? data.prompts : [];
+      setPrompts(previous => cursor ? [...previous, ...page] : page);
+      setPromptsCursor(data.has_next ? data.next_cursor : null);
+      if (!cursor) {
+        setPromptsTotal(data.total ?? page.length);
+      }
     } catch (error) {
       console.error('Error fetching prompts:', error);
     } finally {
@@ -231,7 +253,7 @@ const AdminDashboard: React.FC = () => {
       setStats({
         totalUsers: users.total || 0,
         totalCategories: categories.length,
-        totalPrompts: prompts.length,
+        totalPrompts: promptsTotal,
         recentActivity: []
       });
     } catch (error) {
@@ -260,7 +282,7 @@ const AdminDashboard: React.FC = () => {
             className={activeTab === 'prompts' ? 'active' : ''}
             onClick={() => setActiveTab('prompts')}
           >
-            Lessons ({prompts.length})
+            Lessons ({promptsTotal})
           </button>
           <button
             className={activeTab === 'stats' ? 'active' : ''}
@@ -449,7 +471,7 @@ const AdminDashboard: React.FC = () => {
         {activeTab === 'prompts' && (
           <div className="prompts-tab">
             <h3>All AI Lessons</h3>
-            {promptsLoading ? (
+            {promptsLoading && prompts.length === 0 ? (
               <div className="loading">Loading lessons...</div>
             ) : (
               <div className="prompts-list">
@@ -460,13 +482,21 @@ const AdminDashboard: React.FC = () => {
                       <small>{new Date(prompt.created_at).toLocaleDateString()}</small>
                     </div>
                     <div className="prompt-preview">
-                      {prompt.response.substring(0, 200)}...
+                      {prompt.response_preview}...
                     </div>
                     <div className="prompt-meta">
                       <span>User ID: {prompt.user_id}</span>
                     </div>
                   </div>
                 ))}
+                <div className="pagination">
+                  <span>Showing {prompts.length} of {promptsTotal} lessons</span>
+                  {promptsCursor && (
+                    <button disabled={promptsLoading} onClick={() => fetchPrompts(promptsCursor)}>
+                      {promptsLoading ? 'Loading...' : 'Load more'}
+                    </button>
+                  )}
+                </div>
               </div>
             )}
           </div>
@@ -490,7 +520,7 @@ const AdminDashboard: React.FC = () => {
               </div>
               <div className="stat-card">
                 <h4>Total Lessons</h4>
-                <p className="stat-number">{prompts.length}</p>
+                <p className="stat-number">{promptsTotal}</p>
               </div>
             </div>
             
@@ -14,10 +14,17 @@ interface SubCategory {
 interface Prompt {
   id: string;
   prompt: string;
-  response: string;
+  response_preview: string;
   created_at: string;
 }
 
+interface PromptPage {
+  prompts: Prompt[];
+  total: number | null;
+  next_cursor: string | null;
+  has_next: boolean;
+}
+
 interface LearningDashboardProps {
   userId: string;
 }
@@ -31,6 +38,9 @@ const LearningDashboard: React.FC<LearningDashboardProps> = ({ userId }) => {
   const [loading, setLoading] = useState(false);
   const [response, setResponse] = useState<string>('');
   const [history, setHistory] = useState<Prompt[]>([]);
+  const [historyTotal, setHistoryTotal] = useState(0);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [historyLoading, setHistoryLoading] = useState(false);
 
   useEffect(() => {
     fetchCategories();
@@ -64,14 +74,31 @@ const LearningDashboard: React.FC<LearningDashboardProps> = ({ userId }) => {
     }
   };
 
-  const fetchHistory = async () => {
+  // The first page also asks for the total; "Load more" continues from next_cursor
+  const fetchHistory = async (cursor: string | null = null) => {
+    setHistoryLoading(true);
     try {
-      const response = await fetch(`http://localhost:8000/api/users/${userId}/prompts`);
-      const data = await response.json();
-      setHistory(Array.isArray(data) ? data : []);
+      const params = new URLSearchParams();
+      if (cursor) {
+        params.append('cursor', cursor);
+      } else {
+        params.append('count', 'exact');
+      }
+      const response = await fetch(`http://localhost:8000/api/users/${userId}/prompts?${params}`);
+      const data: PromptPage = await response.json();
+      const page = Array.isArray(data.prompts) ? data.prompts : [];
+      setHistory(previous => cursor ? [...previous, ...page] : page);
+      setHistoryCursor(data.has_next ? data.next_cursor : null);
+      if (!cursor) {
+        setHistoryTotal(data.total ?? page.length);
+      }
     } catch (error) {
       console.error('Error fetching history:', error);
-      setHistory([]); 
+      if (!cursor) {
+        setHistory([]);
+      }
+    } finally {
+      setHistoryLoading(false);
     }
   };
 
@@ -186,7 +213,7 @@ const LearningDashboard: React.FC<LearningDashboardProps> = ({ userId }) => {
       )}
 
       <div className="list-container">
-        <h3>Your Learning History</h3>
+        <h3>Your Learning History{historyTotal > 0 && ` (${historyTotal} lessons)`}</h3>
         {history.length === 0 ? (
           <p>No lessons yet. Start learning!</p>
         ) : (
@@ -194,12 +221,17 @@ const LearningDashboard: React.FC<LearningDashboardProps> = ({ userId }) => {
             <div key={item.id} className="list-item">
               <strong>Q: {item.prompt}</strong>
               <div className="lesson-preview">
-                {item.response.substring(0, 200)}...
+                {item.response_preview}...
               </div>
               <small>{new Date(item.created_at).toLocaleDateString()}</small>
             </div>
           ))
         )}
+        {historyCursor && (
+          <button className="btn btn-secondary" disabled={historyLoading} onClick={() => fetchHistory(historyCursor)}>
+            {historyLoading ? 'Loading...' : `Load more (${history.length} of ${historyTotal})`}
+          </button>
+        )}
       </div>
     </div>
   );